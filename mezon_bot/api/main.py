@@ -1,16 +1,27 @@
 from fastapi import FastAPI, Query, Depends, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, PlainTextResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, RedirectResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from pathlib import Path
-import functools, os
+import functools, os, threading, time
+from collections import OrderedDict
 
 from sqlalchemy import false, null
 from sympy import true
 
 API_KEY = os.getenv("API_KEY", "")
+MODEL_PATH = os.getenv("MODEL_PATH", "models/ngram.bin")
+# poll MODEL_PATH every N seconds and hot-swap on change (0 = off)
+MODEL_WATCH_SECS = float(os.getenv("MODEL_WATCH_SECS", "0"))
+AUTOCORRECT_CACHE_SIZE = int(os.getenv("AUTOCORRECT_CACHE_SIZE", "50000"))
+# SQLite file shared by all workers on the host ("" = per-process cache only)
+AUTOCORRECT_CACHE_DB = os.getenv("AUTOCORRECT_CACHE_DB", "")
+# live line decoders kept for typing sessions (LRU)
+AUTOCORRECT_SESSIONS = int(os.getenv("AUTOCORRECT_SESSIONS", "1000"))
+# queries per /v1/suggest_batch request (one worker scores them all)
+MAX_BATCH = 256
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 
 app = FastAPI(title="Text Suggestion API", version="1.0")
@@ -43,30 +54,182 @@ def require_api_key(x_api_key: Optional[str] = Header(None)):
 
 
 from src.autosuggest.lm.ngram import NGramLM
-from src.autocorrect.core.realtime import autocorrect_token_live, autocorrect_line_live
+from src.autocorrect.core import resources
+from src.autocorrect.core.lattice import LiveDecoder, decode_line
+from src.autocorrect.core.realtime import (
+    autocorrect_token_live,
+    autocorrect_line_live,
+    configure_cache,
+    correction_cache,
+)
+
 
-LM = NGramLM.load("models/ngram.pkl")
+class ModelRegistry:
+    """The served NGramLM, loaded and replaced in background threads.
+
+    Requests read `lm` once and keep using that model, so a swap never waits
+    for them and they never see a half-loaded one. Loads run one at a time;
+    a failed load keeps the current model and records the error.
+    """
+
+    def __init__(self, on_swap=None):
+        self.lm: Optional[NGramLM] = None
+        self.path: Optional[str] = None
+        self.version = 0
+        self.loading = False
+        self.error: Optional[str] = None
+        self._on_swap = on_swap
+        self._load_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.lm is not None
+
+    def load(self, path: str) -> None:
+        with self._load_lock:
+            self.loading = True
+            try:
+                t0 = time.perf_counter()
+                lm = NGramLM.load(path)
+            except Exception as e:
+                self.error = f"{path}: {e!r}"
+                print(f"[MODEL] load failed: {self.error}")
+                return
+            finally:
+                self.loading = False
+            self.lm, self.path = lm, path
+            self.version += 1
+            self.error = None
+            if self._on_swap is not None:
+                self._on_swap()
+            print(f"[MODEL] v{self.version} <- {path} ({time.perf_counter() - t0:.2f}s)")
+
+    def load_async(self, path: str) -> None:
+        threading.Thread(target=self.load, args=(path,), daemon=True).start()
+
+    def watch(self, path: str, every: float) -> None:
+        """Reload `path` whenever its mtime changes (replace it atomically,
+        e.g. save to a temp file then rename)."""
+
+        def _mtime() -> Optional[float]:
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return None
+
+        def _poll():
+            seen = _mtime()
+            while True:
+                time.sleep(every)
+                mtime = _mtime()
+                if mtime is not None and mtime != seen:
+                    seen = mtime
+                    self.load(path)
+
+        threading.Thread(target=_poll, daemon=True).start()
+
+    def require(self) -> NGramLM:
+        lm = self.lm
+        if lm is None:
+            raise HTTPException(status_code=503, detail="Model is loading")
+        return lm
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "version": self.version,
+            "path": self.path,
+            "loading": self.loading,
+            "error": self.error,
+        }
 
 
 class SuggestResp(BaseModel):
     candidates: List[str]
 
 
+class SuggestBatchReq(BaseModel):
+    contexts: List[str] = Field(..., max_length=MAX_BATCH)
+    prefixes: Optional[List[Optional[str]]] = Field(None, max_length=MAX_BATCH)
+    k: int = Field(5, ge=1, le=20)
+
+
+class SuggestBatchResp(BaseModel):
+    candidates: List[List[str]]
+
+
 class AutocorrectResp(BaseModel):
     input: str
     corrected: str
 
 
+class LineResp(BaseModel):
+    input: str
+    corrected: str
+    decoded: bool
+
+
 @functools.lru_cache(maxsize=8192)
-def infer(ctx: str, prefix: Optional[str], k: int) -> tuple[str, ...]:
-    return tuple(LM.suggest(ctx[-1024:], prefix, k))
+def infer(lm: NGramLM, ctx: str, prefix: Optional[str], k: int) -> tuple[str, ...]:
+    return tuple(lm.suggest(ctx[-1024:], prefix, k))
+
+
+_sessions: "OrderedDict[str, LiveDecoder]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def session_decoder(session: str, lm: NGramLM) -> LiveDecoder:
+    """The LiveDecoder of a typing session, new if the model was swapped."""
+    with _sessions_lock:
+        dec = _sessions.get(session)
+        if dec is None or dec.lm is not lm:
+            dec = _sessions[session] = LiveDecoder(lm)
+        _sessions.move_to_end(session)
+        if len(_sessions) > AUTOCORRECT_SESSIONS:
+            _sessions.popitem(last=False)
+        return dec
+
+
+def on_swap():
+    # keyed by model too, so nothing computed by the old model is served
+    # after a swap; clearing also drops the cache's reference to the old model
+    infer.cache_clear()
+    resources.REGISTRY.set("lm", REGISTRY.lm)
+    with _sessions_lock:
+        _sessions.clear()
+
+
+REGISTRY = ModelRegistry(on_swap=on_swap)
+REGISTRY.load_async(MODEL_PATH)
+if MODEL_WATCH_SECS > 0:
+    REGISTRY.watch(MODEL_PATH, MODEL_WATCH_SECS)
+configure_cache(AUTOCORRECT_CACHE_SIZE, AUTOCORRECT_CACHE_DB or None)
 
 
 @app.get("/health")
 def health():
+    """Liveness: the process is up (the model may still be loading)."""
     return {"ok": True}
 
 
+@app.get("/ready")
+def ready():
+    """Readiness: 503 until a model is loaded."""
+    status = REGISTRY.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.post("/admin/reload", status_code=202, dependencies=[Depends(require_api_key)])
+def reload_model(path: Optional[str] = None):
+    """Load `path` (default: the current model file) in the background and
+    swap it in; poll /ready for the new version."""
+    if not API_KEY:
+        # the path may name a pickle: never accept it from anonymous callers
+        raise HTTPException(status_code=403, detail="Set API_KEY to enable admin endpoints")
+    REGISTRY.load_async(path or REGISTRY.path or MODEL_PATH)
+    return REGISTRY.status()
+
+
 @app.get(
     "/v1/suggest", response_model=SuggestResp, dependencies=[Depends(require_api_key)]
 )
@@ -75,7 +238,20 @@ def suggest(
     prefix: Optional[str] = None,
     k: int = Query(5, ge=1, le=20),
 ):
-    return SuggestResp(candidates=list(infer(context, prefix, k)))
+    return SuggestResp(candidates=list(infer(REGISTRY.require(), context, prefix, k)))
+
+
+@app.post(
+    "/v1/suggest_batch",
+    response_model=SuggestBatchResp,
+    dependencies=[Depends(require_api_key)],
+)
+def suggest_batch(req: SuggestBatchReq):
+    if req.prefixes is not None and len(req.prefixes) != len(req.contexts):
+        raise HTTPException(status_code=422, detail="prefixes must match contexts")
+    lm = REGISTRY.require()
+    contexts = [ctx[-1024:] for ctx in req.contexts]
+    return SuggestBatchResp(candidates=lm.suggest_batch(contexts, req.prefixes, req.k))
 
 
 @app.get(
@@ -88,6 +264,33 @@ def autocorrect_endpoint(token: str = Query("")):
     return AutocorrectResp(input=token, corrected=corrected)
 
 
+@app.get(
+    "/v1/autocorrect_line",
+    response_model=LineResp,
+    dependencies=[Depends(require_api_key)],
+)
+def autocorrect_line_endpoint(text: str = Query("", max_length=2000), session: Optional[str] = None):
+    """The line decoded with the LM; pass the same `session` on every
+    keystroke so only the edited tail is decoded again. Per-token
+    correction while the model is loading."""
+    lm = REGISTRY.lm
+    if lm is None:
+        return LineResp(input=text, corrected=autocorrect_line_live(text), decoded=False)
+    if session:
+        dec = session_decoder(session, lm)
+        with dec.lock:
+            corrected = dec.update(text)
+    else:
+        corrected = decode_line(text, lm)
+    return LineResp(input=text, corrected=corrected, decoded=True)
+
+
+@app.get("/v1/autocorrect/stats", dependencies=[Depends(require_api_key)])
+def autocorrect_stats():
+    """Hit/miss counters of this worker's correction cache."""
+    return correction_cache().stats()
+
+
 HERE = Path(__file__).resolve()
 PROJECT_ROOT = HERE.parents[2]
 
@@ -0,0 +1,244 @@
+"""Bigram counts of the autocorrect corpus as one memory-mapped table.
+
+The corpus is read line by line (a line's last word still pairs with the
+next line's first, as when the text is read whole) and the pairs are
+counted in numpy chunks, so building needs memory for the distinct pairs
+only. The table stores every word once: word ids are the ranks of their
+64-bit xxhash, and the pairs are a CSR of sorted next-word ids with their
+counts per previous word. Loading maps the file and builds no Python
+objects, so startup and RSS do not grow with the number of pairs; pages
+are read from the OS cache as lookups touch them.
+
+File layout (little endian): magic, then n_words, n_pairs, blob size as
+uint64, then keys uint64[n_words] (sorted word hashes), off
+int64[n_words + 1] (word offsets in the blob), ptr int64[n_words + 1] (row
+offsets), nxt int32[n_pairs], cnt uint32[n_pairs] and the utf-8 words blob.
+"""
+from __future__ import annotations
+import csv, re
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+import xxhash
+
+BIGRAM_BIN_PATH = "data/autocorrect/processed/bigram.bin"
+MAGIC = b"BIGRAM01"
+_HEADER = len(MAGIC) + 3 * 8
+
+WORD_RE = re.compile(
+    r"[a-zàáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọ"
+    r"ôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵđ]+"
+)
+
+
+def _hash(word: str) -> int:
+    return xxhash.xxh64_intdigest(word.encode("utf-8"))
+
+
+def count_pairs(corpus_path: str, chunk: int = 1 << 22) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """(words, pair keys, counts) of a corpus, streamed; a key is
+    prev_id << 32 | next_id with ids in order of first occurrence."""
+    stoi: dict = {}
+    words: List[str] = []
+    keys = np.zeros(0, dtype=np.uint64)
+    counts = np.zeros(0, dtype=np.int64)
+    buf = array("i")  # word ids of the current chunk
+
+    def flush():
+        nonlocal keys, counts
+        if len(buf) < 2:
+            return
+        ids = np.frombuffer(buf, dtype=np.int32).astype(np.uint64)
+        k, c = np.unique((ids[:-1] << np.uint64(32)) | ids[1:], return_counts=True)
+        del ids
+        # merge into the sorted totals in place; only new pairs are inserted
+        pos = keys.searchsorted(k)
+        seen = pos < len(keys)
+        seen[seen] = keys[pos[seen]] == k[seen]
+        counts[pos[seen]] += c[seen]  # k is unique: no repeated index
+        new = ~seen
+        keys = np.insert(keys, pos[new], k[new])
+        counts = np.insert(counts, pos[new], c[new])
+        del buf[:-1]  # the last word pairs with the next chunk's first
+
+    with open(corpus_path, encoding="utf-8") as f:
+        for line in f:
+            for w in WORD_RE.findall(line.lower()):
+                i = stoi.get(w)
+                if i is None:
+                    i = stoi[w] = len(words)
+                    words.append(w)
+                buf.append(i)
+            if len(buf) >= chunk:
+                flush()
+    flush()
+    return words, keys, counts
+
+
+class BigramTable:
+    def __init__(
+        self,
+        keys: np.ndarray,
+        off: np.ndarray,
+        ptr: np.ndarray,
+        nxt: np.ndarray,
+        cnt: np.ndarray,
+        blob: np.ndarray,
+        min_freq: int = 1,
+    ):
+        self.keys = keys
+        self.off = off
+        self.ptr = ptr
+        self.nxt = nxt
+        self.cnt = cnt
+        self.blob = blob
+        self.min_freq = min_freq
+        # lookups bisect these views: plain ints, no numpy scalar per step
+        self._keys, self._off, self._ptr = memoryview(keys), memoryview(off), memoryview(ptr)
+        self._nxt, self._cnt, self._blob = memoryview(nxt), memoryview(cnt), memoryview(blob)
+
+    def __len__(self) -> int:
+        """Number of distinct pairs (whatever `min_freq`)."""
+        return len(self.nxt)
+
+    @property
+    def n_words(self) -> int:
+        return len(self.keys)
+
+    def word(self, i: int) -> str:
+        return self._blob[self._off[i] : self._off[i + 1]].tobytes().decode("utf-8")
+
+    def word_id(self, word: str) -> int:
+        """Id of `word`, -1 if it is not in the table."""
+        raw = word.encode("utf-8")
+        h = xxhash.xxh64_intdigest(raw)
+        i = bisect_left(self._keys, h)
+        if i == len(self._keys) or self._keys[i] != h or self._blob[self._off[i] : self._off[i + 1]] != raw:
+            return -1
+        return i
+
+    def count(self, prev: str, cand: str, default: int = 0) -> int:
+        """Count of `prev cand`; `default` if unseen or below `min_freq`."""
+        a = self.word_id(prev)
+        b = self.word_id(cand) if a >= 0 else -1
+        if b < 0:
+            return default
+        hi = self._ptr[a + 1]
+        j = bisect_left(self._nxt, b, self._ptr[a], hi)
+        if j == hi or self._nxt[j] != b or self._cnt[j] < self.min_freq:
+            return default
+        return self._cnt[j]
+
+    def items(self) -> Iterator[Tuple[str, str, int]]:
+        """(prev, next, count) of every pair, by prev id then next id."""
+        for a in range(self.n_words):
+            lo, hi = int(self.ptr[a]), int(self.ptr[a + 1])
+            if lo == hi:
+                continue
+            prev = self.word(a)
+            for b, c in zip(self.nxt[lo:hi].tolist(), self.cnt[lo:hi].tolist()):
+                if c >= self.min_freq:
+                    yield prev, self.word(b), c
+
+    @classmethod
+    def from_pairs(cls, words: List[str], keys: np.ndarray, counts: np.ndarray) -> "BigramTable":
+        """Table of the pairs `keys` (prev_id << 32 | next_id, ids indexing
+        `words`) with their `counts`."""
+        hashes = np.fromiter((_hash(w) for w in words), dtype=np.uint64, count=len(words))
+        order = np.argsort(hashes, kind="stable")
+        rank = np.empty(len(words), dtype=np.int64)
+        rank[order] = np.arange(len(words))
+        encoded = [words[i].encode("utf-8") for i in order.tolist()]
+        off = np.zeros(len(words) + 1, dtype=np.int64)
+        off[1:] = np.cumsum([len(e) for e in encoded])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        prev = rank[(keys >> np.uint64(32)).astype(np.int64)]
+        nxt = rank[(keys & np.uint64(0xFFFFFFFF)).astype(np.int64)]
+        pair_order = np.lexsort((nxt, prev))
+        prev, nxt = prev[pair_order], nxt[pair_order]
+        cnt = np.minimum(counts[pair_order], np.iinfo(np.uint32).max).astype(np.uint32)
+        ptr = np.zeros(len(words) + 1, dtype=np.int64)
+        ptr[1:] = np.cumsum(np.bincount(prev, minlength=len(words)))
+        return cls(hashes[order], off, ptr, nxt.astype(np.int32), cnt, blob)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, int]]) -> "BigramTable":
+        stoi: dict = {}
+        words: List[str] = []
+        keys, counts = [], []
+        for w1, w2, c in rows:
+            ids = []
+            for w in (w1, w2):
+                i = stoi.get(w)
+                if i is None:
+                    i = stoi[w] = len(words)
+                    words.append(w)
+                ids.append(i)
+            keys.append(ids[0] << 32 | ids[1])
+            counts.append(int(c))
+        return cls.from_pairs(words, np.asarray(keys, dtype=np.uint64), np.asarray(counts, dtype=np.int64))
+
+    def save(self, path: str = BIGRAM_BIN_PATH) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(str(path) + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.array([self.n_words, len(self), len(self.blob)], dtype="<u8").tobytes())
+            for arr, dtype in (
+                (self.keys, "<u8"),
+                (self.off, "<i8"),
+                (self.ptr, "<i8"),
+                (self.nxt, "<i4"),
+                (self.cnt, "<u4"),
+                (self.blob, "u1"),
+            ):
+                f.write(np.ascontiguousarray(arr, dtype=dtype).tobytes())
+        tmp.replace(path)  # readers mapping the old file keep their pages
+
+    @classmethod
+    def load(cls, path: str = BIGRAM_BIN_PATH, min_freq: int = 1) -> "BigramTable":
+        # a plain view of the mapping: memmap slices are slower to make
+        raw = np.asarray(np.memmap(path, dtype=np.uint8, mode="r"))
+        if bytes(raw[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path}: không phải bigram table")
+        n_words, n_pairs, n_blob = (int(x) for x in raw[len(MAGIC) : _HEADER].view("<u8"))
+        arrays, pos = [], _HEADER
+        for n, dtype in (
+            (n_words, "<u8"),
+            (n_words + 1, "<i8"),
+            (n_words + 1, "<i8"),
+            (n_pairs, "<i4"),
+            (n_pairs, "<u4"),
+            (n_blob, "u1"),
+        ):
+            size = n * np.dtype(dtype).itemsize
+            arrays.append(raw[pos : pos + size].view(dtype))
+            pos += size
+        return cls(*arrays, min_freq=min_freq)
+
+
+def build_bigram_table(corpus_path: str, output_path: str = BIGRAM_BIN_PATH) -> BigramTable:
+    table = BigramTable.from_pairs(*count_pairs(corpus_path))
+    table.save(output_path)
+    print(f"Đã lưu bigram table: {output_path} ({table.n_words:,} từ, {len(table):,} cặp từ)")
+    return table
+
+
+def convert_csv(csv_path: str, output_path: str = BIGRAM_BIN_PATH) -> BigramTable:
+    """The table of a bigram.csv (w1, w2, count rows) written before."""
+    with open(csv_path, encoding="utf-8") as f:
+        rows = (row for row in csv.reader(f) if len(row) == 3)
+        table = BigramTable.from_rows(rows)
+    table.save(output_path)
+    print(f"Đã chuyển {csv_path} -> {output_path} ({len(table):,} cặp từ)")
+    return table
+
+
+if __name__ == "__main__":
+    from src.autocorrect.core.resources import CORPUS_PATH
+
+    build_bigram_table(CORPUS_PATH)
@@ -0,0 +1,182 @@
+"""BK-tree over the autocorrect vocab, one tree per word length.
+
+Children of a node are keyed by their edit distance to it, so a query of
+radius r only descends into keys within r of its own distance to the node
+(triangle inequality). Words are inserted by descending frequency, which
+makes every node at least as frequent as its descendants: once the top k
+is full, a node is dropped (with its subtree) when even a distance-0 hit at
+its frequency could not enter it.
+
+The trees are stored as CSR arrays (children sorted by key) in one .npz.
+"""
+from __future__ import annotations
+import heapq, math
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.autocorrect.core.deletion_index import vocab_digest
+from src.autocorrect.core.distance import LengthBuckets, edit_distance, myers_many
+
+BK_PATH = "data/autocorrect/processed/bktree.npz"
+
+Score = Callable[[int, int], float]
+
+
+def rank_score(max_distance: int) -> Score:
+    """The `rank_candidates` score of a word at `dist` with frequency `freq`."""
+    return lambda dist, freq: (max_distance - dist + 1) * math.log(freq + 1)
+
+
+class BKTree:
+    def __init__(
+        self,
+        words: List[str],
+        freqs: np.ndarray,
+        ptr: np.ndarray,
+        child: np.ndarray,
+        key: np.ndarray,
+        roots: Dict[int, int],
+    ):
+        self.words = words
+        self.freqs = freqs
+        self.ptr = ptr
+        self.child = child
+        self.key = key
+        self.roots = roots
+        self.buckets = LengthBuckets(words)
+
+    @classmethod
+    def build(cls, vocab: Dict[str, int]) -> "BKTree":
+        words = list(vocab)
+        freqs = np.array([vocab[w] for w in words], dtype=np.int64)
+        kids: List[Dict[int, int]] = [{} for _ in words]
+        roots: Dict[int, int] = {}
+        for i in sorted(range(len(words)), key=lambda i: (-freqs[i], i)):
+            w = words[i]
+            node = roots.setdefault(len(w), i)
+            while node != i:
+                d = edit_distance(w, words[node])
+                node = kids[node].setdefault(d, i)
+
+        ptr = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum([len(k) for k in kids], out=ptr[1:])
+        child = np.empty(ptr[-1], dtype=np.int32)
+        key = np.empty(ptr[-1], dtype=np.int16)
+        for i, k in enumerate(kids):
+            items = sorted(k.items())
+            child[ptr[i] : ptr[i + 1]] = [c for _, c in items]
+            key[ptr[i] : ptr[i + 1]] = [d for d, _ in items]
+        return cls(words, freqs, ptr, child, key, roots)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def nbytes(self) -> int:
+        return self.freqs.nbytes + self.ptr.nbytes + self.child.nbytes + self.key.nbytes
+
+    def query(
+        self,
+        word: str,
+        max_distance: int = 2,
+        top_k: Optional[int] = 5,
+        score: Optional[Score] = None,
+    ) -> List[Tuple[str, int]]:
+        """Best `top_k` (word, distance) within `max_distance` of `word` (all
+        of them if `top_k` is None), ranked by `score(dist, freq)`, then by
+        vocab order. `score` (default `rank_score`) must not increase with
+        the distance nor decrease with the frequency.
+
+        The trees are walked level by level; each level's distances come
+        from one `myers_many` call per word length (one `edit_distance` per
+        node for queries longer than 64 chars).
+        """
+        score = score or rank_score(max_distance)
+        r, n = max_distance, len(word)
+        frontier = {L: np.array([root]) for L, root in self.roots.items() if abs(L - n) <= r}
+        found: List[Tuple[float, int, int]] = []  # (score, -id, dist)
+        kth = -math.inf
+        while frontier:
+            nxt: Dict[int, List[np.ndarray]] = {}
+            for L, nodes in frontier.items():
+                if top_k is not None and len(found) >= top_k:
+                    # nodes (and their subtrees) that cannot reach the top k
+                    ok = [score(0, f) >= kth for f in self.freqs[nodes].tolist()]
+                    nodes = nodes[np.array(ok, dtype=bool)]
+                    if not len(nodes):
+                        continue
+                d = self._distances(word, L, nodes)
+                for i, x in zip(nodes[d <= r].tolist(), d[d <= r].tolist()):
+                    found.append((score(x, int(self.freqs[i])), -i, x))
+                # children whose key is within r of the node's distance
+                lo, cnt = self.ptr[nodes], self.ptr[nodes + 1] - self.ptr[nodes]
+                edge = np.repeat(lo - np.cumsum(cnt) + cnt, cnt) + np.arange(cnt.sum())
+                near = np.abs(self.key[edge] - np.repeat(d, cnt)) <= r
+                if near.any():
+                    nxt.setdefault(L, []).append(self.child[edge[near]])
+            if top_k is not None and len(found) >= top_k:
+                kth = heapq.nlargest(top_k, found)[-1][0]
+            frontier = {L: np.concatenate(parts) for L, parts in nxt.items()}
+        found.sort(reverse=True)
+        if top_k is not None:
+            found = found[:top_k]
+        return [(self.words[-i], d) for _, i, d in found]
+
+    def _distances(self, word: str, L: int, nodes: np.ndarray) -> np.ndarray:
+        if len(word) <= 64:
+            return myers_many(word, self.buckets.codes[L][self.buckets.row[nodes]])
+        # the walk needs exact distances, not bounded ones
+        return np.array([edit_distance(word, self.words[i]) for i in nodes.tolist()], dtype=np.int64)
+
+    def save(self, path: str = BK_PATH) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        blob = "\n".join(self.words).encode("utf-8")
+        np.savez(
+            path,
+            words=np.frombuffer(blob, dtype=np.uint8),
+            freqs=self.freqs,
+            ptr=self.ptr,
+            child=self.child,
+            key=self.key,
+            root_len=np.array(list(self.roots), dtype=np.int64),
+            root_id=np.array(list(self.roots.values()), dtype=np.int64),
+            digest=np.uint64(_digest(self.words, self.freqs.tolist())),
+        )
+
+    @classmethod
+    def load(cls, path: str = BK_PATH) -> "BKTree":
+        with np.load(path) as z:
+            blob = z["words"].tobytes().decode("utf-8")
+            words = blob.split("\n") if blob else []
+            roots = dict(zip(z["root_len"].tolist(), z["root_id"].tolist()))
+            return cls(words, z["freqs"], z["ptr"], z["child"], z["key"], roots)
+
+
+def _digest(words: List[str], freqs: List[int]) -> int:
+    # the tree shape depends on the frequencies too
+    return vocab_digest(f"{w},{c}" for w, c in zip(words, freqs))
+
+
+def load_or_build_bktree(vocab: Dict[str, int], path: str = BK_PATH) -> BKTree:
+    """Load the tree saved at `path`, rebuilding (and re-saving) it when it
+    is missing or was built from another vocab."""
+    if Path(path).exists():
+        with np.load(path) as z:
+            fresh = int(z["digest"]) == _digest(list(vocab), list(vocab.values()))
+        if fresh:
+            return BKTree.load(path)
+    tree = BKTree.build(vocab)
+    try:
+        tree.save(path)
+    except OSError as e:
+        print(f"[bk_tree] không lưu được {path}: {e}")
+    return tree
+
+
+if __name__ == "__main__":
+    from src.autocorrect.core.rank_candidates import load_vocab
+
+    tree = BKTree.build(load_vocab())
+    tree.save()
+    print(f"Đã lưu BK-tree: {BK_PATH} ({len(tree):,} từ, {len(tree.roots)} cây theo độ dài)")
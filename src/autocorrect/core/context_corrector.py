@@ -1,52 +1,24 @@
-import re
-import csv
-from collections import Counter
-from math import log
-from pathlib import Path
-from rank_candidates import rank_candidates, load_vocab, edit_distance
-from normalize_vi import normalize_vi
-from keyboard_fix import fix_common_keyboard
-from hard_rules import apply_hard_rules
-import math
-
-
-def build_bigram_model(
-    corpus_path="data/autocorrect/processed/corpus_vi_clean.txt",
-    output_path="data/autocorrect/processed/bigram.csv",
+import numpy as np
+from src.autocorrect.core.context_scorer import BigramScorer
+from src.autocorrect.core.distance import KEYBOARD_COSTS
+from src.autocorrect.core.hard_rules import apply_hard_rules
+from src.autocorrect.core.keyboard_fix import fix_common_keyboard
+from src.autocorrect.core.normalize_vi import normalize_vi
+from src.autocorrect.core.rank_candidates import rank_scored
+from src.autocorrect.core.resources import context_scorer, deletion_index, vocab
+
+
+def correct_sentence(
+    sentence, vocab, bigram=None, max_distance=2, top_k=3, index=None, costs=None, scorer=None
 ):
-
-    print("Đang đọc corpus...")
-    text = Path(corpus_path).read_text(encoding="utf-8").lower()
-    words = re.findall(
-        r"[a-zàáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọ"
-        r"ôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵđ]+",
-        text,
-    )
-    bigrams = Counter(zip(words[:-1], words[1:]))
-    with open(output_path, "w", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        for (w1, w2), c in bigrams.most_common():
-            writer.writerow([w1, w2, c])
-    print(f"Đã lưu bigram model: {output_path} ({len(bigrams):,} cặp từ)")
-
-
-def load_bigram(path="data/autocorrect/processed/bigram.csv", min_freq=2):
-    bigram = {}
-    with open(path, encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) != 3:
-                continue
-            w1, w2, c = row
-            c = int(c)
-            if c >= min_freq:
-                bigram.setdefault(w1, {})[w2] = c
-    return bigram
-
-
-def correct_sentence(sentence, vocab, bigram, max_distance=2, top_k=3):
+    """`scorer` rates the candidates after the words already corrected (see
+    context_scorer); by default the counts of `bigram` if it is given, else
+    the shared scorer - the n-gram LM when one is trained."""
+    if scorer is None:
+        scorer = BigramScorer(bigram, vocab) if bigram is not None else context_scorer()
     words = sentence.lower().split()
     corrected = [words[0]]
+    history = words[:1]  # corrected tokens, multi-word rule outputs split
 
     for i in range(1, len(words)):
         w = words[i]
@@ -54,41 +26,35 @@ def correct_sentence(sentence, vocab, bigram, max_distance=2, top_k=3):
         ruled = apply_hard_rules(w)
         if ruled != w:
             corrected.append(ruled)
+            history += ruled.split()
             continue
 
         if w in vocab:
             corrected.append(w)
+            history.append(w)
             continue
 
-        cands = rank_candidates(w, vocab, max_distance=max_distance, top_k=top_k)
-        prev = corrected[-1]
-        best_cand, best_score = cands[0], -1e9
-
-        for cand in cands:
-            bigram_freq = bigram.get(prev, {}).get(cand, 1)
-            unigram_freq = vocab.get(cand, 1)
-            dist = edit_distance(w, cand)
-
-            score = (
-                0.6 * math.log(bigram_freq + 1)
-                + 1.2 * math.log(unigram_freq + 1)
-                - 2.0 * dist
-            )
+        cands = rank_scored(
+            w, vocab, max_distance=max_distance, top_k=top_k, index=index, costs=costs
+        )
+        if not cands:
+            corrected.append(w)
+            history.append(w)
+            continue
 
-            if score > best_score:
-                best_cand, best_score = cand, score
+        # distances as ranked: weighted when `costs` is given
+        dists = np.array([c.distance for c in cands])
+        scores = scorer.logprobs(history, [c.word for c in cands]) - scorer.dist_weight * dists
+        best_cand = cands[int(np.argmax(scores))].word
 
         corrected.append(best_cand)
+        history.append(best_cand)
 
     return " ".join(corrected)
 
 
-if not Path("data/autocorrect/processed/bigram.csv").exists():
-    build_bigram_model()
-
 if __name__ == "__main__":
-    vocab = load_vocab()
-    bigram = load_bigram()
+    vocab, scorer, index = vocab(), context_scorer(), deletion_index()
     while True:
         s = input("Nhập câu: ").strip()
         if not s:
@@ -102,4 +68,4 @@ if __name__ == "__main__":
 
         s = " ".join(tokens)
 
-        print("→", correct_sentence(s, vocab, bigram))
+        print("→", correct_sentence(s, vocab, index=index, costs=KEYBOARD_COSTS, scorer=scorer))
@@ -0,0 +1,55 @@
+"""Context scores of correction candidates.
+
+A scorer gives `logprobs(history, words)`: how well each candidate follows
+the words before it, on a log scale, and `dist_weight`: what one unit of
+edit distance costs on that scale. `LMScorer` reads the smoothed (Kneser-Ney,
+up to trigram) probabilities of the NGramLM that also serves suggestions, so
+a process serving both needs one language model. `BigramScorer` is the
+count-based score `correct_sentence` has always used, for setups without a
+trained LM; it takes the mapped `BigramTable` or the `{w1: {w2: count}}`
+dict of `resources.load_bigram`.
+"""
+from __future__ import annotations
+from math import log
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+class LMScorer:
+    dist_weight = 6.0
+
+    def __init__(self, lm):
+        self.lm = lm
+        self.n = lm.n
+
+    def logprobs(self, history: Sequence[str], words: Sequence[str]) -> np.ndarray:
+        return self.lm.logprobs(history, words)
+
+
+class DictBigram:
+    """`BigramTable.count` over a `{w1: {w2: count}}` dict."""
+
+    def __init__(self, pairs: Dict[str, Dict[str, int]]):
+        self.pairs = pairs
+
+    def count(self, prev: str, cand: str, default: int = 0) -> int:
+        return self.pairs.get(prev, {}).get(cand, default)
+
+
+class BigramScorer:
+    dist_weight = 2.0
+    n = 2
+
+    def __init__(self, bigram, vocab: Dict[str, int]):
+        self.bigram = DictBigram(bigram) if isinstance(bigram, dict) else bigram
+        self.vocab = vocab
+
+    def logprobs(self, history: Sequence[str], words: Sequence[str]) -> np.ndarray:
+        prev = history[-1] if history else ""
+        return np.array(
+            [
+                0.6 * log(self.bigram.count(prev, w, 1) + 1) + 1.2 * log(self.vocab.get(w, 1) + 1)
+                for w in words
+            ]
+        )
@@ -0,0 +1,171 @@
+"""Cache of per-token corrections.
+
+Entries are keyed by the normalized token under a version string (a
+fingerprint of the vocab and the rules the correction depends on), so a
+new vocab or rule file never serves stale corrections. The in-process tier
+is an LRU dict bounded by `maxsize`. The optional SQLite tier (one file
+shared by every worker on the host) is consulted on a local miss and
+filled on every computation; it is trimmed to `max_rows`, oldest first, on
+opening and then by a background thread every `TRIM_EVERY` writes.
+The shared tier is best effort: a locked or broken database only costs a
+recomputation. Each thread queries it through its own connection and
+outside the lock of the LRU dict, so a slow database only holds up the
+requests that missed locally.
+"""
+from __future__ import annotations
+import sqlite3, threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import xxhash
+
+_MISSING = object()
+TRIM_EVERY = 1000
+
+
+def correction_version(vocab: dict, *files: str) -> str:
+    """Fingerprint of a vocab (words and counts) and of the given files."""
+    h = xxhash.xxh64()
+    for w, c in vocab.items():
+        h.update(f"{w},{c}\n".encode("utf-8"))
+    for path in files:
+        h.update(Path(path).read_bytes())
+    return h.hexdigest()
+
+
+class CorrectionCache:
+    def __init__(
+        self,
+        maxsize: int = 50_000,
+        version: str = "",
+        path: Optional[str] = None,
+        max_rows: int = 1_000_000,
+    ):
+        self.maxsize = maxsize
+        self.version = version
+        self.path = path
+        self.max_rows = max_rows
+        self.hits = self.shared_hits = self.misses = 0
+        self._data: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()  # the LRU dict and the counters
+        self._local = threading.local()  # this thread's connection
+        self._writes = 0
+        self._trimming = False
+        self.shared = bool(path) and self._conn() is not None
+        if self.shared:
+            self.trim()
+
+    @staticmethod
+    def _open(path: str) -> Optional[sqlite3.Connection]:
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(path, timeout=0.5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS corrections ("
+                "version TEXT, token TEXT, corrected TEXT, PRIMARY KEY (version, token))"
+            )
+            return db
+        except (OSError, sqlite3.Error) as e:
+            print(f"[correction_cache] không mở được {path}: {e}")
+            return None
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        db = getattr(self._local, "db", _MISSING)
+        if db is _MISSING:
+            db = self._local.db = self._open(self.path)
+        return db
+
+    def get_or_compute(self, token: str, compute: Callable[[str], Optional[str]]) -> Optional[str]:
+        """`compute(token)`, served from the cache when possible."""
+        with self._lock:
+            value = self._data.get(token, _MISSING)
+            if value is not _MISSING:
+                self._data.move_to_end(token)
+                self.hits += 1
+                return value
+        value = self._shared_get(token)
+        if value is not _MISSING:
+            with self._lock:
+                self.shared_hits += 1
+                self._put(token, value)
+            return value
+        value = compute(token)
+        with self._lock:
+            self.misses += 1
+            self._put(token, value)
+        self._shared_put(token, value)
+        return value
+
+    def _put(self, token: str, value: Optional[str]) -> None:
+        self._data[token] = value
+        self._data.move_to_end(token)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _shared_get(self, token: str):
+        if not self.shared:
+            return _MISSING
+        try:
+            db = self._conn()
+            if db is None:
+                return _MISSING
+            row = db.execute(
+                "SELECT corrected FROM corrections WHERE version = ? AND token = ?",
+                (self.version, token),
+            ).fetchone()
+        except sqlite3.Error:
+            return _MISSING
+        return _MISSING if row is None else row[0]
+
+    def _shared_put(self, token: str, value: Optional[str]) -> None:
+        if not self.shared:
+            return
+        try:
+            db = self._conn()
+            if db is None:
+                return
+            db.execute("INSERT OR REPLACE INTO corrections VALUES (?, ?, ?)", (self.version, token, value))
+        except sqlite3.Error:
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % TRIM_EVERY == 0 and not self._trimming
+            self._trimming = self._trimming or due
+        if due:
+            threading.Thread(target=self.trim, name="correction-cache-trim", daemon=True).start()
+
+    def trim(self) -> None:
+        """Keep the newest `max_rows` rows of the shared tier."""
+        try:
+            db = self._conn()
+            if db is not None:
+                db.execute(
+                    "DELETE FROM corrections WHERE rowid <= (SELECT MAX(rowid) FROM corrections) - ?",
+                    (self.max_rows,),
+                )
+        except sqlite3.Error:
+            pass
+        finally:
+            self._trimming = False
+
+    def clear(self) -> None:
+        """Drop the in-process entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.shared_hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "shared": self.shared,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / total if total else 0.0,
+        }
@@ -0,0 +1,157 @@
+"""Deletion-neighbourhood (SymSpell) index over the autocorrect vocab.
+
+Every word is filed under each string obtained by deleting up to
+`max_distance` characters from it. Two words within Levenshtein distance d
+can both be reduced to a common string with at most d deletions each, so the
+words filed under the query's own deletions contain every word within d;
+their exact distance is then checked, bucket by bucket with
+`LengthBuckets` (bit-parallel).
+
+Deletion strings are stored as sorted 64-bit xxhash keys with a CSR list of
+word ids, so the index is a few numpy arrays on disk. A hash collision only
+adds a candidate that the distance check rejects.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import xxhash
+
+from src.autocorrect.core.distance import KeyboardCosts, LengthBuckets
+
+INDEX_PATH = "data/autocorrect/processed/deletes.npz"
+
+
+def deletes(word: str, max_distance: int) -> Set[str]:
+    """`word` and every string made by deleting up to `max_distance` chars."""
+    out = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+
+def _hash(keys: Iterable[str]) -> np.ndarray:
+    return np.fromiter(
+        (xxhash.xxh64_intdigest(k.encode("utf-8")) for k in keys), dtype=np.uint64
+    )
+
+
+def vocab_digest(words: Iterable[str]) -> int:
+    """Fingerprint of the word list (and its order) an index was built from."""
+    h = xxhash.xxh64()
+    for w in words:
+        h.update(w.encode("utf-8") + b"\n")
+    return h.intdigest()
+
+
+class DeletionIndex:
+    def __init__(
+        self,
+        words: List[str],
+        keys: np.ndarray,
+        ptr: np.ndarray,
+        ids: np.ndarray,
+        max_distance: int,
+    ):
+        self.words = words
+        self.keys = keys
+        self.ptr = ptr
+        self.ids = ids
+        self.max_distance = max_distance
+        self.buckets = LengthBuckets(words)
+
+    @classmethod
+    def build(cls, words: Iterable[str], max_distance: int = 2) -> "DeletionIndex":
+        words = list(words)
+        hashes, owners = [], []
+        for i, w in enumerate(words):
+            h = np.unique(_hash(deletes(w, max_distance)))
+            hashes.append(h)
+            owners.append(np.full(len(h), i, dtype=np.int32))
+        h = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+        o = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int32)
+        order = np.lexsort((o, h))
+        h, o = h[order], o[order]
+        keys, starts = np.unique(h, return_index=True)
+        ptr = np.append(starts, len(h)).astype(np.int64)
+        return cls(words, keys, ptr, o, max_distance)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def candidate_ids(self, word: str, max_distance: Optional[int] = None) -> np.ndarray:
+        """Sorted ids of the words sharing a deletion with `word` (unverified)."""
+        d = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if not len(self.keys):
+            return np.zeros(0, dtype=np.int32)
+        h = _hash(deletes(word, d))
+        pos = np.minimum(self.keys.searchsorted(h), len(self.keys) - 1)
+        pos = pos[self.keys[pos] == h]
+        if not len(pos):
+            return np.zeros(0, dtype=np.int32)
+        parts = [self.ids[a:b] for a, b in zip(self.ptr[pos].tolist(), self.ptr[pos + 1].tolist())]
+        return np.unique(np.concatenate(parts))
+
+    def lookup(
+        self,
+        word: str,
+        max_distance: Optional[int] = None,
+        costs: Optional[KeyboardCosts] = None,
+    ) -> List[Tuple[str, float]]:
+        """(vocab word, distance) for every word within `max_distance` of
+        `word`, in vocab order (the order the index was built in). With
+        `costs`, the distance is the weighted one."""
+        d = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        found, dist = self.buckets.within(word, d, self.candidate_ids(word, d))
+        return self.buckets.reweigh(word, found, dist, costs)
+
+    def save(self, path: str = INDEX_PATH) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        blob = "\n".join(self.words).encode("utf-8")
+        np.savez(
+            path,
+            keys=self.keys,
+            ptr=self.ptr,
+            ids=self.ids,
+            words=np.frombuffer(blob, dtype=np.uint8),
+            max_distance=np.int64(self.max_distance),
+            digest=np.uint64(vocab_digest(self.words)),
+        )
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> "DeletionIndex":
+        with np.load(path) as z:
+            blob = z["words"].tobytes().decode("utf-8")
+            words = blob.split("\n") if blob else []
+            return cls(words, z["keys"], z["ptr"], z["ids"], int(z["max_distance"]))
+
+
+def load_or_build_index(
+    vocab: Dict[str, int], path: str = INDEX_PATH, max_distance: int = 2
+) -> DeletionIndex:
+    """Load the index saved at `path`, rebuilding (and re-saving) it when it
+    is missing, built from another vocab, or for a smaller distance."""
+    words = list(vocab)
+    if Path(path).exists():
+        with np.load(path) as z:
+            fresh = int(z["digest"]) == vocab_digest(words)
+            fresh &= int(z["max_distance"]) >= max_distance
+        if fresh:
+            return DeletionIndex.load(path)
+    index = DeletionIndex.build(words, max_distance)
+    try:
+        index.save(path)
+    except OSError as e:
+        print(f"[deletion_index] không lưu được {path}: {e}")
+    return index
+
+
+if __name__ == "__main__":
+    from src.autocorrect.core.generate_candidate import load_vocab
+
+    index = DeletionIndex.build(load_vocab())
+    index.save()
+    print(f"Đã lưu deletion index: {INDEX_PATH} ({len(index):,} từ, {len(index.keys):,} khoá)")
@@ -0,0 +1,391 @@
+"""Levenshtein distance for the autocorrect core.
+
+Callers only care whether a word is within a small `max_distance`, so
+`bounded_distance` fills just the diagonal band of the DP table and gives up
+once a whole row exceeds the bound. `LengthBuckets` packs the vocab by word
+length into (n, L) code point arrays and runs Myers' bit-parallel algorithm
+over a whole bucket at once (one uint64 bit vector per word).
+
+`weighted_distance` is a Damerau-Levenshtein (adjacent transpositions) whose
+costs come from `KeyboardCosts` tables: cheaper missing-diacritic and
+neighbouring-key substitutions, cheaper leftover Telex keys.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import math, unicodedata
+
+import numpy as np
+
+_NO_IDS = np.zeros(0, dtype=np.int64)
+
+VI_LETTERS = (
+    "abcdefghijklmnopqrstuvwxyzđ"
+    "àáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọ"
+    "ôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵ"
+)
+QWERTY_ROWS = ("qwertyuiop", "asdfghjkl", "zxcvbnm")
+# tone keys (sắc, huyền, hỏi, ngã, nặng) and w (ă, ơ, ư): typed after the vowel
+TELEX_MODIFIERS = "sfrxjw"
+_VOWEL_BASES = set("aeiouy")
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Full Levenshtein distance (two DP rows)."""
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def bounded_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance if it is at most `max_distance`, else
+    ``max_distance + 1``.
+
+    A common prefix and suffix are stripped first; then only cells with
+    ``|i - j| <= max_distance`` are computed, stopping at the first row
+    whose band is all above the bound.
+    """
+    k = max_distance
+    big = k + 1
+    if abs(len(a) - len(b)) > k:
+        return big
+    n, s = min(len(a), len(b)), 0
+    while s < n and a[s] == b[s]:
+        s += 1
+    e = 0
+    while e < n - s and a[-1 - e] == b[-1 - e]:
+        e += 1
+    a, b = a[s : len(a) - e], b[s : len(b) - e]
+    if len(a) > len(b):
+        a, b = b, a
+    lb = len(b)
+    if not a:
+        return lb if lb <= k else big
+
+    prev = list(range(lb + 1))
+    for i, ca in enumerate(a, 1):
+        lo = i - k if i > k else 1
+        hi = i + k if i + k < lb else lb
+        # cells outside the band keep stale values; the next row reads only
+        # [lo, hi + 1], and hi + 1 is reset below
+        cur = prev[:]
+        left = i if lo == 1 else big
+        cur[lo - 1] = left
+        best = left
+        for j in range(lo, hi + 1):
+            v = prev[j - 1] + (ca != b[j - 1])
+            t = prev[j] + 1
+            if t < v:
+                v = t
+            t = left + 1
+            if t < v:
+                v = t
+            cur[j] = left = v
+            if v < best:
+                best = v
+        if hi < lb:
+            cur[hi + 1] = big
+        if best > k:
+            return big
+        prev = cur
+    return prev[lb] if prev[lb] <= k else big
+
+
+def myers_many(query: str, codes: np.ndarray) -> np.ndarray:
+    """Levenshtein distance from `query` (at most 64 chars) to every row of
+    `codes`, an (n, L) array of code points (words of one length L).
+
+    Myers/Hyyrö bit-parallel DP: column j of the table is kept as vertical
+    +1/-1 bit vectors over the query positions, so each text character costs
+    a handful of uint64 operations for the whole bucket.
+    """
+    m = len(query)
+    n, L = codes.shape
+    if m == 0 or L == 0:
+        return np.full(n, m + L, dtype=np.int64)
+    if m > 64:
+        raise ValueError("myers_many: query longer than 64 chars")
+    chars = sorted(set(query))
+    uq = np.array([ord(c) for c in chars], dtype=codes.dtype)
+    peq = np.zeros(len(chars) + 1, dtype=np.uint64)  # last slot: char not in query
+    for i, c in enumerate(query):
+        peq[chars.index(c)] |= np.uint64(1 << i)
+    pos = np.minimum(uq.searchsorted(codes), len(uq) - 1)
+    eq_all = peq[np.where(uq[pos] == codes, pos, len(chars))]
+
+    mask = np.uint64((1 << m) - 1)
+    top = np.uint64(1 << (m - 1))
+    one = np.uint64(1)
+    pv = np.full(n, mask, dtype=np.uint64)
+    mv = np.zeros(n, dtype=np.uint64)
+    score = np.full(n, m, dtype=np.int64)
+    for j in range(L):
+        eq = eq_all[:, j]
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        score += (ph & top) != 0
+        score -= (mh & top) != 0
+        # row 0 is D[0][j] = j: every horizontal delta there is +1
+        ph = ((ph << one) | one) & mask
+        mh = (mh << one) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def _base(c: str) -> str:
+    """Letter without tone and vowel marks; đ counts as d."""
+    return "d" if c == "đ" else unicodedata.normalize("NFD", c)[0]
+
+
+def _marks(c: str) -> set:
+    return {"đ"} if c == "đ" else set(unicodedata.normalize("NFD", c)[1:])
+
+
+def _qwerty_neighbours() -> Dict[str, set]:
+    pos = {c: (r, i) for r, row in enumerate(QWERTY_ROWS) for i, c in enumerate(row)}
+    near: Dict[str, set] = {c: set() for c in pos}
+    for c, (r, i) in pos.items():
+        for d, (r2, i2) in pos.items():
+            # same row next to each other, or touching in the row above/below
+            # (rows are staggered by about half a key)
+            if d != c and ((r2 == r and abs(i2 - i) == 1) or (abs(r2 - r) == 1 and i2 - i in (r - r2, 0))):
+                near[c].add(d)
+    return near
+
+
+class KeyboardCosts:
+    """Edit costs for Vietnamese typed with Telex on a QWERTY keyboard,
+    precomputed as tables over small char ids (unknown chars share the
+    last id and cost 1 everywhere).
+
+    - substituting letters with the same base where one only lacks some of
+      the other's marks (e/ê/ế, d/đ; not ế/ề): `diacritic`
+    - substituting letters whose bases are neighbouring keys: `adjacent`
+    - deleting/inserting a Telex modifier key after a vowel: `modifier`
+    - deleting/inserting a letter repeating the previous base (Telex aa, dd,
+      ee, oo): `doubled`
+    - swapping two adjacent letters: `transpose`
+    """
+
+    def __init__(
+        self,
+        letters: str = VI_LETTERS,
+        diacritic: float = 0.6,
+        adjacent: float = 0.8,
+        modifier: float = 0.5,
+        doubled: float = 0.5,
+        transpose: float = 1.0,
+    ):
+        self.letters = letters
+        self.ids = {c: i for i, c in enumerate(letters)}
+        self.unknown = len(letters)
+        self.modifier, self.doubled, self.transpose = modifier, doubled, transpose
+        size = len(letters) + 1
+
+        bases = [_base(c) for c in letters] + [None]
+        near = _qwerty_neighbours()
+        self.base = [self.ids.get(b, self.unknown) if b else self.unknown for b in bases]
+        self.is_vowel = [b in _VOWEL_BASES for b in bases]
+        self.is_modifier = [c in TELEX_MODIFIERS for c in letters] + [False]
+        self.sub = [[1.0] * size for _ in range(size)]
+        marks = [_marks(c) for c in letters]
+        for i, bi in enumerate(bases[:-1]):
+            for j, bj in enumerate(bases[:-1]):
+                if i == j:
+                    self.sub[i][j] = 0.0
+                elif bi == bj:
+                    if marks[i] <= marks[j] or marks[j] <= marks[i]:
+                        self.sub[i][j] = diacritic
+                elif bj in near.get(bi, ()):
+                    self.sub[i][j] = adjacent
+
+        # numpy copies for `weighted_many`; `table` maps code points to ids,
+        # its last slot catching every code point past the alphabet
+        self.table = np.full(max(map(ord, letters)) + 2, self.unknown, dtype=np.int64)
+        self.table[[ord(c) for c in letters]] = np.arange(len(letters))
+        self.sub_np = np.array(self.sub)
+        self.base_np = np.array(self.base)
+        self.vowel_np = np.array(self.is_vowel)
+        self.modifier_np = np.array(self.is_modifier)
+
+    def encode(self, word: str) -> List[int]:
+        return [self.ids.get(c, self.unknown) for c in word]
+
+    def encode_codes(self, codes: np.ndarray) -> np.ndarray:
+        """`encode` for words packed as code points (see `LengthBuckets`)."""
+        return self.table[np.minimum(codes, len(self.table) - 1)]
+
+    def indel(self, ids: Sequence[int]) -> List[float]:
+        """Cost of deleting (or inserting) each char of a word in place."""
+        out, seen_vowel = [], False
+        for k, c in enumerate(ids):
+            if seen_vowel and self.is_modifier[c]:
+                out.append(self.modifier)
+            elif k and c != self.unknown and self.base[ids[k - 1]] == self.base[c]:
+                out.append(self.doubled)
+            else:
+                out.append(1.0)
+            seen_vowel |= self.is_vowel[c]
+        return out
+
+    def indel_many(self, ids: np.ndarray) -> np.ndarray:
+        """`indel` for an (n, L) array of encoded words."""
+        vowel = self.vowel_np[ids]
+        seen = np.zeros_like(vowel)
+        seen[:, 1:] = np.logical_or.accumulate(vowel, axis=1)[:, :-1]
+        base = self.base_np[ids]
+        doubled = np.zeros_like(vowel)
+        doubled[:, 1:] = (base[:, 1:] == base[:, :-1]) & (ids[:, 1:] != self.unknown)
+        out = np.where(doubled, self.doubled, 1.0)
+        return np.where(seen & self.modifier_np[ids], self.modifier, out)
+
+
+KEYBOARD_COSTS = KeyboardCosts()
+
+Word = Union[str, Sequence[int]]
+
+
+def weighted_distance(
+    a: Word, b: Word, costs: KeyboardCosts = KEYBOARD_COSTS, max_cost: float = math.inf
+) -> float:
+    """Weighted Damerau-Levenshtein (optimal string alignment) distance from
+    `a` to `b`, strings or `costs`-encoded ids; `math.inf` once every cell
+    of a row is above `max_cost`."""
+    ia = costs.encode(a) if isinstance(a, str) else a
+    ib = costs.encode(b) if isinstance(b, str) else b
+    da, db = costs.indel(ia), costs.indel(ib)
+    sub, tr = costs.sub, costs.transpose
+    prev2: List[float] = []
+    prev = [0.0]
+    for x in db:
+        prev.append(prev[-1] + x)
+    for i, ca in enumerate(ia, 1):
+        row, d = sub[ca], da[i - 1]
+        cur = [prev[0] + d]
+        best = cur[0]
+        for j, cb in enumerate(ib, 1):
+            v = prev[j - 1] + row[cb]
+            t = prev[j] + d
+            if t < v:
+                v = t
+            t = cur[j - 1] + db[j - 1]
+            if t < v:
+                v = t
+            if i > 1 and j > 1 and ca != cb and ca == ib[j - 2] and ia[i - 2] == cb:
+                t = prev2[j - 2] + tr
+                if t < v:
+                    v = t
+            cur.append(v)
+            if v < best:
+                best = v
+        if best > max_cost:
+            return math.inf
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def weighted_many(query: str, codes: np.ndarray, costs: KeyboardCosts = KEYBOARD_COSTS) -> np.ndarray:
+    """`weighted_distance` from `query` to each row of an (n, L) array of
+    code points, the DP run once over all rows."""
+    ia = costs.encode(query)
+    ib = costs.encode_codes(codes)
+    n, L = ib.shape
+    da, db = costs.indel(ia), costs.indel_many(ib)
+    prev = np.zeros((n, L + 1))
+    np.cumsum(db, axis=1, out=prev[:, 1:])
+    prev2 = prev
+    for i, ca in enumerate(ia, 1):
+        sub = costs.sub_np[ca][ib]
+        d = da[i - 1]
+        if i > 1 and L > 1:
+            # OSA swap: query "..xy" against candidate "..yx"
+            swap = (ib[:, :-1] == ca) & (ib[:, 1:] == ia[i - 2]) & (ca != ia[i - 2])
+        cur = np.empty_like(prev)
+        cur[:, 0] = prev[:, 0] + d
+        for j in range(1, L + 1):
+            v = np.minimum(prev[:, j - 1] + sub[:, j - 1], prev[:, j] + d)
+            np.minimum(v, cur[:, j - 1] + db[:, j - 1], out=v)
+            if i > 1 and j > 1:
+                v = np.where(swap[:, j - 2], np.minimum(v, prev2[:, j - 2] + costs.transpose), v)
+            cur[:, j] = v
+        prev2, prev = prev, cur
+    return prev[:, L]
+
+
+class LengthBuckets:
+    """Words grouped by length, each group packed as an (n, L) uint32 array
+    of code points for `myers_many`. Ids are positions in `words`."""
+
+    def __init__(self, words: List[str]):
+        self.words = words
+        self.lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        self.ids: Dict[int, np.ndarray] = {}
+        self.codes: Dict[int, np.ndarray] = {}
+        self.row = np.zeros(len(words), dtype=np.int64)  # position in its bucket
+        for L in np.unique(self.lengths).tolist():
+            ids = np.flatnonzero(self.lengths == L)
+            raw = "".join(words[i] for i in ids.tolist()).encode("utf-32-le")
+            self.ids[L] = ids
+            self.codes[L] = np.frombuffer(raw, dtype=np.uint32).reshape(len(ids), L)
+            self.row[ids] = np.arange(len(ids))
+
+    def within(
+        self, word: str, max_distance: int, ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, distances), ids ascending, of the words (all of them, or just
+        `ids`) within `max_distance` of `word`."""
+        if ids is not None:
+            ids = np.asarray(ids, dtype=np.int64)
+            lens = self.lengths[ids]
+        out_ids, out_d = [], []
+        for L in range(max(0, len(word) - max_distance), len(word) + max_distance + 1):
+            if L not in self.ids:
+                continue
+            if ids is None:
+                sel, codes = self.ids[L], self.codes[L]
+            else:
+                sel = ids[lens == L]
+                if not len(sel):
+                    continue
+                codes = self.codes[L][self.row[sel]]
+            if len(word) <= 64:
+                d = myers_many(word, codes)
+            else:
+                d = np.array([bounded_distance(word, self.words[i], max_distance) for i in sel.tolist()])
+            hit = d <= max_distance
+            out_ids.append(sel[hit])
+            out_d.append(d[hit])
+        if not out_ids:
+            return _NO_IDS, _NO_IDS
+        found, dist = np.concatenate(out_ids), np.concatenate(out_d)
+        order = np.argsort(found, kind="stable")
+        return found[order], dist[order]
+
+    def reweigh(
+        self, word: str, found: np.ndarray, dist: np.ndarray, costs: Optional[KeyboardCosts]
+    ) -> List[Tuple[str, float]]:
+        """(word, distance) pairs for `within` results, with the distance
+        recomputed by `weighted_distance` when `costs` is given."""
+        if costs is None:
+            return [(self.words[i], d) for i, d in zip(found.tolist(), dist.tolist())]
+        lens = self.lengths[found]
+        w = np.zeros(len(found))
+        for L in np.unique(lens).tolist():
+            sel = lens == L
+            w[sel] = weighted_many(word, self.codes[L][self.row[found[sel]]], costs)
+        return [(self.words[i], x) for i, x in zip(found.tolist(), w.tolist())]
+
+    def lookup(
+        self, word: str, max_distance: int, costs: Optional[KeyboardCosts] = None
+    ) -> List[Tuple[str, float]]:
+        """(word, distance) within `max_distance`, in `words` order."""
+        found, dist = self.within(word, max_distance)
+        return self.reweigh(word, found, dist, costs)
@@ -1,54 +1,84 @@
-from pathlib import Path
-import csv
-
-
-def load_vocab(path="data/autocorrect/processed/vocab.csv", min_freq=1):
-    vocab = {}
-    with open(path, encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for word, freq in reader:
-            freq = int(freq)
-            if freq >= min_freq:
-                vocab[word] = freq
-    return vocab
-
-
-def edit_distance(a: str, b: str) -> int:
-    la, lb = len(a), len(b)
-    dp = [[0] * (lb + 1) for _ in range(la + 1)]
-    for i in range(la + 1):
-        dp[i][0] = i
-    for j in range(lb + 1):
-        dp[0][j] = j
-    for i in range(1, la + 1):
-        for j in range(1, lb + 1):
-            cost = 0 if a[i - 1] == b[j - 1] else 1
-            dp[i][j] = min(
-                dp[i - 1][j] + 1,
-                dp[i][j - 1] + 1,
-                dp[i - 1][j - 1] + cost,
-            )
-    return dp[la][lb]
-
-
-def generate_candidates(word: str, vocab: dict, max_distance=2, top_k=5):
-    cands = []
-    for v, freq in vocab.items():
+import heapq, math
+from typing import Callable, List, NamedTuple, Optional
+from src.autocorrect.core.distance import bounded_distance, edit_distance, weighted_distance
+from src.autocorrect.core.resources import load_vocab
+
+# score(distance, frequency) of a candidate; higher is better
+Score = Callable[[float, int], float]
+
+
+class Candidate(NamedTuple):
+    word: str
+    distance: float  # edits, or the weighted distance when ranked with costs
+    freq: int
+    prior: float  # log(freq + 1)
+    score: float
+
+
+def within_distance(word: str, vocab: dict, max_distance=2, index=None, costs=None):
+    """(v, distance) for the words of `vocab` within `max_distance`, in vocab
+    order; looked up in `index` (a DeletionIndex) when given, else scanned.
+
+    With `costs` (a KeyboardCosts) the words are still those within
+    `max_distance` edits, but the distance returned is `weighted_distance`.
+    """
+    if index is not None and max_distance <= index.max_distance:
+        return [(v, d) for v, d in index.lookup(word, max_distance, costs) if v in vocab]
+    out = []
+    for v in vocab:
         if abs(len(v) - len(word)) > max_distance:
             continue
-        dist = edit_distance(word, v)
+        dist = bounded_distance(word, v, max_distance)
         if dist <= max_distance:
-            score = (max_distance - dist) * 1_000_000 + freq
-            cands.append((v, score))
-    cands.sort(key=lambda x: x[1], reverse=True)
-    return [w for w, _ in cands[:top_k]]
+            out.append((v, dist if costs is None else weighted_distance(word, v, costs)))
+    return out
+
+
+def select_candidates(
+    word: str,
+    vocab: dict,
+    score: Score,
+    max_distance=2,
+    top_k: Optional[int] = 5,
+    index=None,
+    costs=None,
+) -> List[Candidate]:
+    """The `top_k` words within `max_distance` of `word` by `score`, best
+    first, ties in vocab order (all of them if `top_k` is None). The matches
+    are collected first; `heapq.nlargest` then picks the best positions, so
+    only the winners become Candidates."""
+    found = within_distance(word, vocab, max_distance, index, costs)
+    scores = [score(dist, vocab[v]) for v, dist in found]
+    if top_k is None:
+        best = sorted(range(len(found)), key=scores.__getitem__, reverse=True)
+    else:
+        best = heapq.nlargest(top_k, range(len(found)), key=scores.__getitem__)
+    out = []
+    for i in best:
+        v, dist = found[i]
+        out.append(Candidate(v, dist, vocab[v], math.log(vocab[v] + 1), scores[i]))
+    return out
+
+
+def generate_scored(word: str, vocab: dict, max_distance=2, top_k=5, index=None, costs=None) -> List[Candidate]:
+    """Closest first, then most frequent."""
+    return select_candidates(
+        word, vocab, lambda dist, freq: (max_distance - dist) * 1_000_000 + freq, max_distance, top_k, index, costs
+    )
+
+
+def generate_candidates(word: str, vocab: dict, max_distance=2, top_k=5, index=None, costs=None):
+    return [c.word for c in generate_scored(word, vocab, max_distance, top_k, index, costs)]
 
 
 if __name__ == "__main__":
-    vocab = load_vocab()
+    from src.autocorrect.core import resources
+
+    vocab = resources.vocab()
+    index = resources.deletion_index()
     while True:
         w = input("Từ cần sửa: ").strip().lower()
         if not w:
             break
-        c = generate_candidates(w, vocab)
+        c = generate_candidates(w, vocab, index=index)
         print("→ Gợi ý:", c)
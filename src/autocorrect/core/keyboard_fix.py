@@ -1,42 +1,14 @@
 import re
-from src.autocorrect.core.rank_candidates import load_vocab, rank_candidates
-
-VOCAB = load_vocab()
-TELEX_MAP = {
-    "aw": "ă",
-    "aa": "â",
-    "dd": "đ",
-    "ee": "ê",
-    "oo": "ô",
-    "ow": "ơ",
-    "uw": "ư",
-}
-
-TONE_MAP = {
-    "s": 1,  # sắc
-    "f": 2,  # huyền
-    "r": 3,  # hỏi
-    "x": 4,  # ngã
-    "j": 5,  # nặng
-}
+from collections.abc import Mapping
+from typing import Dict, Set
+from src.autocorrect.core.distance import KEYBOARD_COSTS
+from src.autocorrect.core.rank_candidates import rank_scored
+from src.autocorrect.core.resources import REGISTRY, deletion_index, vocab
+from src.autocorrect.core.telex import compose
 
 
 def telex_to_vietnamese(word: str) -> str:
-    tone = None
-    tones = [ch for ch in word if ch in TONE_MAP]
-
-    if tones:
-        tone = TONE_MAP[tones[-1]]
-        for t in tones:
-            word = word.replace(t, "")
-
-    for k, v in TELEX_MAP.items():
-        word = word.replace(k, v)
-
-    if tone:
-        word = add_vietnamese_tone(word, tone)
-
-    return word
+    return compose(word, "telex")
 
 
 def is_valid_vi_word(word: str, vocab: dict) -> bool:
@@ -45,30 +17,6 @@ def is_valid_vi_word(word: str, vocab: dict) -> bool:
     return bool(re.search(r"[aeiouyăâêôơưáàảãạéèẻẽẹóòỏõọúùủũụíìỉĩịýỳỷỹỵ]", word))
 
 
-def add_vietnamese_tone(word, tone):
-    vowels = {
-        "a": ["á", "à", "ả", "ã", "ạ"],
-        "ă": ["ắ", "ằ", "ẳ", "ẵ", "ặ"],
-        "â": ["ấ", "ầ", "ẩ", "ẫ", "ậ"],
-        "e": ["é", "è", "ẻ", "ẽ", "ẹ"],
-        "ê": ["ế", "ề", "ể", "ễ", "ệ"],
-        "i": ["í", "ì", "ỉ", "ĩ", "ị"],
-        "o": ["ó", "ò", "ỏ", "õ", "ọ"],
-        "ô": ["ố", "ồ", "ổ", "ỗ", "ộ"],
-        "ơ": ["ớ", "ờ", "ở", "ỡ", "ợ"],
-        "u": ["ú", "ù", "ủ", "ũ", "ụ"],
-        "ư": ["ứ", "ừ", "ử", "ữ", "ự"],
-        "y": ["ý", "ỳ", "ỷ", "ỹ", "ỵ"],
-    }
-
-    for v in reversed(range(len(word))):
-        ch = word[v]
-        if ch in vowels:
-            word = word[:v] + vowels[ch][tone - 1] + word[v + 1 :]
-            break
-    return word
-
-
 VOWELS = "aeiouyăâêôơưáàảãạéèẻẽẹóòỏõọúùủũụíìỉĩịýỳỷỹỵ"
 
 
@@ -76,17 +24,64 @@ def share_vowel(a, b):
     return any(v in a and v in b for v in VOWELS)
 
 
+def build_vowel_index(vocab: dict) -> Dict[str, Set[str]]:
+    """Each char of VOWELS -> the set of vocab words containing it."""
+    index: Dict[str, Set[str]] = {}
+    for w in vocab:
+        for v in set(w).intersection(VOWELS):
+            index.setdefault(v, set()).add(w)
+    return index
+
+
+REGISTRY.register("vowel_index", lambda: build_vowel_index(vocab()), deps=("vocab",))
+
+
+class SharedVowelVocab(Mapping):
+    """The vocab words that `share_vowel` with `word`, as a read-only view:
+    membership is tested against the "vowel_index" sets of the word's
+    vowels, so only the candidates `rank_candidates` pulls from the
+    deletion index are ever checked."""
+
+    def __init__(self, word: str):
+        self.vocab = vocab()
+        index = REGISTRY.get("vowel_index")
+        self.postings = [index[v] for v in set(word).intersection(VOWELS) if v in index]
+
+    def __contains__(self, w) -> bool:
+        return any(w in p for p in self.postings)
+
+    def __getitem__(self, w) -> int:
+        if w not in self:
+            raise KeyError(w)
+        return self.vocab[w]
+
+    def __iter__(self):
+        return (w for w in self.vocab if w in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        return bool(self.postings)
+
+
 def fix_common_keyboard(word: str) -> str:
-    w_fixed = telex_to_vietnamese(word)
-    if w_fixed in VOCAB:
+    return fix_composed(telex_to_vietnamese(word), word)
+
+
+def fix_composed(w_fixed: str, word: str) -> str:
+    """`fix_common_keyboard` for a `word` already composed to `w_fixed`."""
+    if w_fixed in vocab():
         return w_fixed
 
-    filtered_vocab = {w: f for w, f in VOCAB.items() if share_vowel(w_fixed, w)}
+    filtered_vocab = SharedVowelVocab(w_fixed)
 
     if not filtered_vocab:
-        filtered_vocab = VOCAB
+        filtered_vocab = vocab()
 
-    candidates = rank_candidates(w_fixed, filtered_vocab, max_distance=2, top_k=1)
+    candidates = rank_scored(
+        w_fixed, filtered_vocab, max_distance=2, top_k=1, index=deletion_index(), costs=KEYBOARD_COSTS
+    )
     if candidates:
-        return candidates[0]
+        return candidates[0].word
     return word
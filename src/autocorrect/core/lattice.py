@@ -0,0 +1,115 @@
+"""Sentence-level autocorrect: a candidate lattice decoded with the n-gram LM.
+
+Every token gets a column of options - the token as typed, its Telex
+composition, the per-token correction and the nearest vocab words - each
+with a keyboard-weighted distance. A beam search (Viterbi over the LM's
+n-1 word histories: hypotheses ending in the same history are merged)
+picks the line maximising
+
+    sum of  LM_WEIGHT * log P(word | history)  -  DIST_WEIGHT * distance
+
+`LiveDecoder` keeps the beam after every token of the previous call, so a
+keystroke only re-decodes from the first token that changed (usually the
+last one); latency does not grow with the length of the message.
+"""
+from __future__ import annotations
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from src.autocorrect.core.distance import KEYBOARD_COSTS, weighted_distance
+from src.autocorrect.core.hard_rules import apply_hard_rules
+from src.autocorrect.core.normalize_vi import normalize_vi
+from src.autocorrect.core.rank_candidates import rank_scored
+from src.autocorrect.core.realtime import autocorrect_token_live
+from src.autocorrect.core.resources import deletion_index, vocab
+from src.autocorrect.core.telex import compose
+
+LM_WEIGHT = 1.0
+DIST_WEIGHT = 6.0
+BEAM = 8
+COLUMN = 6  # vocab candidates per token
+
+# (text shown, LM tokens, distance)
+Option = Tuple[str, Tuple[str, ...], float]
+# (score, LM history, previous hypothesis, option text)
+Hyp = Tuple[float, Tuple[str, ...], Optional["Hyp"], str]
+
+
+def column(token: str) -> List[Option]:
+    """The options of one typed token."""
+    w = normalize_vi(token).strip()
+    if not w:
+        return [(token, (token,), 0.0)]
+    composed = compose(w)
+    opts = {token: ((w,), 0.0), composed: ((composed,), 0.0)}
+    fixed = autocorrect_token_live(token)
+    if fixed not in opts:
+        # teencode rules are trusted as they are
+        dist = 0.0 if apply_hard_rules(w) == fixed else weighted_distance(composed, fixed)
+        opts[fixed] = (tuple(fixed.split()), dist)
+    for c in rank_scored(composed, vocab(), 2, COLUMN, index=deletion_index(), costs=KEYBOARD_COSTS):
+        if c.word not in opts:
+            opts[c.word] = ((c.word,), c.distance)
+    return [(text, toks, d) for text, (toks, d) in opts.items()]
+
+
+def start(lm) -> List[Hyp]:
+    return [(0.0, ("<s>",) * (lm.n - 1), None, "")]
+
+
+def step(lm, beam: List[Hyp], options: Sequence[Option], width: int = BEAM) -> List[Hyp]:
+    """Extend every hypothesis of `beam` by every option; keep the best per
+    history, then the best `width`."""
+    keep = lm.n - 1
+    best = {}
+    for hyp in beam:
+        score, hist = hyp[0], hyp[1]
+        firsts = lm.logprobs(hist, [toks[0] for _, toks, _ in options])
+        for (text, toks, dist), lp in zip(options, firsts.tolist()):
+            s = score + LM_WEIGHT * lp - DIST_WEIGHT * dist
+            h = (hist + toks[:1])[-keep:]
+            for t in toks[1:]:  # multi-word rule output
+                s += LM_WEIGHT * float(lm.logprobs(h, [t])[0])
+                h = (h + (t,))[-keep:]
+            if h not in best or s > best[h][0]:
+                best[h] = (s, h, hyp, text)
+    return sorted(best.values(), key=lambda x: -x[0])[:width]
+
+
+def best_path(beam: List[Hyp]) -> List[str]:
+    out = []
+    hyp = max(beam, key=lambda x: x[0])
+    while hyp is not None and hyp[2] is not None:
+        out.append(hyp[3])
+        hyp = hyp[2]
+    return out[::-1]
+
+
+def decode_line(text: str, lm, width: int = BEAM) -> str:
+    beam = start(lm)
+    for token in text.split():
+        beam = step(lm, beam, column(token), width)
+    return " ".join(best_path(beam))
+
+
+class LiveDecoder:
+    """`decode_line` for a line typed one key at a time. Not thread-safe:
+    callers sharing one hold `lock`."""
+
+    def __init__(self, lm, width: int = BEAM):
+        self.lm = lm
+        self.width = width
+        self.lock = threading.Lock()
+        self.tokens: List[str] = []
+        self.beams: List[List[Hyp]] = [start(lm)]
+
+    def update(self, text: str) -> str:
+        tokens = text.split()
+        p = 0
+        while p < min(len(tokens), len(self.tokens)) and tokens[p] == self.tokens[p]:
+            p += 1
+        del self.beams[p + 1 :]
+        for token in tokens[p:]:
+            self.beams.append(step(self.lm, self.beams[-1], column(token), self.width))
+        self.tokens = tokens
+        return " ".join(best_path(self.beams[-1]))
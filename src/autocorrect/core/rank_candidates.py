@@ -1,39 +1,48 @@
 import math
-from pathlib import Path
-import csv
-from src.autocorrect.core.generate_candidate import edit_distance
+from typing import List
+from src.autocorrect.core.generate_candidate import (
+    Candidate,
+    Score,
+    edit_distance,
+    select_candidates,
+    within_distance,
+)
+from src.autocorrect.core.resources import load_vocab
 
+# log-frequency traded per unit of weighted distance when ranking with `costs`
+CHANNEL_WEIGHT = 8.0
 
-def load_vocab(path="data/autocorrect/processed/vocab.csv", min_freq=1):
-    vocab = {}
-    with open(path, encoding="utf-8") as f:
-        reader = csv.reader(f)
-        for w, c in reader:
-            c = int(c)
-            if c >= min_freq:
-                vocab[w] = c
-    return vocab
 
+def rank_score(max_distance=2, costs=None) -> Score:
+    if costs is None:
+        return lambda dist, freq: (max_distance - dist + 1) * math.log(freq + 1)
+    return lambda dist, freq: math.log(freq + 1) - CHANNEL_WEIGHT * dist
 
-def rank_candidates(word, vocab, max_distance=2, top_k=5):
-    candidates = []
-    for v, freq in vocab.items():
-        if abs(len(v) - len(word)) > max_distance:
-            continue
-        dist = edit_distance(word, v)
-        if dist <= max_distance:
-            score = (max_distance - dist + 1) * math.log(freq + 1)
-            candidates.append((v, score))
 
-    candidates.sort(key=lambda x: x[1], reverse=True)
-    return [w for w, _ in candidates[:top_k]]
+def rank_scored(word, vocab, max_distance=2, top_k=5, index=None, costs=None) -> List[Candidate]:
+    """`rank_candidates` with each word's distance, frequency and scores."""
+    return select_candidates(word, vocab, rank_score(max_distance, costs), max_distance, top_k, index, costs)
+
+
+def rank_candidates(word, vocab, max_distance=2, top_k=5, index=None, costs=None):
+    """`index` (a DeletionIndex built over `vocab` or a superset, in the same
+    order) replaces the full vocab scan; `vocab` still decides which words
+    count, so it may be a filtered subset.
+
+    With `costs` (a KeyboardCosts) candidates are ranked noisy-channel
+    style, log-frequency minus CHANNEL_WEIGHT times the keyboard/Telex
+    weighted distance."""
+    return [c.word for c in rank_scored(word, vocab, max_distance, top_k, index, costs)]
 
 
 if __name__ == "__main__":
-    vocab = load_vocab()
+    from src.autocorrect.core import resources
+
+    vocab = resources.vocab()
+    index = resources.deletion_index()
     while True:
         w = input("Từ cần sửa: ").strip().lower()
         if not w:
             break
-        c = rank_candidates(w, vocab)
+        c = rank_candidates(w, vocab, index=index)
         print("→ Gợi ý:", c)
@@ -1,6 +1,11 @@
+import sys
+from typing import Optional
 from src.autocorrect.core.normalize_vi import normalize_vi
-from src.autocorrect.core.hard_rules import apply_hard_rules
-from src.autocorrect.core.keyboard_fix import fix_common_keyboard
+from src.autocorrect.core.correction_cache import CorrectionCache, correction_version
+from src.autocorrect.core.hard_rules import RULES_PATH, apply_hard_rules
+from src.autocorrect.core.keyboard_fix import fix_composed
+from src.autocorrect.core.resources import REGISTRY, lm, vocab
+from src.autocorrect.core.telex import compose
 
 
 KEEP_IF_USER_TYPED = {
@@ -19,12 +24,34 @@ KEEP_IF_USER_TYPED = {
 }
 
 
-def autocorrect_token_live(token: str) -> str:
-    if not token:
-        return token
+CACHE_SIZE = 50_000
+_cache_args = {"maxsize": CACHE_SIZE, "path": None}
+
+
+def _new_cache() -> CorrectionCache:
+    # the vocab, the rules and the code of the correction steps
+    code = [sys.modules[m].__file__ for m in (__name__, fix_composed.__module__, compose.__module__)]
+    return CorrectionCache(version=correction_version(vocab(), RULES_PATH, *code), **_cache_args)
+
+
+# rebuilt (empty, new version) whenever the vocab changes
+REGISTRY.register("correction_cache", _new_cache, deps=("vocab",))
+
+
+def configure_cache(maxsize: int = CACHE_SIZE, path: Optional[str] = None) -> CorrectionCache:
+    """(Re)create the correction cache; `path` adds the SQLite tier shared
+    by every process using the same file."""
+    _cache_args.update(maxsize=maxsize, path=path)
+    REGISTRY.reset("correction_cache")
+    return correction_cache()
 
-    w = normalize_vi(token).strip()
 
+def correction_cache() -> CorrectionCache:
+    return REGISTRY.get("correction_cache")
+
+
+def _correct(w: str) -> Optional[str]:
+    """Correction of a normalized token, None when it is left as typed."""
     if w in KEEP_IF_USER_TYPED:
         return w
 
@@ -32,12 +59,29 @@ def autocorrect_token_live(token: str) -> str:
     if fixed != w:
         return fixed
 
-    kb = fix_common_keyboard(w)
+    # composed from the prefix the previous keystroke left in the cache
+    kb = fix_composed(compose(w), w)
     if kb != w:
         return kb
 
-    return token
+    return None
+
+
+def autocorrect_token_live(token: str) -> str:
+    if not token:
+        return token
+
+    w = normalize_vi(token).strip()
+    fixed = correction_cache().get_or_compute(w, _correct)
+    return token if fixed is None else fixed
+
 
+def autocorrect_line_live(text: str, decode: bool = False) -> str:
+    """Per-token correction; with `decode`, the whole line is decoded with
+    the n-gram LM (see lattice) when one is available."""
+    model = lm() if decode else None
+    if model is not None:
+        from src.autocorrect.core.lattice import decode_line
 
-def autocorrect_line_live(text: str) -> str:
+        return decode_line(text, model)
     return " ".join(autocorrect_token_live(t) for t in text.split())
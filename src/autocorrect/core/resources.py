@@ -0,0 +1,180 @@
+"""Process-wide autocorrect artifacts, loaded on first use.
+
+Each resource is registered with a loader and the resources it is built
+from. `REGISTRY.get` runs the loader once per process (under a lock) and
+every module reads that same object, so importing the correctors costs
+nothing until a word is corrected. `REGISTRY.set` injects a value - a test
+fixture, a smaller vocab - and drops everything built from the old one.
+"""
+from __future__ import annotations
+import csv, sys, threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Set, Tuple
+
+VOCAB_PATH = "data/autocorrect/processed/vocab.csv"
+BIGRAM_PATH = "data/autocorrect/processed/bigram.csv"
+BIGRAM_BIN_PATH = "data/autocorrect/processed/bigram.bin"
+CORPUS_PATH = "data/autocorrect/processed/corpus_vi_clean.txt"
+LM_PATH = "models/ngram.bin"
+
+
+def load_vocab(path=VOCAB_PATH, min_freq=1):
+    vocab = {}
+    with open(path, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for word, freq in reader:
+            freq = int(freq)
+            if freq >= min_freq:
+                vocab[sys.intern(word)] = freq
+    return vocab
+
+
+def build_bigram_model(corpus_path=CORPUS_PATH, output_path=BIGRAM_PATH):
+    """bigram.csv (most frequent first), for tools reading the CSV; the
+    corrector reads the binary table (bigram_store)."""
+    import numpy as np
+
+    from src.autocorrect.core.bigram_store import count_pairs
+
+    print("Đang đọc corpus...")
+    words, keys, counts = count_pairs(corpus_path)
+    with open(output_path, "w", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for i in np.argsort(-counts, kind="stable").tolist():
+            k = int(keys[i])
+            writer.writerow([words[k >> 32], words[k & 0xFFFFFFFF], int(counts[i])])
+    print(f"Đã lưu bigram model: {output_path} ({len(keys):,} cặp từ)")
+
+
+def load_bigram(path=BIGRAM_PATH, min_freq=2):
+    """{w1: {w2: count}} from bigram.csv; words are interned, so the many
+    copies of a word across the inner dicts (and the vocab) share one
+    string. The registry serves the mapped table instead."""
+    bigram = {}
+    with open(path, encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) != 3:
+                continue
+            w1, w2, c = row
+            c = int(c)
+            if c >= min_freq:
+                bigram.setdefault(sys.intern(w1), {})[sys.intern(w2)] = c
+    return bigram
+
+
+class Registry:
+    def __init__(self):
+        self._loaders: Dict[str, Tuple[Callable[[], Any], Tuple[str, ...]]] = {}
+        self._values: Dict[str, Any] = {}
+        self.injected: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader: Callable[[], Any], deps: Iterable[str] = ()) -> None:
+        """`loader()` builds `name`, reading `deps` through this registry."""
+        self._loaders[name] = (loader, tuple(deps))
+
+    def get(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._values:
+                self._values[name] = self._loaders[name][0]()
+            return self._values[name]
+
+    def set(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.reset(name)
+            self._values[name] = value
+            self.injected.add(name)
+
+    def reset(self, *names: str) -> None:
+        """Forget `names` (everything if none) and what was built from them;
+        they are loaded again on next use."""
+        with self._lock:
+            todo = list(names or self._values)
+            while todo:
+                name = todo.pop()
+                self._values.pop(name, None)
+                self.injected.discard(name)
+                todo += [n for n, (_, deps) in self._loaders.items() if name in deps and n in self._values]
+
+    def loaded(self, name: str) -> bool:
+        return name in self._values
+
+
+REGISTRY = Registry()
+
+
+def _bigram():
+    from src.autocorrect.core.bigram_store import BigramTable, build_bigram_table, convert_csv
+
+    if not Path(BIGRAM_BIN_PATH).exists():
+        if Path(CORPUS_PATH).exists():
+            build_bigram_table(CORPUS_PATH, BIGRAM_BIN_PATH)
+        else:
+            convert_csv(BIGRAM_PATH, BIGRAM_BIN_PATH)
+    return BigramTable.load(BIGRAM_BIN_PATH, min_freq=2)
+
+
+def _deletion_index():
+    from src.autocorrect.core.deletion_index import DeletionIndex, load_or_build_index
+
+    if "vocab" in REGISTRY.injected:
+        # a fixture: never overwrite the index saved for the real vocab
+        return DeletionIndex.build(vocab())
+    return load_or_build_index(vocab())
+
+
+def _lm():
+    """The autosuggest n-gram LM, if one has been trained; None otherwise
+    (line decoding then falls back to per-token correction)."""
+    if not Path(LM_PATH).exists():
+        return None
+    from src.autosuggest.lm.ngram import NGramLM
+
+    return NGramLM.load(LM_PATH)
+
+
+REGISTRY.register("vocab", load_vocab)
+REGISTRY.register("bigram", _bigram)
+REGISTRY.register("deletion_index", _deletion_index, deps=("vocab",))
+REGISTRY.register("lm", _lm)
+
+
+def _scorer():
+    from src.autocorrect.core.context_scorer import BigramScorer, LMScorer
+
+    model = lm()
+    if model is not None:
+        return LMScorer(model)
+    return BigramScorer(bigram(), vocab())
+
+
+# the bigram table is only loaded when there is no LM
+REGISTRY.register("scorer", _scorer, deps=("lm", "bigram", "vocab"))
+
+
+def vocab() -> Dict[str, int]:
+    return REGISTRY.get("vocab")
+
+
+def bigram():
+    """The corpus bigram counts: `bigram().count(prev, cand)`."""
+    return REGISTRY.get("bigram")
+
+
+def deletion_index():
+    return REGISTRY.get("deletion_index")
+
+
+def lm():
+    return REGISTRY.get("lm")
+
+
+def context_scorer():
+    """Scorer of candidates in context (context_scorer): the n-gram LM if
+    one is trained, else the corpus bigram counts."""
+    return REGISTRY.get("scorer")
@@ -0,0 +1,232 @@
+"""Incremental Telex / VNI composer.
+
+A `Composer` holds one syllable as onset, nucleus (vowels with their
+shape marks: ă â ê ô ơ ư), coda and tone, so every keystroke is a small
+table-driven transition instead of a rewrite of the whole token. Tone keys
+only count once the syllable has a vowel (the "x" of "xinh" stays a
+letter), and the tone is placed by the spelling rules, not on the last
+vowel. A key that cannot belong to a Vietnamese syllable, or a modifier
+typed twice ("ss", "aaa"), turns the composer raw: the rest of the token is
+kept as typed.
+
+`compose` caches the state of each composed key string, so live typing
+(each call one key longer) costs one transition. The cache is shared
+by every thread; states in it are never mutated, only copied.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# shaped vowel -> its forms for tone 0 (none), sắc, huyền, hỏi, ngã, nặng
+TONED = {
+    "a": "aáàảãạ",
+    "ă": "ăắằẳẵặ",
+    "â": "âấầẩẫậ",
+    "e": "eéèẻẽẹ",
+    "ê": "êếềểễệ",
+    "i": "iíìỉĩị",
+    "o": "oóòỏõọ",
+    "ô": "ôốồổỗộ",
+    "ơ": "ơớờởỡợ",
+    "u": "uúùủũụ",
+    "ư": "ưứừửữự",
+    "y": "yýỳỷỹỵ",
+}
+# any vowel as typed -> (shaped vowel, tone)
+VOWEL_OF: Dict[str, Tuple[str, int]] = {c: (v, t) for v, forms in TONED.items() for t, c in enumerate(forms)}
+BASE = {"ă": "a", "â": "a", "ê": "e", "ô": "o", "ơ": "o", "ư": "u"}
+CIRCUMFLEX = {"a": "â", "e": "ê", "o": "ô", "ă": "â"}
+HORN = {"o": "ơ", "u": "ư", "a": "ă"}  # Telex w: horn on o/u, breve on a
+BREVE = {"a": "ă", "â": "ă"}
+CODAS = ("c", "ch", "m", "n", "ng", "nh", "p", "t")
+_CODA_PREFIXES = {c[:k] for c in CODAS for k in range(1, len(c) + 1)}
+
+# key -> (action, argument); compiled once per input method
+TELEX = {
+    "s": ("tone", 1), "f": ("tone", 2), "r": ("tone", 3), "x": ("tone", 4), "j": ("tone", 5),
+    "z": ("tone", 0), "w": ("horn", None), "d": ("stroke", None),
+    "a": ("circumflex", "a"), "e": ("circumflex", "e"), "o": ("circumflex", "o"),
+}
+VNI = {
+    "1": ("tone", 1), "2": ("tone", 2), "3": ("tone", 3), "4": ("tone", 4), "5": ("tone", 5),
+    "0": ("tone", 0), "6": ("circumflex", None), "7": ("horn", None), "8": ("breve", None),
+    "9": ("stroke", None),
+}
+METHODS = {"telex": TELEX, "vni": VNI}
+
+
+class Composer:
+    __slots__ = ("keymap", "onset", "nucleus", "coda", "tone", "tone_at", "raw", "new_style")
+
+    def __init__(self, method: str = "telex", new_style: bool = False):
+        self.keymap = METHODS[method]
+        self.onset = ""
+        self.nucleus: List[str] = []
+        self.coda = ""
+        self.tone = 0
+        self.tone_at: Optional[int] = None  # vowel the tone was typed on, if precomposed
+        self.raw: Optional[str] = None  # text once composing has given up
+        self.new_style = new_style  # hoà / thuý rather than hòa / thúy
+
+    def copy(self) -> "Composer":
+        c = Composer.__new__(Composer)
+        for k in Composer.__slots__:
+            setattr(c, k, getattr(self, k))
+        c.nucleus = list(self.nucleus)
+        return c
+
+    def feed(self, key: str) -> "Composer":
+        if self.raw is not None:
+            self.raw += key
+            return self
+        action = self.keymap.get(key)
+        if action is None or not self._modify(key, *action):
+            self._letter(key)
+        return self
+
+    def _modify(self, key: str, action: str, arg) -> bool:
+        """Apply `key` as a modifier; False when it is just a letter here."""
+        if action == "stroke":
+            if self.onset == "d":
+                self.onset = "đ"
+                return True
+            if self.onset == "đ":
+                self.onset = "d"
+                return self._give_up(key)
+            return False
+        if not self.nucleus:
+            if key == "w" and not self.coda:  # Telex w alone is ư
+                self.nucleus.append("ư")
+                return True
+            return False
+        if action == "tone":
+            if arg == 0 and not self.tone:
+                return False
+            if arg and arg == self.tone:
+                self.tone = 0
+                return self._give_up(key)
+            self.tone, self.tone_at = arg, None
+            return True
+        if action == "circumflex":
+            if arg is None:  # VNI 6
+                return self._shape(key, CIRCUMFLEX, {"â", "ê", "ô"})
+            table = {arg: CIRCUMFLEX[arg]}
+            if arg in ("a", "o"):  # aw + a -> â, ow + o -> ô
+                table[HORN[arg]] = CIRCUMFLEX[arg]
+            return self._shape(key, table, {CIRCUMFLEX[arg]})
+        if action == "horn":
+            n = self.nucleus
+            for i in range(len(n) - 1):
+                # u + o take the horn together: ươ
+                if n[i] in ("u", "ư") and n[i + 1] in ("o", "ơ"):
+                    if n[i] == "ư" and n[i + 1] == "ơ":
+                        n[i], n[i + 1] = "u", "o"
+                        return self._give_up(key)
+                    n[i], n[i + 1] = "ư", "ơ"
+                    return True
+            table = {**HORN, "ô": "ơ", "â": "ă"} if key == "w" else {"o": "ơ", "u": "ư", "ô": "ơ"}
+            return self._shape(key, table, {"ơ", "ư", "ă"} if key == "w" else {"ơ", "ư"})
+        if action == "breve":
+            return self._shape(key, BREVE, {"ă"})
+        return False
+
+    def _shape(self, key: str, table: Dict[str, str], marked: set) -> bool:
+        """Mark the last nucleus vowel `table` applies to. Typed again on a
+        vowel that already has the mark, the mark is dropped and the key
+        kept as a letter."""
+        for i in range(len(self.nucleus) - 1, -1, -1):
+            v = self.nucleus[i]
+            if v in table:
+                self.nucleus[i] = table[v]
+                return True
+            if v in marked:
+                self.nucleus[i] = BASE[v]
+                return self._give_up(key)
+        if key == "w" and not self.coda:  # Telex w alone is ư
+            self.nucleus.append("ư")
+            return True
+        return False
+
+    def _letter(self, key: str) -> None:
+        vowel = VOWEL_OF.get(key)
+        if vowel is not None:
+            if self.coda:
+                self._give_up(key)
+                return
+            v, tone = vowel
+            if tone:
+                self.tone, self.tone_at = tone, len(self.nucleus)
+            self.nucleus.append(v)
+        elif not key.isalpha() and key != "đ":
+            self._give_up(key)
+        elif not self.nucleus:
+            self.onset += key
+        elif self.coda + key in _CODA_PREFIXES:
+            self.coda += key
+        else:
+            self._give_up(key)
+
+    def _give_up(self, key: str) -> bool:
+        self.raw = self._render() + key
+        return True
+
+    def _tone_index(self) -> int:
+        n = self.nucleus
+        if self.tone_at is not None:
+            return self.tone_at
+        # "qu" and "gi" (before another vowel) belong to the onset
+        glide = (self.onset == "q" and n[0] == "u") or (self.onset == "g" and n[0] == "i")
+        skip = 1 if glide and len(n) > 1 else 0
+        shaped = [i for i in range(skip, len(n)) if n[i] in BASE]
+        if shaped:
+            return shaped[-1]
+        k = len(n) - skip
+        if k == 3:
+            return skip + 1
+        if k == 2:
+            pair = n[skip] + n[skip + 1]
+            if self.coda or (self.new_style and pair in ("oa", "oe", "uy")):
+                return skip + 1
+            return skip
+        return skip
+
+    def _render(self) -> str:
+        vowels = list(self.nucleus)
+        if self.tone and vowels:
+            i = self._tone_index()
+            vowels[i] = TONED[vowels[i]][self.tone]
+        return self.onset + "".join(vowels) + self.coda
+
+    @property
+    def text(self) -> str:
+        return self.raw if self.raw is not None else self._render()
+
+
+_CACHE: "OrderedDict[Tuple[str, str], Composer]" = OrderedDict()
+CACHE_SIZE = 4096
+_LOCK = threading.Lock()
+
+
+def compose(keys: str, method: str = "telex") -> str:
+    """Text typed by `keys` with the given input method, resumed from the
+    longest prefix composed before."""
+    cut, state = 0, None
+    with _LOCK:
+        for cut in range(len(keys), 0, -1):
+            state = _CACHE.get((method, keys[:cut]))
+            if state is not None:
+                _CACHE.move_to_end((method, keys[:cut]))
+                break
+        else:
+            cut = 0
+    state = state.copy() if state is not None else Composer(method)
+    for k in range(cut, len(keys)):
+        state.feed(keys[k])
+    if len(keys) > cut:
+        done = state.copy()
+        with _LOCK:
+            _CACHE[(method, keys)] = done
+            if len(_CACHE) > CACHE_SIZE:
+                _CACHE.popitem(last=False)
+    return state.text
@@ -0,0 +1,86 @@
+import argparse, json, random, resource, statistics, subprocess, sys, time
+from src.autocorrect.core.bigram_store import BIGRAM_BIN_PATH, BigramTable, count_pairs
+from src.autocorrect.core.resources import BIGRAM_PATH, CORPUS_PATH, load_bigram
+
+
+def rss_mib() -> tuple:
+    """(private, file-backed) resident MiB. Mapped file pages are shared by
+    every worker through the page cache; only the private part is paid per
+    process. Linux only: elsewhere the peak RSS counts as private."""
+    out = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("RssAnon:", "RssFile:")):
+                    out[line.split(":")[0]] = int(line.split()[1]) / 1024
+        return out["RssAnon"], out["RssFile"]
+    except (OSError, KeyError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 0.0
+
+
+def child(mode: str, args) -> dict:
+    """One measurement, in a fresh process so RSS is not shared."""
+    before = rss_mib()
+    t0 = time.perf_counter()
+    if mode == "csv":
+        d = load_bigram(args.csv)
+        count = lambda a, b: d.get(a, {}).get(b, 0)
+    elif mode == "bin":
+        t = BigramTable.load(args.bin, min_freq=2)
+        count = t.count
+    else:  # build: streaming count of the corpus
+        count_pairs(args.corpus)
+        return {"s": time.perf_counter() - t0, "peak": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    load_s = time.perf_counter() - t0
+    loaded = rss_mib()
+
+    rng = random.Random(0)
+    t = BigramTable.load(args.bin)
+    pairs = []
+    for j in (rng.randrange(len(t)) for _ in range(args.samples)):
+        a = int(t.ptr.searchsorted(j, side="right")) - 1
+        pairs.append((t.word(a), t.word(int(t.nxt[j]))))
+    lat = []
+    for a, b in pairs:
+        t1 = time.perf_counter()
+        count(a, b)
+        lat.append((time.perf_counter() - t1) * 1e6)
+    after = rss_mib()
+    return {
+        "s": load_s,
+        "anon": loaded[0] - before[0],
+        "anon_after": after[0] - before[0],
+        "file_after": after[1] - before[1],
+        "us": statistics.median(lat),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bigram counts: CSV nested dicts vs mapped binary table.")
+    ap.add_argument("--csv", default=BIGRAM_PATH)
+    ap.add_argument("--bin", default=BIGRAM_BIN_PATH)
+    ap.add_argument("--corpus", default=CORPUS_PATH)
+    ap.add_argument("--samples", type=int, default=20000)
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        print(json.dumps(child(args.child, args)))
+        return
+
+    def run(mode: str) -> dict:
+        cmd = [sys.executable, "-m", __spec__.name, "--child", mode] + sys.argv[1:]
+        return json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.splitlines()[-1])
+
+    csv_r, bin_r = run("csv"), run("bin")
+    for name, r in (("CSV dict", csv_r), ("bảng mmap", bin_r)):
+        print(
+            f"[{name}] nạp={r['s'] * 1000:.1f}ms | RSS riêng +{r['anon']:.1f} MiB"
+            f" (sau {args.samples:,} lần tra: riêng +{r['anon_after']:.1f}, file chung +{r['file_after']:.1f} MiB)"
+            f" | count p50={r['us']:.2f}µs"
+        )
+    build = run("build")
+    print(f"[đếm cặp từ corpus, streaming] {build['s']:.2f}s | RSS đỉnh={build['peak']:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse, random, statistics, time
+from typing import Callable, Dict, List, Tuple
+from src.autocorrect.core.bk_tree import BK_PATH, load_or_build_bktree
+from src.autocorrect.core.deletion_index import INDEX_PATH, load_or_build_index
+from src.autocorrect.core.distance import (
+    KEYBOARD_COSTS,
+    LengthBuckets,
+    _base,
+    _qwerty_neighbours,
+    bounded_distance,
+    edit_distance,
+)
+from src.autocorrect.core.generate_candidate import generate_candidates
+from src.autocorrect.core.rank_candidates import load_vocab, rank_candidates
+
+
+def misspell(word: str, edits: int, alphabet: str, rng: random.Random) -> str:
+    for _ in range(edits):
+        i = rng.randrange(len(word) + 1)
+        op = rng.choice("dis") if word else "i"
+        if op == "d" and i < len(word):
+            word = word[:i] + word[i + 1 :]
+        elif op == "s" and i < len(word):
+            word = word[:i] + rng.choice(alphabet) + word[i + 1 :]
+        else:
+            word = word[:i] + rng.choice(alphabet) + word[i:]
+    return word
+
+
+def build_queries(vocab: Dict[str, int], samples: int, seed: int = 0) -> List[str]:
+    """Vocab words (drawn by frequency) with 0-2 random character edits."""
+    rng = random.Random(seed)
+    words = list(vocab)
+    alphabet = "".join(sorted({c for w in words for c in w}))
+    picks = rng.choices(words, weights=[vocab[w] for w in words], k=samples)
+    return [misspell(w, rng.choice((0, 1, 1, 2)), alphabet, rng) for w in picks]
+
+
+def keyboard_typo(word: str, rng: random.Random) -> str:
+    """One typing slip: a lost/changed diacritic, a neighbouring key, or a
+    Telex key left after the vowel (tone key or repeated letter)."""
+    near = _qwerty_neighbours()
+    i = rng.randrange(len(word))
+    c, base = word[i], _base(word[i])
+    op = rng.choice("dkt")
+    if op == "d" and c != base:
+        return word[:i] + base + word[i + 1 :]
+    if op == "k" and near.get(base):
+        return word[:i] + rng.choice(sorted(near[base])) + word[i + 1 :]
+    if base in "aeiouy":
+        return word[: i + 1] + rng.choice("sfrxj" + base) + word[i + 1 :]
+    return word[:i] + word[i + 1 :]
+
+
+def latency(fn: Callable[[str], List[str]], queries: List[str]) -> Tuple[float, float, list]:
+    lat_ms, out = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        out.append(fn(q))
+        lat_ms.append((time.perf_counter() - t0) * 1000.0)
+    lat_ms.sort()
+    return statistics.median(lat_ms), lat_ms[int(0.95 * len(lat_ms)) - 1], out
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Latency of autocorrect candidate generation: vocab scan vs deletion index vs BK-tree."
+    )
+    ap.add_argument("--vocab", default="data/autocorrect/processed/vocab.csv")
+    ap.add_argument("--index", default=INDEX_PATH)
+    ap.add_argument("--bktree", default=BK_PATH)
+    ap.add_argument("--samples", type=int, default=300)
+    ap.add_argument("--max-distance", type=int, default=2)
+    ap.add_argument("--top-k", type=int, default=5)
+    args = ap.parse_args()
+
+    vocab = load_vocab(args.vocab)
+    t0 = time.perf_counter()
+    index = load_or_build_index(vocab, args.index, args.max_distance)
+    index_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    bk = load_or_build_bktree(vocab, args.bktree)
+    bk_s = time.perf_counter() - t0
+    mib = lambda *arrs: sum(a.nbytes for a in arrs) / 2**20
+    print(f"[vocab] {len(vocab):,} từ")
+    print(
+        f"[deletion index] load/build {index_s:.2f}s | "
+        f"{mib(index.keys, index.ptr, index.ids):.1f} MiB (+ buckets)"
+    )
+    print(f"[bk-tree] load/build {bk_s:.2f}s | {bk.nbytes() / 2**20:.1f} MiB (+ buckets)")
+
+    queries = build_queries(vocab, args.samples)
+    d, k = args.max_distance, args.top_k
+
+    # every vocab word within d, by each distance engine
+    words = list(vocab)
+    buckets = LengthBuckets(words)
+
+    def scan(dist):
+        def within(w):
+            return [(v, x) for v in words if abs(len(v) - len(w)) <= d for x in [dist(w, v)] if x <= d]
+
+        return within
+
+    engines = (
+        ("full DP", scan(edit_distance)),
+        ("bounded DP", scan(lambda a, b: bounded_distance(a, b, d))),
+        ("myers buckets", lambda w: buckets.lookup(w, d)),
+        ("deletion index", lambda w: index.lookup(w, d)),
+        ("bk-tree", lambda w: bk.query(w, d, top_k=None)),
+    )
+    ref = None
+    for name, fn in engines:
+        p50, p95, out = latency(fn, queries)
+        ref = out if ref is None else ref
+        diff = sum(sorted(a) != sorted(b) for a, b in zip(ref, out))
+        print(f"[{name}] p50={p50:.3f}ms p95={p95:.3f}ms | khác nhau={diff}")
+
+    # top-1 on keyboard/Telex slips, plain vs weighted distance
+    rng = random.Random(1)
+    picks = rng.choices(words, weights=[vocab[w] for w in words], k=args.samples)
+    slips = [(w, keyboard_typo(w, rng)) for w in picks if w]
+    slips = [(w, t) for w, t in slips if t not in vocab]
+    for name, costs in (("edit", None), ("keyboard", KEYBOARD_COSTS)):
+        p50, p95, out = latency(
+            lambda t: rank_candidates(t, vocab, max_distance=d, top_k=1, index=index, costs=costs),
+            [t for _, t in slips],
+        )
+        hit = sum(o[:1] == [w] for (w, _), o in zip(slips, out))
+        print(
+            f"[top-1 / {name}] n={len(slips)} | đúng={hit / max(1, len(slips)):.1%}"
+            f" | p50={p50:.3f}ms p95={p95:.3f}ms"
+        )
+
+    for name, fn in (("rank_candidates", rank_candidates), ("generate_candidates", generate_candidates)):
+        scan = latency(lambda w: fn(w, vocab, max_distance=d, top_k=k), queries)
+        fast = latency(lambda w: fn(w, vocab, max_distance=d, top_k=k, index=index), queries)
+        diff = sum(a != b for a, b in zip(scan[2], fast[2]))
+        print(
+            f"[{name}] n={len(queries)} | scan p50={scan[0]:.2f}ms p95={scan[1]:.2f}ms"
+            f" | index p50={fast[0]:.3f}ms p95={fast[1]:.3f}ms | khác nhau={diff}"
+        )
+        if fn is rank_candidates:
+            tree = latency(lambda w: [v for v, _ in bk.query(w, d, top_k=k)], queries)
+            diff = sum(a != b for a, b in zip(scan[2], tree[2]))
+            print(
+                f"[{name} / bk-tree top-k] p50={tree[0]:.3f}ms p95={tree[1]:.3f}ms"
+                f" | khác nhau={diff}"
+            )
+
+
+if __name__ == "__main__":
+    main()
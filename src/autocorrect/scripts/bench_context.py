@@ -0,0 +1,53 @@
+import argparse, random, time
+from src.autocorrect.core.bigram_store import BIGRAM_BIN_PATH, BigramTable
+from src.autocorrect.core.context_corrector import correct_sentence
+from src.autocorrect.core.context_scorer import BigramScorer, LMScorer
+from src.autocorrect.core.distance import KEYBOARD_COSTS
+from src.autocorrect.core.resources import deletion_index, vocab
+from src.autocorrect.scripts.bench_candidates import keyboard_typo
+from src.autocorrect.scripts.bench_lattice import word_accuracy
+from src.autosuggest.lm.ngram import NGramLM
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="correct_sentence scored by the corpus bigram counts vs the n-gram LM."
+    )
+    ap.add_argument("--model", default="models/ngram.bin")
+    ap.add_argument("--bigram", default=BIGRAM_BIN_PATH)
+    ap.add_argument("--text", default="data/split/valid.txt", help="clean sentences seen by neither model")
+    ap.add_argument("--samples", type=int, default=400)
+    ap.add_argument("--typo_rate", type=float, default=0.2)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    lm = NGramLM.load(args.model)
+    t1 = time.perf_counter()
+    bigram = BigramTable.load(args.bigram, min_freq=2)
+    t2 = time.perf_counter()
+    print(f"[nạp] LM {(t1 - t0) * 1000:.1f}ms | bigram {(t2 - t1) * 1000:.1f}ms (không cần khi đã có LM)")
+
+    rng = random.Random(0)
+    clean = []
+    with open(args.text, encoding="utf-8") as f:
+        for line in f:
+            if line.split():
+                clean.append(line.lower().split())
+            if len(clean) >= args.samples:
+                break
+    noisy = [
+        [keyboard_typo(t, rng) if t.isalpha() and rng.random() < args.typo_rate else t for t in toks]
+        for toks in clean
+    ]
+
+    words, index = vocab(), deletion_index()
+    for name, scorer in (("bigram", BigramScorer(bigram, words)), ("LM", LMScorer(lm))):
+        for label, costs in (("Levenshtein", None), ("bàn phím", KEYBOARD_COSTS)):
+            acc = word_accuracy(
+                lambda s: correct_sentence(s, words, index=index, costs=costs, scorer=scorer), clean, noisy
+            )
+            print(f"[{name:>6} | {label:<11}] đúng={acc[0]:.2%} | từ gõ sai được sửa={acc[1]:.2%}")
+
+
+if __name__ == "__main__":
+    main()
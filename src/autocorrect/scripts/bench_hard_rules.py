@@ -0,0 +1,53 @@
+import argparse, random, re, string
+from src.autocorrect.core.hard_rules import ALL_RULES, PATTERNS, apply_hard_rules
+from src.autocorrect.scripts.bench_candidates import latency
+
+
+def apply_hard_rules_chain(word: str) -> str:
+    """apply_hard_rules as it was: one re.match per pattern, in order."""
+    w = word.lower().strip()
+    if w in ALL_RULES:
+        return ALL_RULES[w]
+    for pattern, fixed in PATTERNS:
+        if re.match(pattern, w):
+            return fixed
+    return word
+
+
+def build_tokens(samples: int, vocab_path: str, seed: int = 0):
+    """Rule keys, rule prefixes with random tails, vocab words and noise."""
+    rng = random.Random(seed)
+    tokens = list(ALL_RULES)
+    stems = [re.sub(r"[^a-zđ]", "", p[1:].split("[")[0]) for p, _ in PATTERNS]
+    for _ in range(samples):
+        tail = "".join(rng.choices(string.ascii_lowercase, k=rng.randrange(4)))
+        tokens.append(rng.choice(stems) + tail)
+        tokens.append("".join(rng.choices(string.ascii_lowercase, k=rng.randrange(1, 8))))
+    try:
+        with open(vocab_path, encoding="utf-8") as f:
+            words = [line.split(",")[0] for line in f]
+        tokens += rng.sample(words, min(samples, len(words)))
+    except OSError:
+        pass
+    return tokens
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-token cost of apply_hard_rules: regex chain vs compiled matcher.")
+    ap.add_argument("--vocab", default="data/autocorrect/processed/vocab.csv")
+    ap.add_argument("--samples", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    tokens = build_tokens(args.samples, args.vocab) * args.repeat
+    print(f"[rules] {len(ALL_RULES)} luật tra trực tiếp | {len(PATTERNS)} mẫu regex | {len(tokens):,} token")
+    chain = latency(apply_hard_rules_chain, tokens)
+    fast = latency(apply_hard_rules, tokens)
+    diff = sum(a != b for a, b in zip(chain[2], fast[2]))
+    us = lambda r: f"p50={r[0] * 1000:.2f}us p95={r[1] * 1000:.2f}us"
+    print(f"[chuỗi re.match] {us(chain)}")
+    print(f"[matcher gộp] {us(fast)} | khác nhau={diff}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse, random
+from src.autocorrect.core import keyboard_fix as kf
+from src.autocorrect.core.resources import REGISTRY, deletion_index, vocab
+from src.autocorrect.scripts.bench_candidates import build_queries, keyboard_typo, latency
+
+
+def fix_common_keyboard_copy(word: str) -> str:
+    """fix_common_keyboard as it was: a share_vowel pass over the vocab per call."""
+    w_fixed = kf.telex_to_vietnamese(word)
+    if w_fixed in vocab():
+        return w_fixed
+    filtered_vocab = {w: f for w, f in vocab().items() if kf.share_vowel(w_fixed, w)}
+    if not filtered_vocab:
+        filtered_vocab = vocab()
+    candidates = kf.rank_candidates(
+        w_fixed, filtered_vocab, max_distance=2, top_k=1, index=deletion_index(), costs=kf.KEYBOARD_COSTS
+    )
+    if candidates:
+        return candidates[0]
+    return word
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Latency of fix_common_keyboard: per-call vocab filtering vs vowel index."
+    )
+    ap.add_argument("--samples", type=int, default=300)
+    args = ap.parse_args()
+
+    words = vocab()
+    rng = random.Random(1)
+    picks = [w for w in rng.choices(list(words), weights=list(words.values()), k=args.samples) if w]
+    queries = build_queries(words, args.samples) + [keyboard_typo(w, rng) for w in picks]
+    queries = [q for q in queries if q]
+    print(f"[vocab] {len(words):,} từ | {len(REGISTRY.get('vowel_index'))} nguyên âm trong index")
+
+    copy = latency(fix_common_keyboard_copy, queries)
+    index = latency(kf.fix_common_keyboard, queries)
+    diff = sum(a != b for a, b in zip(copy[2], index[2]))
+    print(f"[lọc từng lần] n={len(queries)} | p50={copy[0]:.2f}ms p95={copy[1]:.2f}ms")
+    print(f"[vowel index] n={len(queries)} | p50={index[0]:.3f}ms p95={index[1]:.3f}ms | khác nhau={diff}")
+
+
+if __name__ == "__main__":
+    main()
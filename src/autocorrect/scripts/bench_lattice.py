@@ -0,0 +1,79 @@
+import argparse, random, statistics, time
+from src.autocorrect.core.lattice import LiveDecoder, decode_line
+from src.autocorrect.core.realtime import autocorrect_line_live
+from src.autocorrect.scripts.bench_candidates import keyboard_typo
+from src.autosuggest.lm.ngram import NGramLM
+
+
+def word_accuracy(fn, clean, noisy):
+    """(all words, words that had a typo) restored exactly."""
+    ok = tot = typo_ok = typo = 0
+    for ref, nz in zip(clean, noisy):
+        out = fn(" ".join(nz)).split()
+        if len(out) != len(ref):
+            tot += len(ref)
+            continue
+        for c, n, o in zip(ref, nz, out):
+            tot += 1
+            ok += c == o
+            if c != n:
+                typo += 1
+                typo_ok += c == o
+    return ok / max(1, tot), typo_ok / max(1, typo)
+
+
+def keystrokes(line: str, step):
+    """Latency (ms) of every keystroke of `line`."""
+    lat = []
+    for i in range(1, len(line) + 1):
+        t0 = time.perf_counter()
+        step(line[:i])
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return lat
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Line autocorrect: per-token vs LM lattice (accuracy), full vs incremental decoding (latency)."
+    )
+    ap.add_argument("--model", default="models/ngram.bin")
+    ap.add_argument("--text", default="data/split/valid.txt", help="clean sentences not seen by the LM")
+    ap.add_argument("--samples", type=int, default=200)
+    ap.add_argument("--typo_rate", type=float, default=0.2)
+    args = ap.parse_args()
+
+    lm = NGramLM.load(args.model)
+    rng = random.Random(0)
+    clean = []
+    with open(args.text, encoding="utf-8") as f:
+        for line in f:
+            if line.split():
+                clean.append(line.split())
+            if len(clean) >= args.samples:
+                break
+    noisy = [
+        [keyboard_typo(t, rng) if t.isalpha() and rng.random() < args.typo_rate else t for t in toks]
+        for toks in clean
+    ]
+
+    tok = word_accuracy(autocorrect_line_live, clean, noisy)
+    lat = word_accuracy(lambda s: decode_line(s, lm), clean, noisy)
+    print(f"[từng token] đúng={tok[0]:.2%} | từ gõ sai được sửa={tok[1]:.2%}")
+    print(f"[lattice LM] đúng={lat[0]:.2%} | từ gõ sai được sửa={lat[1]:.2%}")
+
+    for n in (5, 10, 20, 40):
+        lines = [" ".join((nz * (n // len(nz) + 1))[:n]) for nz in noisy[:10] if nz]
+        full, inc = [], []
+        for line in lines:
+            full += keystrokes(line, lambda s: decode_line(s, lm))
+            dec = LiveDecoder(lm)
+            inc += keystrokes(line, dec.update)
+        print(
+            f"[{n:>2} từ] giải lại cả dòng p50={statistics.median(full):.2f}ms"
+            f" | tăng dần p50={statistics.median(inc):.2f}ms"
+            f" p95={statistics.quantiles(inc, n=20)[18]:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
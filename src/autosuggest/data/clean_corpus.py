@@ -1,7 +1,14 @@
 import argparse
+import collections
+import multiprocessing
+import os
 import regex as re
 import unicodedata
 import pathlib
+from typing import List, Optional, Tuple
+
+import numpy as np
+import xxhash
 
 VIETNAMESE_CHARS = "ăâđêôơưáàảãạấầẩẫậắằẳẵặéèẻẽẹếềểễệóòỏõọốồổỗộớờởỡợúùủũụứừửữựíìỉĩịýỳỷỹỵ"
 
@@ -10,28 +17,33 @@ def is_vietnamese_word(word: str) -> bool:
     return any(ch in VIETNAMESE_CHARS for ch in word.lower())
 
 
+def clean_line(line: str, min_len=3, max_len=60, only_vi=False) -> Optional[str]:
+    """The cleaned sentence, or None when the line is filtered out."""
+    s = unicodedata.normalize("NFC", line).strip().lower()
+    if not s:
+        return None
+
+    toks = re.findall(r"\w+|[^\w\s]", s)
+
+    # lọc độ dài
+    if not (min_len <= len(toks) <= max_len):
+        return None
+
+    if only_vi:
+        vi_count = sum(is_vietnamese_word(t) for t in toks)
+        if vi_count / len(toks) < 0.5:
+            return None
+    return s
+
+
 def clean_corpus(input_path, output_path, min_len=3, max_len=60, only_vi=False):
     out = []
     seen = set()
 
     with open(input_path, "r", encoding="utf-8", errors="ignore") as f:
         for line in f:
-            s = unicodedata.normalize("NFC", line).strip().lower()
-            if not s:
-                continue
-
-            toks = re.findall(r"\w+|[^\w\s]", s)
-
-            # lọc độ dài
-            if not (min_len <= len(toks) <= max_len):
-                continue
-
-            if only_vi:
-                vi_count = sum(is_vietnamese_word(t) for t in toks)
-                if vi_count / len(toks) < 0.5:
-                    continue
-
-            if s not in seen:
+            s = clean_line(line, min_len, max_len, only_vi)
+            if s is not None and s not in seen:
                 seen.add(s)
                 out.append(s)
 
@@ -39,6 +51,100 @@ def clean_corpus(input_path, output_path, min_len=3, max_len=60, only_vi=False):
     print(f"Done. Kept {len(out)} sentences. Saved to {output_path}")
 
 
+class Fingerprints:
+    """Set of 64-bit fingerprints as sorted numpy runs (8 bytes per entry).
+    Runs are merged like a binary counter, so there are O(log n) of them."""
+
+    def __init__(self):
+        self.runs: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self.runs)
+
+    def add(self, h: np.ndarray) -> np.ndarray:
+        """Mask of the entries of `h` seen for the first time (not before,
+        not earlier in `h`); they are added."""
+        new = np.zeros(len(h), dtype=bool)
+        new[np.unique(h, return_index=True)[1]] = True
+        for run in self.runs:
+            pos = np.minimum(run.searchsorted(h), len(run) - 1)
+            new &= run[pos] != h
+        if new.any():
+            self.runs.append(np.sort(h[new]))
+            while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+                last = self.runs.pop()
+                self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]))
+        return new
+
+
+def shard_offsets(path, shard_bytes: int) -> List[Tuple[int, int]]:
+    """Byte ranges of about `shard_bytes`, each starting on a line."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        while bounds[-1] < size:
+            f.seek(bounds[-1] + shard_bytes)
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def clean_shard(args) -> Tuple[List[str], np.ndarray]:
+    """Cleaned sentences of a byte range and their xxh64 fingerprints. The
+    text is split into lines as text mode does: at LF, CRLF and a lone CR."""
+    path, start, end, min_len, max_len, only_vi = args
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8", errors="ignore")
+    out = []
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        s = clean_line(line, min_len, max_len, only_vi)
+        if s is not None:
+            out.append(s)
+    h = np.fromiter((xxhash.xxh64_intdigest(s.encode("utf-8")) for s in out), dtype=np.uint64, count=len(out))
+    return out, h
+
+
+def clean_corpus_stream(
+    input_path, output_path, min_len=3, max_len=60, only_vi=False, workers=1, shard_bytes=16 << 20
+):
+    """`clean_corpus` in constant memory: shards of the input are cleaned in
+    `workers` processes, duplicates are dropped on 64-bit xxhash
+    fingerprints and the kept sentences are written as shards complete, in
+    input order. The output is byte-identical to `clean_corpus` (unless two
+    different sentences share a fingerprint: ~n^2 / 2^65 for n sentences)."""
+    jobs = (
+        (input_path, a, b, min_len, max_len, only_vi)
+        for a, b in shard_offsets(input_path, shard_bytes)
+    )
+    seen = Fingerprints()
+    kept = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+
+        def write(result):
+            nonlocal kept
+            sents, h = result
+            batch = [s for s, new in zip(sents, seen.add(h).tolist()) if new]
+            if batch:
+                out.write(("\n" if kept else "") + "\n".join(batch))
+                kept += len(batch)
+
+        if workers <= 1:
+            for job in jobs:
+                write(clean_shard(job))
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                # at most 2 shards per worker in flight: memory stays bounded
+                pending = collections.deque()
+                for job in jobs:
+                    pending.append(pool.apply_async(clean_shard, (job,)))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().get())
+                while pending:
+                    write(pending.popleft().get())
+    print(f"Done. Kept {kept} sentences. Saved to {output_path}")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Clean text corpus")
     parser.add_argument("--input", type=str, required=True, help="Input corpus file")
@@ -52,13 +158,31 @@ if __name__ == "__main__":
     parser.add_argument(
         "--only-vi", action="store_true", help="Keep only Vietnamese sentences"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Constant memory: shard the input, dedup on xxhash, write as it goes",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Cleaning processes (with --stream)"
+    )
 
     args = parser.parse_args()
 
-    clean_corpus(
-        args.input,
-        args.output,
-        min_len=args.min_len,
-        max_len=args.max_len,
-        only_vi=args.only_vi,
-    )
+    if args.stream:
+        clean_corpus_stream(
+            args.input,
+            args.output,
+            min_len=args.min_len,
+            max_len=args.max_len,
+            only_vi=args.only_vi,
+            workers=args.workers,
+        )
+    else:
+        clean_corpus(
+            args.input,
+            args.output,
+            min_len=args.min_len,
+            max_len=args.max_len,
+            only_vi=args.only_vi,
+        )
@@ -1,17 +1,22 @@
 import argparse, random, pathlib, re
 from typing import List, Tuple
 
+import xxhash
+
 
 def tokenize(s: str) -> List[str]:
     return re.findall(r"\w+|[^\w\s]", s, flags=re.UNICODE)
 
 
+def length_bin(s: str) -> int:
+    n = len(tokenize(s))
+    return 0 if n <= 5 else 1 if n <= 10 else 2 if n <= 20 else 3 if n <= 40 else 4
+
+
 def stratified_split(lines: List[str], ratios: Tuple[float, float, float], seed: int):
     bins = {0: [], 1: [], 2: [], 3: [], 4: []}
     for s in lines:
-        n = len(tokenize(s))
-        b = 0 if n <= 5 else 1 if n <= 10 else 2 if n <= 20 else 3 if n <= 40 else 4
-        bins[b].append(s)
+        bins[length_bin(s)].append(s)
 
     tr, va, te = [], [], []
     random.seed(seed)
@@ -35,6 +40,48 @@ def simple_split(lines: List[str], ratios: Tuple[float, float, float], seed: int
     return lines[:n_tr], lines[n_tr : n_tr + n_va], lines[n_tr + n_va :]
 
 
+def split_key(s: str) -> bytes:
+    """What a line's split is decided on: its lowercased words, so lines
+    differing only in case, spacing or punctuation land in the same split."""
+    return " ".join(re.findall(r"\w+", s.lower())).encode("utf-8")
+
+
+def hash_split(s: str, ratios: Tuple[float, float, float], seed: int) -> int:
+    """0/1/2 (train/valid/test) from a 64-bit xxhash of the line's key: the
+    same on every run and machine, and unchanged as the corpus grows."""
+    u = xxhash.xxh64_intdigest(split_key(s), seed) / 2**64
+    return 0 if u < ratios[0] else 1 if u < ratios[0] + ratios[1] else 2
+
+
+def stream_split(
+    inp: pathlib.Path,
+    outdir: pathlib.Path,
+    ratios: Tuple[float, float, float],
+    seed: int,
+) -> List[int]:
+    """One pass over `inp`, in constant memory: each line is appended to the
+    split its hash picks, whatever came before it. The hash does not depend
+    on the length, so every length bin is split at `ratios` too (up to
+    sampling noise); no stratification step is needed."""
+    written = [0, 0, 0]
+    names = ("train.txt", "valid.txt", "test.txt")
+    files = [open(outdir / name, "w", encoding="utf-8") for name in names]
+    try:
+        with open(inp, encoding="utf-8") as f:
+            for raw in f:
+                for s in raw.splitlines():
+                    s = s.strip()
+                    if not s:
+                        continue
+                    k = hash_split(s, ratios, seed)
+                    files[k].write(("\n" if written[k] else "") + s)
+                    written[k] += 1
+    finally:
+        for fh in files:
+            fh.close()
+    return written
+
+
 def main():
     ap = argparse.ArgumentParser(description="Split corpus into train/valid/test")
     ap.add_argument(
@@ -50,7 +97,12 @@ def main():
     ap.add_argument(
         "--stratify-by-length",
         action="store_true",
-        help="Bật chia theo độ dài câu để giữ phân phối",
+        help="Bật chia theo độ dài câu để giữ phân phối (--stream: hash đã chia đều mọi độ dài)",
+    )
+    ap.add_argument(
+        "--stream",
+        action="store_true",
+        help="Một lượt, bộ nhớ cố định: chia theo hash nội dung câu (seed = --seed)",
     )
     args = ap.parse_args()
 
@@ -61,11 +113,16 @@ def main():
     inp = pathlib.Path(args.input)
     outdir = pathlib.Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
+    ratios = (args.train, args.valid, args.test)
+
+    if args.stream:
+        n = stream_split(inp, outdir, ratios, args.seed)
+        print(f"Done. Train/Valid/Test = {n[0]}/{n[1]}/{n[2]} → {outdir}")
+        return
 
     lines = inp.read_text("utf-8").splitlines()
     lines = [s.strip() for s in lines if s.strip()]
 
-    ratios = (args.train, args.valid, args.test)
     if args.stratify_by_length:
         train, valid, test = stratified_split(lines, ratios, args.seed)
     else:
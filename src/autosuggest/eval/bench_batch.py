@@ -0,0 +1,41 @@
+import argparse, time
+from src.autosuggest.eval.bench_ngram import build_queries
+from src.autosuggest.lm.ngram import NGramLM
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Throughput of NGramLM.suggest_batch against one suggest() per query."
+    )
+    ap.add_argument("--model", default="models/ngram.bin")
+    ap.add_argument("--data", default="data/split/valid.txt")
+    ap.add_argument("--samples", type=int, default=4096)
+    ap.add_argument("--sizes", default="1,4,16,64,256,1024")
+    ap.add_argument("--k", type=int, default=5)
+    args = ap.parse_args()
+
+    lm = NGramLM.load(args.model)
+    for prefix_chars in (0, 1, 2):
+        qs = build_queries(args.data, prefix_chars, args.samples)
+        ctxs = [c for c, _ in qs]
+        pres = [p for _, p in qs]
+
+        t0 = time.perf_counter()
+        ref = [lm.suggest(c, prefix=p, k=args.k) for c, p in qs]
+        loop_qps = len(qs) / (time.perf_counter() - t0)
+        print(f"[prefix={prefix_chars}] n={len(qs)} | loop {loop_qps:,.0f} q/s")
+
+        for size in [int(x) for x in args.sizes.split(",")]:
+            out = []
+            t0 = time.perf_counter()
+            for s in range(0, len(qs), size):
+                out += lm.suggest_batch(ctxs[s : s + size], pres[s : s + size], args.k)
+            qps = len(qs) / (time.perf_counter() - t0)
+            print(
+                f"  batch={size:<5d} {qps:,.0f} q/s | x{qps / loop_qps:.2f} "
+                f"| same={out == ref}"
+            )
+
+
+if __name__ == "__main__":
+    main()
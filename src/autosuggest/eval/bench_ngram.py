@@ -0,0 +1,71 @@
+import argparse, os, random, statistics, time, tracemalloc
+from typing import List, Optional, Tuple
+from src.autosuggest.lm.ngram import NGramLM, tok
+
+
+def build_queries(
+    path: str, prefix_chars: int, max_samples: int, seed: int = 0
+) -> List[Tuple[str, Optional[str]]]:
+    lines = [s for s in open(path, "r", encoding="utf-8").read().splitlines() if s]
+    random.seed(seed)
+    random.shuffle(lines)
+    qs = []
+    for s in lines[:max_samples]:
+        t = tok(s)
+        if len(t) < 2:
+            continue
+        target = t[-1]
+        prefix = target[:prefix_chars] if prefix_chars > 0 else None
+        qs.append((" ".join(t[:-1]), prefix))
+    return qs
+
+
+def measure_load(args) -> Tuple[NGramLM, float, int]:
+    """Return (model, seconds, traced bytes still held by the model)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    if args.train:
+        lm = NGramLM(n=args.n)
+        lm.fit_file(args.train)
+    else:
+        lm = NGramLM.load(args.model)
+    dt = time.perf_counter() - t0
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return lm, dt, held
+
+
+def latency(lm: NGramLM, queries, k: int) -> Tuple[float, float]:
+    lat_ms: List[float] = []
+    for ctx, prefix in queries:
+        t0 = time.perf_counter()
+        lm.suggest(ctx, prefix=prefix, k=k)
+        lat_ms.append((time.perf_counter() - t0) * 1000.0)
+    lat_ms.sort()
+    return statistics.median(lat_ms), lat_ms[int(0.95 * len(lat_ms)) - 1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark NGramLM memory and latency.")
+    ap.add_argument("--model", default="models/ngram.bin")
+    ap.add_argument("--train", default=None, help="fit on this corpus instead of --model")
+    ap.add_argument("--n", type=int, default=3)
+    ap.add_argument("--data", default="data/split/valid.txt")
+    ap.add_argument("--samples", type=int, default=2000)
+    ap.add_argument("--k", type=int, default=5)
+    args = ap.parse_args()
+
+    lm, load_s, held = measure_load(args)
+    what = f"fit {args.train}" if args.train else f"load {args.model}"
+    print(f"[{what}] {load_s:.2f}s | model heap={held / 2**20:.1f} MiB")
+    if not args.train and os.path.exists(args.model):
+        print(f"[file] {os.path.getsize(args.model) / 2**20:.1f} MiB on disk")
+
+    for prefix_chars in (0, 1, 2, 3):
+        qs = build_queries(args.data, prefix_chars, args.samples)
+        p50, p95 = latency(lm, qs, args.k)
+        print(f"[prefix={prefix_chars}] n={len(qs)} | p50={p50:.3f}ms | p95={p95:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
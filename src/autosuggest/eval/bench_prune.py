@@ -0,0 +1,53 @@
+import argparse, os, tempfile
+from typing import List, Tuple
+from src.autosuggest.eval.test_model import eval_file
+from src.autosuggest.lm.ngram import NGramLM
+
+
+def parse_settings(spec: str) -> List[Tuple[int, float, int]]:
+    """min_count:threshold:bits,... e.g. "1:0:0,2:0:0,1:1e-6:8"."""
+    out = []
+    for item in spec.split(","):
+        mc, th, bits = item.split(":")
+        out.append((int(mc), float(th), int(bits)))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Report NGramLM file size against Hit@k/MRR for pruning settings."
+    )
+    ap.add_argument("--model", default="models/ngram.bin")
+    ap.add_argument("--data", default="data/split/valid.txt")
+    ap.add_argument(
+        "--settings",
+        default="1:0:0,1:0:8,2:0:0,1:1e-7:0,1:1e-6:0,2:1e-6:8",
+        help="comma-separated min_count:threshold:bits",
+    )
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--samples", type=int, default=2000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "pruned.bin")
+        for mc, th, bits in parse_settings(args.settings):
+            lm = NGramLM.load(args.model)
+            removed = lm.prune(mc, th)
+            if bits:
+                lm.quantize(bits)
+            lm.save(out)
+            lm = NGramLM.load(out)
+            size = os.path.getsize(out) / 2**20
+            line = f"[min={mc} th={th:g} q={bits or '-'}] pruned={removed} | {size:.2f} MiB"
+            for prefix_chars in (0, 1, 2):
+                res = eval_file(
+                    lm, args.data, k=args.k, prefix_chars=prefix_chars,
+                    max_samples=args.samples,
+                )
+                line += f" | p{prefix_chars} Hit@{args.k}={res['hit@k']:.3f}"
+                line += f" MRR={res['mrr']:.3f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse, filecmp, os, tempfile, time
+from src.autosuggest.lm.ngram import NGramLM
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Time NGramLM.fit_file by worker count and check the models match."
+    )
+    ap.add_argument("--data", default="data/split/train.txt")
+    ap.add_argument("--workers", default="1,2,4,8", help="comma-separated counts")
+    ap.add_argument("--max-entries", type=int, default=None)
+    ap.add_argument("--n", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"[cpu] {os.cpu_count()} core")
+    with tempfile.TemporaryDirectory() as tmp:
+        ref = None
+        base_s = None
+        for w in [int(x) for x in args.workers.split(",")]:
+            lm = NGramLM(n=args.n)
+            t0 = time.perf_counter()
+            lm.fit_file(args.data, workers=w, max_entries=args.max_entries)
+            dt = time.perf_counter() - t0
+            out = os.path.join(tmp, f"w{w}.bin")
+            lm.save(out)
+            if ref is None:
+                ref, base_s = out, dt
+            same = filecmp.cmp(ref, out, shallow=False)
+            print(
+                f"[workers={w}] fit={dt:.2f}s | speedup={base_s / dt:.2f}x "
+                f"| identical={same}"
+            )
+
+
+if __name__ == "__main__":
+    main()
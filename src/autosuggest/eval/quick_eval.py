@@ -4,7 +4,7 @@ from typing import List, Tuple, Optional
 from src.autosuggest.lm.ngram import NGramLM, tok
 
 
-MODEL_PATH = "models/ngram.pkl"
+MODEL_PATH = "models/ngram.bin"
 VALID_PATH = "data/split/valid.txt"
 MAX_SAMPLES = 2000
 TOPK = 5
@@ -53,31 +53,30 @@ def approx_perplexity(
     lm: NGramLM, sentences: List[str], max_tokens: int = 10000
 ) -> float:
 
-    n = 0
-    log2_sum = 0.0
+    queries: List[Tuple[str, str]] = []
     for s in sentences:
         t = tok(s)
         if len(t) < 2:
             continue
         for i in range(1, len(t)):
-            ctx = " ".join(t[:i])
-            w = t[i]
-
-            cands = lm.suggest(ctx, prefix=None, k=100)
-            if w in cands:
-                r = cands.index(w) + 1
-                p = 1.0 / (r + 5.0)
-            else:
-                p = 1e-9
-            log2_sum += math.log2(p)
-            n += 1
-            if n >= max_tokens:
+            queries.append((" ".join(t[:i]), t[i]))
+            if len(queries) >= max_tokens:
                 break
-        if n >= max_tokens:
+        if len(queries) >= max_tokens:
             break
-    if n == 0:
+    if not queries:
         return float("inf")
-    return 2 ** (-log2_sum / n)
+
+    log2_sum = 0.0
+    batch = lm.suggest_batch([ctx for ctx, _ in queries], k=100)
+    for (_, w), cands in zip(queries, batch):
+        if w in cands:
+            r = cands.index(w) + 1
+            p = 1.0 / (r + 5.0)
+        else:
+            p = 1e-9
+        log2_sum += math.log2(p)
+    return 2 ** (-log2_sum / len(queries))
 
 
 def eval_mode(lm: NGramLM, sentences: List[str], mode: str) -> Tuple[dict, dict]:
@@ -91,7 +91,7 @@ def main():
     ap = argparse.ArgumentParser(
         description="Test NGram model (interactive or file eval)."
     )
-    ap.add_argument("--model", default="models/ngram.pkl")
+    ap.add_argument("--model", default="models/ngram.bin")
     ap.add_argument("--k", type=int, default=5)
     sub = ap.add_subparsers(dest="cmd", required=True)
 
@@ -0,0 +1,90 @@
+"""Versioned flat binary container for model arrays, loaded through mmap.
+
+Layout::
+
+    magic (8 bytes) | version u32 | reserved u32 | header length u64
+    JSON header (meta + array table) | arrays, each 64-byte aligned
+
+Arrays come back as read-only `np.frombuffer` views over one shared `mmap`,
+so every process that opens the same file maps the same physical pages.
+"""
+from __future__ import annotations
+from typing import Dict, List, Tuple
+import json, mmap, os, struct
+
+import numpy as np
+
+MAGIC = b"NGRAMLM\x00"
+VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct("<8sIIQ")
+
+
+def _align(x: int) -> int:
+    return (x + ALIGN - 1) // ALIGN * ALIGN
+
+
+def is_model_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_model_file(path: str, meta: dict, arrays: Dict[str, np.ndarray]) -> None:
+    arrays = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+    table = {}
+    # offsets depend on the header size, which depends on the offsets: settle
+    # them by iterating until the header stops growing
+    header_len = 0
+    while True:
+        off = _align(_PREFIX.size + header_len)
+        for name, a in arrays.items():
+            table[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": off}
+            off = _align(off + a.nbytes)
+        header = json.dumps({"meta": meta, "arrays": table}).encode("utf-8")
+        if len(header) <= header_len:
+            end = off
+            break
+        header_len = len(header) + 256
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, 0, header_len))
+        f.write(header.ljust(header_len, b" "))
+        for name, a in arrays.items():
+            f.seek(table[name]["offset"])
+            f.write(a.data)
+        f.truncate(end)
+    os.replace(tmp, path)
+
+
+def read_model_file(path: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, _, header_len = _PREFIX.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not an NGramLM binary model")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported model format version {version}")
+    header = json.loads(bytes(mm[_PREFIX.size : _PREFIX.size + header_len]))
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        shape = tuple(spec["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        a = np.frombuffer(mm, dtype=dtype, count=count, offset=spec["offset"])
+        arrays[name] = a.reshape(shape)
+    return header["meta"], arrays
+
+
+def pack_strings(items: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate UTF-8 encodings; returns (blob, offsets of len(items)+1)."""
+    enc = [s.encode("utf-8") for s in items]
+    off = np.zeros(len(enc) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in enc], out=off[1:])
+    return np.frombuffer(b"".join(enc), dtype=np.uint8), off
+
+
+def unpack_strings(blob: np.ndarray, off: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    o = off.tolist()
+    return [raw[a:b].decode("utf-8") for a, b in zip(o[:-1], o[1:])]
@@ -0,0 +1,132 @@
+"""Sharded, optionally out-of-core n-gram counting for `NGramLM.fit_file`.
+
+The corpus is cut into byte ranges on line boundaries. Each shard is counted
+into string-tuple Counters (in a worker process when ``workers > 1``), and
+every time a shard's counters hold `max_entries` distinct n-grams they are
+written out as a sorted *run*. Runs are k-way merged per order, so the merged
+stream comes out sorted and summed no matter how the input was sharded.
+"""
+from __future__ import annotations
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+import collections, heapq, itertools, multiprocessing, operator, os, tempfile
+
+Gram = Tuple[str, ...]
+# one sorted stream per order: either in memory or a spilled file
+RunPart = Union[List[Tuple[Gram, int]], str]
+Run = List[RunPart]
+
+
+def shard_offsets(path: str, n_shards: int) -> List[Tuple[int, int]]:
+    """Split `path` into at most `n_shards` byte ranges starting on a line."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for s in range(1, n_shards):
+            f.seek(max(size * s // n_shards, bounds[-1]))
+            if f.tell() > 0:
+                f.readline()
+            bounds.append(max(f.tell(), bounds[-1]))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def read_shard(path: str, start: int, end: int) -> Iterator[str]:
+    """Stripped non-empty lines of a shard (universal newlines, like text mode)."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        while f.tell() < end:
+            raw = f.readline()
+            if not raw:
+                break
+            for line in raw.decode("utf-8", errors="ignore").split("\r"):
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def _spill(counters: List[collections.Counter], tmp_dir: str) -> Run:
+    run: Run = []
+    for counter in counters:
+        fd, path = tempfile.mkstemp(suffix=".run", dir=tmp_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for gram in sorted(counter):
+                f.write(f"{' '.join(gram)}\t{counter[gram]}\n")
+        run.append(path)
+    return run
+
+
+def _read_run(part: RunPart) -> Iterator[Tuple[Gram, int]]:
+    if not isinstance(part, str):
+        yield from part
+        return
+    with open(part, "r", encoding="utf-8") as f:
+        for line in f:
+            gram, c = line.rstrip("\n").split("\t")
+            yield tuple(gram.split(" ")), int(c)
+
+
+def count_line(
+    line: str,
+    n: int,
+    tokenize: Callable[[str], List[str]],
+    counters: List[collections.Counter],
+) -> None:
+    """Add the padded 1..n-grams of one stripped, non-empty line to `counters`."""
+    t = ["<s>"] * (n - 1) + tokenize(line) + ["</s>"]
+    L = len(t)
+    for k in range(1, n + 1):
+        cnt = counters[k - 1]
+        for i in range(L - k + 1):
+            cnt[tuple(t[i : i + k])] += 1
+
+
+def count_shard(args) -> List[Run]:
+    path, start, end, n, tokenize, max_entries, tmp_dir = args
+    counters = [collections.Counter() for _ in range(n)]
+    runs: List[Run] = []
+    for line in read_shard(path, start, end):
+        count_line(line, n, tokenize, counters)
+        if max_entries and sum(len(c) for c in counters) >= max_entries:
+            runs.append(_spill(counters, tmp_dir))
+            counters = [collections.Counter() for _ in range(n)]
+    if any(counters):
+        if tmp_dir is not None:
+            runs.append(_spill(counters, tmp_dir))
+        else:
+            runs.append([sorted(c.items()) for c in counters])
+    return runs
+
+
+def count_file(
+    path: str,
+    n: int,
+    tokenize: Callable[[str], List[str]],
+    workers: int = 1,
+    max_entries: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
+) -> List[Run]:
+    """Count all 1..n-grams of `path`; returns sorted runs for `merge_runs`.
+
+    With `max_entries`, runs are spilled under `tmp_dir` (which the caller
+    owns and removes) instead of being kept in memory.
+    """
+    if max_entries and tmp_dir is None:
+        raise ValueError("max_entries needs a tmp_dir to spill runs into")
+    shards = shard_offsets(path, 1 if workers <= 1 else workers * 4)
+    jobs = [(path, a, b, n, tokenize, max_entries, tmp_dir) for a, b in shards]
+    if workers <= 1:
+        results = map(count_shard, jobs)
+        return [run for runs in results for run in runs]
+    with multiprocessing.Pool(workers) as pool:
+        return [run for runs in pool.imap(count_shard, jobs) for run in runs]
+
+
+def merge_runs(parts: Iterable[RunPart]) -> Iterator[Tuple[Gram, int]]:
+    """K-way merge of sorted runs of one order, summing equal n-grams."""
+    parts = list(parts)
+    if len(parts) == 1:
+        yield from _read_run(parts[0])
+        return
+    merged = heapq.merge(*(_read_run(p) for p in parts), key=operator.itemgetter(0))
+    for gram, group in itertools.groupby(merged, key=operator.itemgetter(0)):
+        yield gram, sum(c for _, c in group)
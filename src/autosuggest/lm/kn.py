@@ -0,0 +1,130 @@
+"""Interpolated Kneser-Ney tables over an `NGramStore`, built once at fit time.
+
+For a history row ``r`` of level ``L`` (the continuations of an L-word
+history) the model is::
+
+    P_L(w | h) = max(c_L(h, w) - D, 0) / denom_L[r] + gamma_L[r] * P_{L-1}(w | h[1:])
+
+where ``c_L`` is the raw count at the top order and the continuation count
+(number of distinct left extensions) below it, and ``P_0`` is the unigram
+continuation probability. A history with ``denom == 0`` is skipped
+(``P_L = P_{L-1}``).
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.autosuggest.lm.store import NGramStore
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def parent_rows(store: NGramStore, lvl: int) -> np.ndarray:
+    """Flat index in level ``lvl-1`` of the history of every level-`lvl` entry."""
+    ptr = store.ptr[lvl]
+    return np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+
+
+def suffix_rows(store: NGramStore, lvl: int, parent_suffix: np.ndarray) -> np.ndarray:
+    """Flat index in level ``lvl-1`` of the suffix (first word dropped) of every
+    level-`lvl` entry; `parent_suffix` is the same map one level down."""
+    ids = store.ids[lvl].astype(np.int64)
+    if lvl == 1:
+        return ids
+    V = store.vocab_size
+    keys = parent_rows(store, lvl - 1) * V + store.ids[lvl - 1]
+    q = parent_suffix[parent_rows(store, lvl)] * V + ids
+    return keys.searchsorted(q)
+
+
+class KNTables:
+    """Per level ``L >= 1`` (index 0 unused): continuation counts of the entries
+    (levels below the top), denominators and backoff weights of the history
+    rows, and each row's children ranked by ``P_L`` (offsets into the row)."""
+
+    def __init__(
+        self,
+        cont: List[np.ndarray],
+        denom: List[np.ndarray],
+        gamma: List[np.ndarray],
+        order: List[np.ndarray],
+    ):
+        self.cont = cont
+        self.denom = denom
+        self.gamma = gamma
+        self.order = order
+
+    @classmethod
+    def build(
+        cls,
+        store: NGramStore,
+        top_counts: np.ndarray,
+        p_uni: np.ndarray,
+        D: float,
+        pruned: Optional[np.ndarray] = None,
+    ) -> Tuple["KNTables", List[np.ndarray]]:
+        """Returns the tables and, per level, the lower-order probability
+        ``P_{L-1}(w | h[1:])`` every entry backs off to.
+
+        `pruned` is the count mass dropped from each top-level history: it stays
+        in the denominator and moves to the backoff weight.
+        """
+        top = store.order - 1
+        suffix: List[np.ndarray] = [_EMPTY]
+        for lvl in range(1, top + 1):
+            suffix.append(suffix_rows(store, lvl, suffix[-1]))
+
+        cont, denom, gamma, order = [_EMPTY], [_EMPTY], [np.zeros(0)], [_EMPTY]
+        full = [np.asarray(p_uni, dtype=np.float64)]
+        low: List[np.ndarray] = [np.zeros(0)]
+        for lvl in range(1, top + 1):
+            if lvl == top:
+                c = np.asarray(top_counts)
+                cont.append(_EMPTY)
+            else:
+                c = np.bincount(suffix[lvl + 1], minlength=len(store.ids[lvl]))
+                cont.append(c.astype(np.uint32))
+            H = len(store.ptr[lvl]) - 1
+            par = parent_rows(store, lvl)
+            d = np.rint(np.bincount(par, weights=c, minlength=H)).astype(np.int64)
+            num = D * np.bincount(par, weights=c > 0, minlength=H)
+            if lvl == top and pruned is not None:
+                d += pruned
+                num = num + pruned
+            g = np.divide(num, d, out=np.ones(H), where=d > 0)
+            denom.append(d)
+            gamma.append(g)
+
+            lower = full[lvl - 1][suffix[lvl]]
+            seen = d[par] > 0
+            a = np.divide(np.maximum(c - D, 0.0), d[par], out=np.zeros(len(par)), where=seen)
+            p = a + g[par] * lower
+            low.append(lower)
+            full.append(p)
+            ranked = np.lexsort((-p, par))
+            order.append((ranked - store.ptr[lvl][par]).astype(np.int32))
+        return cls(cont, denom, gamma, order), low
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        out = {}
+        for lvl in range(1, len(self.denom)):
+            out[f"kn_cont{lvl}"] = self.cont[lvl]
+            out[f"kn_denom{lvl}"] = self.denom[lvl]
+            out[f"kn_gamma{lvl}"] = self.gamma[lvl]
+            out[f"kn_order{lvl}"] = self.order[lvl]
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], n: int) -> "KNTables":
+        levels = range(1, n)
+        return cls(
+            [_EMPTY] + [arrays[f"kn_cont{lvl}"] for lvl in levels],
+            [_EMPTY] + [arrays[f"kn_denom{lvl}"] for lvl in levels],
+            [np.zeros(0)] + [arrays[f"kn_gamma{lvl}"] for lvl in levels],
+            [_EMPTY] + [arrays[f"kn_order{lvl}"] for lvl in levels],
+        )
+
+    @staticmethod
+    def in_arrays(arrays: Dict[str, np.ndarray], n: int) -> bool:
+        return all(f"kn_order{lvl}" in arrays for lvl in range(1, n))
@@ -1,8 +1,22 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple, Optional
-import pickle, re, collections
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Optional
+import array, bisect, heapq, pickle, re, collections, shutil, tempfile, threading
 import unicodedata
 
+import numpy as np
+
+from src.autosuggest.lm.binfmt import (
+    is_model_file,
+    pack_strings,
+    read_model_file,
+    unpack_strings,
+    write_model_file,
+)
+from src.autosuggest.lm.counting import Run, count_file, count_line, merge_runs
+from src.autosuggest.lm.kn import KNTables
+from src.autosuggest.lm.prefix_index import PrefixIndex
+from src.autosuggest.lm.store import NGramStore
+
 
 def tok(s: str) -> List[str]:
     return re.findall(r"\w+|[^\w\s]", s, flags=re.UNICODE)
@@ -14,6 +28,33 @@ def strip_diacritics(s: str) -> str:
     )
 
 
+_NO_IDS = np.zeros(0, dtype=np.int32)
+
+# word_flags bits
+_KEEP = 1  # suggestible: not a sentence marker, has an alnum char
+_LONG = 2  # at least 2 chars (required once a prefix is typed)
+_KEEP_LONG = _KEEP | _LONG
+_ASCII = 4  # ascii-only word with a letter (demoted when a prefix is typed)
+
+_HISTORY_STATS = ("popular", "word_flags")
+
+_FOLD_BONUS = 1.12
+_ASCII_PENALTY = 0.90
+
+
+def _word_flags(words: List[str]) -> np.ndarray:
+    flags = np.zeros(len(words), dtype=np.uint8)
+    for i, w in enumerate(words):
+        if w not in {"<s>", "</s>"} and any(ch.isalnum() for ch in w):
+            flags[i] |= _KEEP
+        if len(w) >= 2:
+            flags[i] |= _LONG
+        wl = w.lower()
+        if all(ord(c) < 128 for c in wl) and any(ch.isalpha() for ch in wl):
+            flags[i] |= _ASCII
+    return flags
+
+
 class NGramLM:
     def __init__(self, n: int = 3, discount: float = 0.75, extra_pool: int = 200):
         assert n >= 2, "n must be >= 2"
@@ -21,218 +62,684 @@ class NGramLM:
         self.D = float(discount)
         self.extra_pool = int(extra_pool)
 
-        self.ng: List[collections.Counter] = [collections.Counter() for _ in range(n)]
-        self.next_map: Dict[Tuple[str, ...], Dict[str, int]] = {}
-        self.vocab: set[str] = set()
+        self.itos: List[str] = []
+        self.stoi: Dict[str, int] = {}
+        self.store: Optional[NGramStore] = None
 
-        self.cont_count: Dict[str, int] = collections.Counter()
+        self.cont_count: np.ndarray = np.zeros(0, dtype=np.int64)
         self.total_unique_bigrams: int = 0
 
-        self.prefix2: Dict[str, List[str]] = {}
-        self.prefix3: Dict[str, List[str]] = {}
-
-    def fit_file(self, path: str) -> None:
-        pad = ["<s>"] * (self.n - 1)
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                t = pad + tok(line) + ["</s>"]
-
-                for w in t:
-                    self.vocab.add(w)
-
-                L = len(t)
-                for k in range(1, self.n + 1):
-                    cnt = self.ng[k - 1]
-                    for i in range(L - k + 1):
-                        cnt[tuple(t[i : i + k])] += 1
-
-                for i in range(L - self.n + 1):
-                    ngram = tuple(t[i : i + self.n])
-                    hist, w = ngram[:-1], ngram[-1]
-                    m = self.next_map.get(hist)
-                    if m is None:
-                        m = {}
-                        self.next_map[hist] = m
-                    m[w] = m.get(w, 0) + 1
-
+        self.prefix_index: Optional[PrefixIndex] = None
+
+        self.kn: Optional[KNTables] = None
+        self.popular: np.ndarray = _NO_IDS
+        self.word_flags: np.ndarray = np.zeros(0, dtype=np.uint8)
+
+        # set by `prune`: per history, the summed count of dropped continuations
+        self.hist_pruned: Optional[np.ndarray] = None
+        # set by `quantize`: top-order counts are codes into this table
+        self.count_codebook: Optional[np.ndarray] = None
+
+        # serialises writers; readers never take it (see `update`)
+        self._update_lock = threading.Lock()
+
+    @property
+    def vocab(self):
+        return self.stoi.keys()
+
+    def _intern(self, w: str) -> int:
+        i = self.stoi.get(w)
+        if i is None:
+            i = len(self.itos)
+            self.stoi[w] = i
+            self.itos.append(w)
+        return i
+
+    def fit_file(
+        self,
+        path: str,
+        workers: int = 1,
+        max_entries: Optional[int] = None,
+        tmp_dir: Optional[str] = None,
+    ) -> None:
+        """Count `path` (one sentence per line) into the model and rebuild it.
+
+        `workers` > 1 counts shards of the file in a process pool. With
+        `max_entries`, a shard spills its counts as a sorted run to disk (under
+        `tmp_dir`) whenever it holds that many distinct n-grams, so the corpus
+        never has to fit in memory. The merged model is the same either way.
+        """
+        if self.hist_pruned is not None or self.count_codebook is not None:
+            raise ValueError("fit_file on a pruned or quantized model: refit from scratch")
+        spill = tempfile.mkdtemp(prefix="ngram-runs-", dir=tmp_dir) if max_entries else None
+        try:
+            runs = count_file(path, self.n, tok, workers, max_entries, spill)
+            if self.store is not None:
+                runs.append(self._as_run())
+            self._freeze_runs(runs)
+        finally:
+            if spill is not None:
+                shutil.rmtree(spill, ignore_errors=True)
+
+    def _as_run(self) -> Run:
+        itos = self.itos
+        return [
+            [(tuple(itos[i] for i in g), c) for g, c in self.store.iter_grams(lvl)]
+            for lvl in range(self.n)
+        ]
+
+    def _freeze_runs(self, runs: List[Run]) -> None:
+        """Build the model from sorted count runs; word ids follow string order,
+        so every sorted n-gram stream is already in trie order."""
+        uni = list(merge_runs(run[0] for run in runs))
+        self.itos = [g[0] for g, _ in uni]
+        self.stoi = {w: i for i, w in enumerate(self.itos)}
+        unigram = np.array([c for _, c in uni], dtype=np.int64)
+        levels = []
+        stoi = self.stoi
+        for k in range(2, self.n + 1):
+            ids, cnt = array.array("i"), array.array("q")
+            for gram, c in merge_runs(run[k - 1] for run in runs):
+                ids.extend([stoi[w] for w in gram])
+                cnt.append(c)
+            grams = np.frombuffer(ids, dtype=np.int32).reshape(-1, k)
+            levels.append((grams, np.frombuffer(cnt, dtype=np.int64)))
+        self.store = NGramStore.from_sorted(unigram, levels)
+        self._build_derived()
+
+    def update(self, sentences: Iterable[str]) -> None:
+        """Count more sentences into a fitted model without refitting.
+
+        Every structure is grown in place of a rebuild: the trie levels are
+        merged with the new n-grams, continuation counts only gain the new
+        bigram types, and only new words are folded into the prefix index.
+        The KN ranking is recomputed (vectorised) because a new bigram type
+        shifts every continuation probability.
+
+        The new state is built aside and published with a single attribute
+        swap, so concurrent `suggest` calls see either the old or the new
+        model, never a mix. Pass sentences in batches: each call is one swap.
+        """
+        counters = [collections.Counter() for _ in range(self.n)]
+        for line in sentences:
+            line = line.strip()
+            if line:
+                count_line(line, self.n, tok, counters)
+        if not counters[0]:
+            return
+        with self._update_lock:
+            if self.count_codebook is not None:
+                raise ValueError("cannot update a quantized model")
+            nxt = NGramLM(n=self.n, discount=self.D, extra_pool=self.extra_pool)
+            if self.store is None:
+                nxt._freeze_runs([[sorted(c.items()) for c in counters]])
+            else:
+                self._snapshot()._updated(nxt, counters)
+            nxt._update_lock = self._update_lock
+            self.__dict__ = nxt.__dict__
+
+    def _updated(self, nxt: "NGramLM", counters: List[collections.Counter]) -> None:
+        """Fill `nxt` with this model plus `counters` (string-tuple n-grams)."""
+        new_words = sorted(w for (w,) in counters[0] if w not in self.stoi)
+        V_old, V = len(self.itos), len(self.itos) + len(new_words)
+        # word ids follow string order: shift old ids past the inserted words
+        pos = np.array([bisect.bisect_left(self.itos, w) for w in new_words], dtype=np.int64)
+        new_ids = pos + np.arange(len(new_words))
+        remap = np.arange(V_old) + pos.searchsorted(np.arange(V_old), side="right")
+        if new_words:
+            nxt.itos = list(heapq.merge(self.itos, new_words))
+            nxt.stoi = {w: i for i, w in enumerate(nxt.itos)}
+        else:
+            nxt.itos, nxt.stoi = self.itos, self.stoi
+        stoi = nxt.stoi
+
+        unigram = np.zeros(V, dtype=np.int64)
+        for (w,), c in counters[0].items():
+            unigram[stoi[w]] += c
+        levels = []
+        for k, counter in enumerate(counters[1:], 2):
+            ids = [stoi[w] for gram in counter for w in gram]
+            grams = np.array(ids, dtype=np.int32).reshape(-1, k)
+            levels.append((grams, np.fromiter(counter.values(), np.int64, len(counter))))
+        nxt.store, inserted = self.store.merged(remap, unigram, levels)
+
+        nxt.cont_count = np.zeros(V, dtype=np.int64)
+        nxt.cont_count[remap] = self.cont_count
+        nxt.cont_count += np.bincount(nxt.store.ids[1][inserted[0]], minlength=V)
+        nxt.total_unique_bigrams = len(nxt.store.ids[1]) or 1
+
+        nxt.word_flags = np.zeros(V, dtype=np.uint8)
+        nxt.word_flags[remap] = self.word_flags
+        nxt.word_flags[new_ids] = _word_flags(new_words)
+        keep = [i for i, w in enumerate(new_words) if w not in {"<s>", "</s>"}]
+        if keep:
+            nxt.prefix_index = self.prefix_index.insert(
+                [new_words[i] for i in keep], new_ids[keep], remap, V, strip_diacritics
+            )
+        else:
+            nxt.prefix_index = self.prefix_index
+        if self.hist_pruned is not None:
+            top = self.n - 1
+            if top == 1:
+                moved = remap
+            else:
+                grown = np.arange(len(nxt.store.ids[top - 1]))
+                moved = np.delete(grown, inserted[top - 2])
+            nxt.hist_pruned = np.zeros(len(nxt.store.ptr[top]) - 1, dtype=np.uint32)
+            nxt.hist_pruned[moved] = self.hist_pruned
+        nxt._rank_continuations()
+
+    def prune(self, min_count: int = 1, threshold: float = 0.0) -> int:
+        """Drop top-order n-grams; returns how many were removed.
+
+        An n-gram goes if its count is below `min_count` or if removing it
+        changes the model by less than `threshold` in relative entropy
+        (Stolcke 1998), each n-gram scored against the unpruned model. The
+        discounted mass of a dropped n-gram moves to its history's backoff
+        weight, so the pruned model stays normalised. Lower orders are kept:
+        they are the trie's histories and the continuation counts.
+
+        Like `update`, the pruned model is built aside and swapped in whole.
+        """
+        with self._update_lock:
+            if self.count_codebook is not None:
+                raise ValueError("prune before quantize")
+            top = self.n - 1
+            ptr, ids, cnt = self.store.ptr[top], self.store.ids[top], self.store.cnt[top]
+            H = len(ptr) - 1
+            uniq = np.diff(ptr)
+            rows = np.repeat(np.arange(H), uniq)
+            drop = cnt < min_count
+            if threshold > 0:
+                drop |= self._prune_entropy(rows) < threshold
+            if not drop.any():
+                return 0
+
+            kept = ~drop
+            pruned = np.bincount(rows[drop], weights=cnt[drop], minlength=H)
+            pruned = self._pruned_mass() + np.rint(pruned).astype(np.int64)
+            assert int(pruned.max()) < 2**32, "pruned mass overflows uint32"
+            p = np.zeros(H + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows[kept], minlength=H), out=p[1:])
+            nxt = self._copy()
+            nxt.hist_pruned = pruned.astype(np.uint32)
+            nxt.store = NGramStore(
+                self.store.ptr[:top] + [p],
+                self.store.ids[:top] + [np.ascontiguousarray(ids[kept])],
+                self.store.cnt[:top] + [np.ascontiguousarray(cnt[kept])],
+            )
+            nxt._rank_continuations()
+            self.__dict__ = nxt.__dict__
+            return int(drop.sum())
+
+    def _prune_entropy(self, rows: np.ndarray) -> np.ndarray:
+        """Weighted relative entropy caused by dropping each top-order n-gram.
+
+        With p(w|h) = a(w) + lam*q(w), q the lower-order KN probability,
+        dropping (h, w) moves a(w) into lam. Unseen words scale by lam'/lam
+        exactly; the other seen words of h change little, so their term uses
+        log(1+x) ~ x.
+        """
+        top = self.n - 1
+        cnt = self.store.cnt[top]
+        D, H = self.D, len(self.store.ptr[top]) - 1
+        _, low = KNTables.build(self.store, cnt, self._cont_probs(), D, self.hist_pruned)
+        q = low[top]
+        N = self.kn.denom[top].astype(np.float64)
+        a = np.maximum(cnt - D, 0.0) / N[rows]
+        lam = self.kn.gamma[top][rows]
+        q_seen = np.bincount(rows, weights=q, minlength=H)[rows]
+        p = a + lam * q
+        lam2 = lam + a
+        with np.errstate(divide="ignore", invalid="ignore"):
+            own = p * np.log(p / (lam2 * q))
+            unseen = np.where(lam > 0, lam * (1.0 - q_seen) * np.log(lam / lam2), 0.0)
+        p_hist = N[rows] / N.sum()
+        return p_hist * (own + unseen - a * (q_seen - q))
+
+    def quantize(self, bits: int = 8) -> None:
+        """Store the top-order counts as `bits`-bit codes into a codebook.
+
+        The smallest half of the codes hold the most frequent small counts
+        exactly; larger counts share equal-population bins represented by
+        their mean. Scores and the KN ranking are then computed from the
+        decoded counts. A quantized model cannot be updated or refit.
+
+        Like `update`, the quantized model is built aside and swapped in whole.
+        """
+        assert bits in (8, 16), "bits must be 8 or 16"
+        with self._update_lock:
+            if self.count_codebook is not None:
+                return
+            levels = 1 << bits
+            top = self.n - 1
+            vals, inv, freq = np.unique(self.store.cnt[top], return_inverse=True, return_counts=True)
+            if len(vals) <= levels:
+                book, codes = vals.astype(np.float64), inv
+            else:
+                exact = levels // 2
+                cum = np.cumsum(freq[exact:])
+                rest = exact + (cum - 1) * (levels - exact) // cum[-1]
+                _, bins = np.unique(np.concatenate([np.arange(exact), rest]), return_inverse=True)
+                book = np.bincount(bins, weights=vals * freq) / np.bincount(bins, weights=freq)
+                codes = bins[inv]
+            dtype = np.uint8 if bits == 8 else np.uint16
+            nxt = self._copy()
+            nxt.store = NGramStore(
+                self.store.ptr, self.store.ids, self.store.cnt[:top] + [codes.astype(dtype)]
+            )
+            nxt.count_codebook = book
+            nxt._rank_continuations()
+            self.__dict__ = nxt.__dict__
+
+    def _snapshot(self) -> "NGramLM":
+        """A view of the current state that a concurrent `update` cannot change."""
+        view = object.__new__(NGramLM)
+        view.__dict__ = self.__dict__
+        return view
+
+    def _copy(self) -> "NGramLM":
+        """A new model sharing this one's arrays, to be changed and swapped in."""
+        nxt = NGramLM(n=self.n, discount=self.D, extra_pool=self.extra_pool)
+        nxt.__dict__.update(self.__dict__)
+        return nxt
+
+    def _freeze(self, counters: List[Dict[Tuple[int, ...], int]]) -> None:
+        self.store = NGramStore.from_counters(counters, len(self.itos))
+        self._build_derived()
+
+    def _build_derived(self) -> None:
         self._build_continuation_counts()
         self._build_prefix_index()
+        self._build_history_stats()
 
     def _build_continuation_counts(self) -> None:
-        bigram_keys = self.ng[1].keys()
-        cc = collections.Counter()
-        for u_w in bigram_keys:
-            w = u_w[-1]
-            cc[w] += 1
-        self.cont_count = cc
-        self.total_unique_bigrams = len(self.ng[1]) if self.ng[1] else 1
-
-    @staticmethod
-    def _pkey2(w: str) -> str:
-        w = w.lower()
-        return w[:2] if len(w) >= 2 else (w + "_" * (2 - len(w)))
-
-    @staticmethod
-    def _pkey3(w: str) -> str:
-        w = w.lower()
-        return w[:3] if len(w) >= 3 else (w + "_" * (3 - len(w)))
+        bigram_next = self.store.ids[1]
+        self.cont_count = np.bincount(bigram_next, minlength=len(self.itos))
+        self.total_unique_bigrams = len(bigram_next) if len(bigram_next) else 1
 
     def _build_prefix_index(self) -> None:
-        """Build prefix indices for 2 & 3 chars, sorted by continuation popularity."""
-        p2: Dict[str, List[str]] = collections.defaultdict(list)
-        p3: Dict[str, List[str]] = collections.defaultdict(list)
-        for w in self.vocab:
-            if w in {"<s>", "</s>"}:
-                continue
-            p2[self._pkey2(w)].append(w)
-            p3[self._pkey3(w)].append(w)
-        keyf = lambda w: self.cont_count.get(w, 0)
-        for d in (p2, p3):
-            for k, arr in d.items():
-                arr.sort(key=keyf, reverse=True)
-        self.prefix2 = dict(p2)
-        self.prefix3 = dict(p3)
-
-    def _cont_prob(self, w: str) -> float:
-        return self.cont_count.get(w, 0) / self.total_unique_bigrams
-
-    def _hist_stats(self, hist: Tuple[str, ...]) -> Tuple[int, int, Dict[str, int]]:
-        cdict = self.next_map.get(hist)
-        if not cdict:
-            return 0, 0, {}
-        denom = sum(cdict.values())
-        return denom, len(cdict), cdict
+        """Build sorted exact / diacritic-folded key arrays for prefix range lookup."""
+        self.prefix_index = PrefixIndex.build(self.itos, strip_diacritics)
+
+    def _build_history_stats(self) -> None:
+        """Precompute the KN tables and per-word flags."""
+        self._rank_continuations()
+        self.word_flags = _word_flags(self.itos)
+
+    def _rank_continuations(self) -> List[np.ndarray]:
+        """Build `kn` (see `KNTables.build`, whose backoff probabilities this
+        returns) and the unigram popularity order."""
+        self.kn, low = KNTables.build(
+            self.store, self._top_counts(), self._cont_probs(), self.D, self.hist_pruned
+        )
+        self.popular = np.argsort(-self.cont_count, kind="stable").astype(np.int32)
+        return low
+
+    def _top_counts(self, sel=slice(None)) -> np.ndarray:
+        """Top-order counts at `sel`, decoded if the model is quantized."""
+        cnt = self.store.cnt[self.n - 1][sel]
+        return cnt if self.count_codebook is None else self.count_codebook[cnt]
+
+    def _level_counts(self, lvl: int, sel) -> np.ndarray:
+        """Counts KN uses at level `lvl`: raw at the top, continuation below."""
+        return self._top_counts(sel) if lvl == self.n - 1 else self.kn.cont[lvl][sel]
+
+    def _pruned_mass(self):
+        return 0 if self.hist_pruned is None else self.hist_pruned
+
+    def _cont_probs(self) -> np.ndarray:
+        return self.cont_count / self.total_unique_bigrams
+
+    def _chain(self, hist: Tuple[str, ...]) -> List[Tuple[int, int, int, int, float]]:
+        """(level, lo, hi, denominator, backoff weight) of every seen suffix of
+        `hist` that has continuations, shortest first."""
+        ids = [self.stoi.get(w, -1) for w in hist]
+        chain = []
+        for lvl in range(1, self.n):
+            suffix = ids[len(ids) - lvl :]
+            row = self.store.find(suffix) if -1 not in suffix else -1
+            if row < 0:
+                break
+            denom = int(self.kn.denom[lvl][row])
+            if denom:
+                ptr = self.store.ptr[lvl]
+                gamma = float(self.kn.gamma[lvl][row])
+                chain.append((lvl, int(ptr[row]), int(ptr[row + 1]), denom, gamma))
+        return chain
+
+    def _find_many_at(self, link, ids: np.ndarray) -> np.ndarray:
+        """Positions of `ids` in the row of chain entry `link` (-1 if absent)."""
+        lvl, lo, hi = link[:3]
+        if hi == lo:
+            return np.full(len(ids), -1)
+        row = self.store.ids[lvl][lo:hi]
+        pos = np.minimum(row.searchsorted(ids), hi - lo - 1)
+        return np.where(row[pos] == ids, lo + pos, -1)
+
+    def _scores(self, chain, ids: np.ndarray) -> np.ndarray:
+        """Interpolated KN probability of every word in `ids` after `chain`."""
+        D = self.D
+        p = self.cont_count[ids] / self.total_unique_bigrams
+        for link in chain:
+            lvl, _, _, denom, gamma = link
+            pos = self._find_many_at(link, ids)
+            hit = pos >= 0
+            c = np.zeros(len(ids))
+            c[hit] = self._level_counts(lvl, pos[hit])
+            p = np.maximum(c - D, 0.0) / denom + gamma * p
+        return p
 
     def suggest(
         self, context: str, prefix: Optional[str] = None, k: int = 5
     ) -> List[str]:
-        prefix = (prefix or "").strip()
+        return self._snapshot()._suggest(context, prefix, k)
+
+    def suggest_batch(
+        self,
+        contexts: Sequence[str],
+        prefixes: Optional[Sequence[Optional[str]]] = None,
+        k: int = 5,
+    ) -> List[List[str]]:
+        """`suggest` over many queries; the same lists as one call per query.
+
+        Queries are grouped by history, so each history is looked up and its
+        continuations scored once; the prefixed queries of a group are then
+        filtered and weighted together as one (queries x candidates) array.
+        """
+        return self._snapshot()._suggest_batch(contexts, prefixes, k)
+
+    def logprobs(
+        self, history: Sequence[str], words: Sequence[str], floor: float = 1e-7
+    ) -> np.ndarray:
+        """log P(w | history) of each of `words` (interpolated KN over the
+        last n-1 tokens of `history`, padded with <s>); words the model has
+        never seen get log(`floor`)."""
+        lm = self._snapshot()
+        hist = ["<s>"] * max(0, lm.n - 1 - len(history)) + list(history[len(history) - (lm.n - 1) :])
+        ids = np.array([lm.stoi.get(w, -1) for w in words], dtype=np.int64)
+        known = ids >= 0
+        p = np.full(len(ids), floor, dtype=np.float64)
+        if known.any():
+            p[known] = np.maximum(lm._scores(lm._chain(tuple(hist)), ids[known]), floor)
+        return np.log(p)
+
+    def _context(self, context: str) -> Tuple[str, ...]:
         ctx_tokens = tok(context)
-        ctx = tuple(
+        return tuple(
             ["<s>"] * max(0, self.n - 1 - len(ctx_tokens)) + ctx_tokens[-(self.n - 1) :]
         )
 
-        denom, uniq_next, cdict = self._hist_stats(ctx)
-        D = self.D
-
+    def _prefix_ranges(self, prefix: str) -> Tuple[int, int, int, int]:
+        """(e_lo, e_hi, f_lo, f_hi): exact and folded prefix-index ranges."""
+        pidx = self.prefix_index
         pre_l = prefix.lower()
-        pre_f = strip_diacritics(pre_l) if prefix else ""
-
-        def _starts(w: str) -> bool:
-            if not prefix:
-                return True
-            wl = w.lower()
-            return wl.startswith(pre_l) or strip_diacritics(wl).startswith(pre_f)
-
-        def _keep(w: str) -> bool:
-            if w in {"<s>", "</s>"}:
-                return False
-            if prefix and len(w) < 2:
-                return False
-            if not any(ch.isalnum() for ch in w):
-                return False
-            return True
-
-        def _weight(w: str) -> float:
-            """Ưu tiên từ có dấu khi bạn gõ không dấu; hạ điểm ascii-only."""
-            if not prefix:
-                return 1.0
-            wl = w.lower()
-            exact = wl.startswith(pre_l)
-            folded = strip_diacritics(wl).startswith(pre_f)
-            wgt = 1.0
-            if folded and not exact:
-                wgt *= 1.12
-            if all(ord(c) < 128 for c in wl) and any(ch.isalpha() for ch in wl):
-                wgt *= 0.90
-            return wgt
-
-        observed = list(cdict.keys())
-        cand_set = {w for w in observed if _starts(w) and _keep(w)}
-
-        if prefix:
-            extras: List[str] = []
-            if len(prefix) >= 3 and hasattr(self, "prefix3") and self.prefix3:
-                e3 = self.prefix3.get(self._pkey3(prefix), [])
-                extras.extend(e3)
-                if len(extras) < self.extra_pool:
-                    seen = set(extras)
-                    e2 = self.prefix2.get(self._pkey2(prefix), [])
-                    extras.extend([w for w in e2 if w not in seen])
+        e_lo, e_hi = pidx.exact.prefix_range(pre_l)
+        f_lo, f_hi = pidx.fold.prefix_range(strip_diacritics(pre_l))
+        return e_lo, e_hi, f_lo, f_hi
+
+    def _extras(self, f_lo: int, f_hi: int) -> np.ndarray:
+        """The `extra_pool` most popular suggestible words in a folded range."""
+        # every word matching the prefix (exactly or folded) sits in the folded
+        # range; pool the most popular of them as unseen-continuation candidates
+        flags = self.word_flags
+        extras = self.prefix_index.fold_ids[f_lo:f_hi]
+        extras = extras[flags[extras] & _KEEP_LONG == _KEEP_LONG]
+        if len(extras) > self.extra_pool:
+            part = np.argpartition(-self.cont_count[extras], self.extra_pool - 1)
+            extras = extras[part[: self.extra_pool]]
+        return extras
+
+    def _weights(self, ids: np.ndarray, e_lo: int, e_hi: int) -> np.ndarray:
+        """Prefix weights: _FOLD_BONUS unless typed exactly, _ASCII_PENALTY."""
+        er = self.prefix_index.exact_rank[ids]
+        wgt = np.where((er >= e_lo) & (er < e_hi), 1.0, 1.0 * _FOLD_BONUS)
+        return np.where(self.word_flags[ids] & _ASCII, wgt * _ASCII_PENALTY, wgt)
+
+    def _suggest(self, context: str, prefix: Optional[str], k: int) -> List[str]:
+        if self.store is None:
+            return []
+        prefix = (prefix or "").strip()
+        chain = self._chain(self._context(context))
+        if not prefix:
+            return [self.itos[i] for i in self._top_k(chain, k)]
+        out: List[List[str]] = [[]]
+        self._top_k_prefixed(chain, [(0, self._prefix_ranges(prefix))], k, out, {})
+        return out[0]
+
+    def _top_k(self, chain, k: int) -> List[int]:
+        """Top-k suggestible word ids after `chain` by KN probability.
+
+        Each seen history level lists its continuations in descending ``P_L``
+        and the unigram level every word by popularity. A word is scored from
+        the longest history it continues; absent from the longer ones, its
+        score is ``P_L`` lifted by their backoff weights, which is monotone
+        in ``P_L``. So the lists are read in growing chunks, and reading stops
+        once no list can still beat the k-th score. Ties go to the smaller id.
+        """
+        if k <= 0:
+            return []
+        flags = self.word_flags
+        lists = [self._chunks(self.popular, 0, len(self.popular))]
+        lists += [self._chunks(self.store.ids[lvl], lo, hi, lvl) for lvl, lo, hi, _, _ in chain]
+        # a word continuing the next longer history is scored from that list
+        longer = list(chain) + [None]
+        bounds = [np.inf] * len(lists)
+        found_ids: List[np.ndarray] = []
+        found_p: List[np.ndarray] = []
+        kth = -np.inf
+        while True:
+            live = [c for c, b in enumerate(bounds) if b is not None and b >= kth]
+            if not live:
+                break
+            for c in live:
+                ids = next(lists[c], None)
+                if ids is None:
+                    bounds[c] = None
+                    continue
+                p = self._scores(chain, ids)
+                bounds[c] = p[-1]
+                keep = (flags[ids] & _KEEP) != 0
+                if longer[c] is not None:
+                    keep &= self._find_many_at(longer[c], ids) < 0
+                found_ids.append(ids[keep])
+                found_p.append(p[keep])
+            p = np.concatenate(found_p)
+            if len(p) >= k:
+                kth = np.partition(p, len(p) - k)[len(p) - k]
+        ids, p = np.concatenate(found_ids), np.concatenate(found_p)
+        return ids[np.lexsort((ids, -p))[:k]].tolist()
+
+    def _chunks(
+        self, ids: np.ndarray, lo: int, hi: int, lvl: Optional[int] = None
+    ) -> Iterator[np.ndarray]:
+        """`ids[lo:hi]` in growing chunks, in KN order of level `lvl` if given."""
+        start, step = lo, 8
+        while start < hi:
+            end = min(hi, start + step)
+            if lvl is None:
+                yield ids[start:end]
             else:
-                key2 = (
-                    self._pkey2(prefix)
-                    if hasattr(self, "_pkey2")
-                    else self._pkey(prefix)
-                )
-                extras = self.prefix2.get(key2, [])
-
-            for w in extras[: self.extra_pool]:
-                if _starts(w) and _keep(w):
-                    cand_set.add(w)
-
-        if denom == 0:
-            scored = [(w, self._cont_prob(w) * _weight(w)) for w in cand_set]
-            scored.sort(key=lambda x: x[1], reverse=True)
-            return [w for w, _ in scored[:k]]
-
-        lambda_w = (D * uniq_next) / denom
-        scored: List[Tuple[str, float]] = []
-        for w in cand_set:
-            num = cdict.get(w, 0)
-            p_ml = max(num - D, 0.0) / denom
-            p = (p_ml + lambda_w * self._cont_prob(w)) * _weight(w)
-            scored.append((w, p))
-
-        if not scored and not prefix:
-            extras = sorted(
-                (w for w in self.vocab if _keep(w)),
-                key=lambda w: self._cont_prob(w),
-                reverse=True,
-            )[: self.extra_pool]
-            scored = [(w, lambda_w * self._cont_prob(w) * _weight(w)) for w in extras]
-
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return [w for w, _ in scored if _keep(w)][:k]
+                yield ids[self.kn.order[lvl][start:end] + lo]
+            start, step = end, step * 4
+
+    def _suggest_batch(
+        self,
+        contexts: Sequence[str],
+        prefixes: Optional[Sequence[Optional[str]]],
+        k: int,
+    ) -> List[List[str]]:
+        if prefixes is None:
+            prefixes = [None] * len(contexts)
+        assert len(prefixes) == len(contexts), "one prefix per context"
+        if self.store is None:
+            return [[] for _ in contexts]
+        out: List[List[str]] = [[] for _ in contexts]
+        groups: Dict[Tuple[str, ...], List[int]] = collections.defaultdict(list)
+        for q, context in enumerate(contexts):
+            groups[self._context(context)].append(q)
+
+        extras_memo: Dict[Tuple[int, int], np.ndarray] = {}
+        for ctx, qs in groups.items():
+            chain = self._chain(ctx)
+            typed: List[Tuple[int, Tuple[int, int, int, int]]] = []
+            plain = None
+            for q in qs:
+                prefix = (prefixes[q] or "").strip()
+                if prefix:
+                    typed.append((q, self._prefix_ranges(prefix)))
+                    continue
+                if plain is None:
+                    plain = [self.itos[i] for i in self._top_k(chain, k)]
+                out[q] = list(plain)
+            if typed:
+                self._top_k_prefixed(chain, typed, k, out, extras_memo)
+        return out
+
+    def _top_k_prefixed(
+        self,
+        chain,
+        typed: List[Tuple[int, Tuple[int, int, int, int]]],
+        k: int,
+        out: List[List[str]],
+        extras_memo: Dict[Tuple[int, int], np.ndarray],
+    ) -> None:
+        """Fill `out[q]` for prefixed queries ``(q, prefix ranges)`` sharing one
+        history.
+
+        Candidates are the suggestible words in a query's folded prefix range
+        that continue some level of the history, plus the `_extras` pool for
+        unseen continuations. They are scored once for the whole group, then
+        weighted per query (ưu tiên từ có dấu khi gõ không dấu, hạ điểm
+        ascii-only); ties go to the smaller id.
+        """
+        if k <= 0:
+            return  # out[q] stays []
+        itos = self.itos
+
+        def _extras(f_lo: int, f_hi: int) -> np.ndarray:
+            key = (f_lo, f_hi)
+            if key not in extras_memo:
+                extras_memo[key] = self._extras(f_lo, f_hi)
+            return extras_memo[key]
+
+        def _emit(q: int, ids: np.ndarray, p: np.ndarray) -> None:
+            if len(ids) > k:
+                sel = p >= np.partition(p, len(p) - k)[len(p) - k]
+                ids, p = ids[sel], p[sel]
+            order = np.lexsort((ids, -p))[:k]
+            out[q] = [itos[i] for i in ids[order].tolist()]
+
+        # a longer history's continuations also continue its suffix, so the
+        # shortest level's row holds every continuation of the history
+        cand = self.store.ids[chain[0][0]][chain[0][1] : chain[0][2]] if chain else _NO_IDS
+        base = self._scores(chain, cand)
+        keep = self.word_flags[cand] & _KEEP_LONG == _KEEP_LONG
+        fold_rank = self.prefix_index.fold_rank[cand]
+        exact_rank = self.prefix_index.exact_rank[cand]
+        ascii_cand = (self.word_flags[cand] & _ASCII) != 0
+
+        # one (queries x candidates) block at a time, ~1M cells
+        step = max(1, (1 << 20) // max(len(cand), 1))
+        for s in range(0, len(typed), step):
+            chunk = typed[s : s + step]
+            r = np.array([rng for _, rng in chunk], dtype=np.int64)
+            e_lo, e_hi, f_lo, f_hi = (r[:, j : j + 1] for j in range(4))
+            match = keep & (fold_rank >= f_lo) & (fold_rank < f_hi)
+            wgt = np.where((exact_rank >= e_lo) & (exact_rank < e_hi), 1.0, 1.0 * _FOLD_BONUS)
+            wgt = np.where(ascii_cand, wgt * _ASCII_PENALTY, wgt)
+            p_all = base * wgt
+            for j, (q, rng) in enumerate(chunk):
+                # pooled words are in the folded range and suggestible, so the
+                # ones continuing some history are already among `match`
+                ex = _extras(rng[2], rng[3])
+                if len(cand):
+                    pos = np.minimum(cand.searchsorted(ex), len(cand) - 1)
+                    ex = ex[cand[pos] != ex]
+                p_ex = self._scores(chain, ex) * self._weights(ex, rng[0], rng[1])
+                hit = match[j]
+                ids = np.concatenate([cand[hit], ex])
+                _emit(q, ids, np.concatenate([p_all[j][hit], p_ex]))
 
     def save(self, path: str) -> None:
-        if not self.prefix2 or not self.prefix3:
-            self._build_prefix_index()
-        with open(path, "wb") as f:
-            pickle.dump(
-                {
-                    "n": self.n,
-                    "D": self.D,
-                    "extra_pool": self.extra_pool,
-                    "ng": self.ng,
-                    "next_map": self.next_map,
-                    "vocab": self.vocab,
-                    "cont_count": self.cont_count,
-                    "total_unique_bigrams": self.total_unique_bigrams,
-                    "prefix2": self.prefix2,
-                    "prefix3": self.prefix3,
-                },
-                f,
-                protocol=pickle.HIGHEST_PROTOCOL,
-            )
+        """Write the binary format of `binfmt` (loadable through mmap)."""
+        m = self._snapshot()
+        arrays = m.store.to_arrays()
+        arrays["vocab_blob"], arrays["vocab_off"] = pack_strings(m.itos)
+        arrays["cont_count"] = m.cont_count
+        for name in _HISTORY_STATS:
+            arrays[name] = getattr(m, name)
+        arrays.update(m.prefix_index.to_arrays())
+        arrays.update(m.kn.to_arrays())
+        if m.hist_pruned is not None:
+            arrays["hist_pruned"] = m.hist_pruned
+        if m.count_codebook is not None:
+            arrays["count_codebook"] = m.count_codebook
+        meta = {
+            "n": m.n,
+            "D": m.D,
+            "extra_pool": m.extra_pool,
+            "total_unique_bigrams": m.total_unique_bigrams,
+        }
+        write_model_file(path, meta, arrays)
 
     @staticmethod
     def load(path: str) -> "NGramLM":
+        """Load a binary model (zero-copy mmap) or an older pickle."""
+        if not is_model_file(path):
+            return NGramLM._load_pickle(path)
+        meta, arrays = read_model_file(path)
+        obj = NGramLM(n=meta["n"], discount=meta["D"], extra_pool=meta["extra_pool"])
+        obj.itos = unpack_strings(arrays["vocab_blob"], arrays["vocab_off"])
+        obj.stoi = {w: i for i, w in enumerate(obj.itos)}
+        obj.store = NGramStore.from_arrays(arrays, obj.n)
+        obj.cont_count = arrays["cont_count"]
+        obj.total_unique_bigrams = meta["total_unique_bigrams"]
+        obj.hist_pruned = arrays.get("hist_pruned")
+        obj.count_codebook = arrays.get("count_codebook")
+        # files written before the folded prefix index carry stale derived
+        # arrays (word_flags without the ascii bit): rebuild those
+        if "fold_ids" in arrays and all(name in arrays for name in _HISTORY_STATS):
+            obj.prefix_index = PrefixIndex.from_arrays(arrays)
+            for name in _HISTORY_STATS:
+                setattr(obj, name, arrays[name])
+            if KNTables.in_arrays(arrays, obj.n):
+                obj.kn = KNTables.from_arrays(arrays, obj.n)
+            else:
+                # written before the full KN tables: build them (re-save the
+                # model to keep loading zero-copy)
+                obj._rank_continuations()
+        else:
+            obj._build_prefix_index()
+            obj._build_history_stats()
+        return obj
+
+    @staticmethod
+    def _load_pickle(path: str) -> "NGramLM":
         with open(path, "rb") as f:
             state = pickle.load(f)
         obj = NGramLM(
             n=state["n"], discount=state["D"], extra_pool=state.get("extra_pool", 200)
         )
-        obj.ng = state["ng"]
-        obj.next_map = state["next_map"]
-        obj.vocab = state["vocab"]
+        if "format" not in state:
+            obj._load_legacy_state(state)
+            return obj
+        obj.itos = state["itos"]
+        obj.stoi = {w: i for i, w in enumerate(obj.itos)}
+        obj.store = NGramStore(state["ptr"], state["ids"], state["cnt"])
         obj.cont_count = state["cont_count"]
         obj.total_unique_bigrams = state["total_unique_bigrams"]
-        obj.prefix2 = state.get("prefix2", {})
-        obj.prefix3 = state.get("prefix3", {})
-        if not obj.prefix2 or not obj.prefix3:
-            obj._build_prefix_index()
+        obj._build_prefix_index()
+        obj._build_history_stats()
         return obj
+
+    def _load_legacy_state(self, state: dict) -> None:
+        """Convert a pickle written by the dict-based model (string-tuple Counters)."""
+        ng = state["ng"]
+        for w in sorted(w for (w,) in ng[0]):
+            self._intern(w)
+        stoi = self.stoi
+        counters = [
+            {tuple(stoi[w] for w in g): c for g, c in counter.items()} for counter in ng
+        ]
+        self._freeze(counters)
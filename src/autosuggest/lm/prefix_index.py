@@ -0,0 +1,171 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.autosuggest.lm.binfmt import pack_strings
+
+
+class SortedKeys:
+    """Lexicographically sorted UTF-8 keys with prefix range lookup.
+
+    Keys stay in their packed (blob, offsets) form, so a mapped model file is
+    searched in place; UTF-8 byte order equals code point order.
+    """
+
+    def __init__(self, blob: np.ndarray, off: np.ndarray):
+        self.blob = blob
+        self.off = off
+        self._mv = memoryview(blob)
+
+    def __len__(self) -> int:
+        return len(self.off) - 1
+
+    def _lower_bound(self, key: bytes) -> int:
+        mv, off = self._mv, self.off
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(mv[off[mid] : off[mid + 1]]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def equal_range(self, key: bytes) -> Tuple[int, int]:
+        # key+0x00 is the smallest key sorting after `key`
+        return self._lower_bound(key), self._lower_bound(key + b"\x00")
+
+    def insert(
+        self, keys: List[str], pos: Optional[np.ndarray] = None
+    ) -> Tuple["SortedKeys", np.ndarray, np.ndarray]:
+        """Merge sorted `keys` in before the old positions `pos` (default: in
+        front of equal keys); returns (new keys, new position of every old
+        key, new position of every inserted key)."""
+        enc = [k.encode("utf-8") for k in keys]
+        if pos is None:
+            pos = np.array([self._lower_bound(e) for e in enc], dtype=np.int64)
+        n_old = len(self)
+        old_to_new = np.arange(n_old) + pos.searchsorted(np.arange(n_old), side="right")
+        new_pos = pos + np.arange(len(pos))
+
+        raw, cuts = self.blob.tobytes(), self.off[pos].tolist()
+        parts, last = [], 0
+        for cut, e in zip(cuts, enc):
+            parts += [raw[last:cut], e]
+            last = cut
+        parts.append(raw[last:])
+        lengths = np.insert(np.diff(self.off), pos, [len(e) for e in enc])
+        off = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=off[1:])
+        blob = np.frombuffer(b"".join(parts), dtype=np.uint8)
+        return SortedKeys(blob, off), old_to_new, new_pos
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Positions ``[lo, hi)`` of the keys starting with `prefix`."""
+        key = prefix.encode("utf-8")
+        # 0xff never occurs in UTF-8, so key+0xff sorts after every extension
+        return self._lower_bound(key), self._lower_bound(key + b"\xff")
+
+
+class PrefixIndex:
+    """Prefix lookup over the exact (lowercased) and diacritic-folded vocab.
+
+    `fold_ids[lo:hi]` are the words whose folded form starts with a folded
+    prefix; `exact_rank` / `fold_rank` give each word id its position in the
+    two sorted orders so membership in a range is an O(1) comparison.
+    Words never indexed (sentence markers) get rank -1.
+    """
+
+    def __init__(
+        self,
+        exact: SortedKeys,
+        exact_rank: np.ndarray,
+        fold: SortedKeys,
+        fold_ids: np.ndarray,
+        fold_rank: np.ndarray,
+    ):
+        self.exact = exact
+        self.exact_rank = exact_rank
+        self.fold = fold
+        self.fold_ids = fold_ids
+        self.fold_rank = fold_rank
+
+    @classmethod
+    def build(
+        cls, words: List[str], fold: Callable[[str], str], skip=("<s>", "</s>")
+    ) -> "PrefixIndex":
+        ids = [i for i, w in enumerate(words) if w not in skip]
+        lower = {i: words[i].lower() for i in ids}
+        folded = {i: fold(lower[i]) for i in ids}
+
+        def _sorted(keys: Dict[int, str]) -> Tuple[SortedKeys, np.ndarray, np.ndarray]:
+            order = sorted(ids, key=keys.__getitem__)
+            rank = np.full(len(words), -1, dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            blob, off = pack_strings([keys[i] for i in order])
+            return SortedKeys(blob, off), np.asarray(order, dtype=np.int32), rank
+
+        exact, _, exact_rank = _sorted(lower)
+        fold_keys, fold_ids, fold_rank = _sorted(folded)
+        return cls(exact, exact_rank, fold_keys, fold_ids, fold_rank)
+
+    def insert(
+        self,
+        words: List[str],
+        ids: np.ndarray,
+        remap: np.ndarray,
+        vocab_size: int,
+        fold: Callable[[str], str],
+    ) -> "PrefixIndex":
+        """Index new `words` (with their `ids`) after the vocab grew to
+        `vocab_size`; `remap[old_id]` is the new id of every indexed word."""
+        ids = np.asarray(ids, dtype=np.int32)
+
+        def _merge(
+            old: SortedKeys, old_rank: np.ndarray, keys: List[str]
+        ) -> Tuple[SortedKeys, np.ndarray]:
+            # `build` orders equal keys by word id: keep that for new words
+            at = np.empty(len(old), dtype=np.int64)
+            seen = old_rank >= 0
+            at[old_rank[seen]] = remap[seen]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            pos = np.empty(len(order), dtype=np.int64)
+            for j, i in enumerate(order):
+                lo, hi = old.equal_range(keys[i].encode("utf-8"))
+                pos[j] = lo + int((at[lo:hi] < ids[i]).sum())
+            merged, old_pos, new_pos = old.insert([keys[i] for i in order], pos)
+            rank = np.full(vocab_size, -1, dtype=np.int32)
+            rank[remap[seen]] = old_pos[old_rank[seen]]
+            rank[ids[order]] = new_pos
+            return merged, rank
+
+        lower = [w.lower() for w in words]
+        exact, exact_rank = _merge(self.exact, self.exact_rank, lower)
+        folded = [fold(w) for w in lower]
+        fold_keys, fold_rank = _merge(self.fold, self.fold_rank, folded)
+        fold_ids = np.empty(len(fold_keys), dtype=np.int32)
+        indexed = fold_rank >= 0
+        fold_ids[fold_rank[indexed]] = np.flatnonzero(indexed)
+        return PrefixIndex(exact, exact_rank, fold_keys, fold_ids, fold_rank)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "exact_blob": self.exact.blob,
+            "exact_off": self.exact.off,
+            "exact_rank": self.exact_rank,
+            "fold_blob": self.fold.blob,
+            "fold_off": self.fold.off,
+            "fold_ids": self.fold_ids,
+            "fold_rank": self.fold_rank,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "PrefixIndex":
+        return cls(
+            SortedKeys(arrays["exact_blob"], arrays["exact_off"]),
+            arrays["exact_rank"],
+            SortedKeys(arrays["fold_blob"], arrays["fold_off"]),
+            arrays["fold_ids"],
+            arrays["fold_rank"],
+        )
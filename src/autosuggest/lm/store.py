@@ -0,0 +1,211 @@
+from __future__ import annotations
+from typing import Dict, Iterator, List, Sequence, Tuple
+import collections
+
+import numpy as np
+
+
+class NGramStore:
+    """Sorted-array trie of n-gram counts over integer word ids.
+
+    Level ``i`` holds the (i+1)-grams. The children of the entry at flat index
+    ``r`` of level ``i-1`` are ``ids[i][ptr[i][r]:ptr[i][r+1]]`` (sorted by id)
+    with counts in ``cnt[i]``; level 0 is a single root row over the vocab, so
+    the flat index of a unigram is its word id.
+    """
+
+    def __init__(
+        self,
+        ptr: List[np.ndarray],
+        ids: List[np.ndarray],
+        cnt: List[np.ndarray],
+    ):
+        self.ptr = ptr
+        self.ids = ids
+        self.cnt = cnt
+
+    @property
+    def order(self) -> int:
+        return len(self.ids)
+
+    @property
+    def vocab_size(self) -> int:
+        return len(self.ids[0])
+
+    def __len__(self) -> int:
+        return sum(len(a) for a in self.ids)
+
+    @classmethod
+    def from_counters(
+        cls, counters: Sequence[Dict[Tuple[int, ...], int]], vocab_size: int
+    ) -> "NGramStore":
+        """`counters[k-1]` maps k-tuples of word ids to counts."""
+        uni = counters[0]
+        unigram = np.array([uni.get((i,), 0) for i in range(vocab_size)], dtype=np.int64)
+        levels = []
+        for k, counter in enumerate(counters[1:], 2):
+            keys = sorted(counter)
+            grams = np.array(keys, dtype=np.int32).reshape(len(keys), k)
+            c = np.fromiter((counter[g] for g in keys), dtype=np.int64, count=len(keys))
+            levels.append((grams, c))
+        return cls.from_sorted(unigram, levels)
+
+    @classmethod
+    def from_sorted(
+        cls,
+        unigram: np.ndarray,
+        levels: Sequence[Tuple[np.ndarray, np.ndarray]],
+    ) -> "NGramStore":
+        """Build from unigram counts and, per higher order k, an (m, k) id array
+        sorted lexicographically together with its counts."""
+        V = len(unigram)
+        store = cls(
+            [np.array([0, V], dtype=np.int64)],
+            [np.arange(V, dtype=np.int32)],
+            [np.asarray(unigram, dtype=np.int64)],
+        )
+        for grams, c in levels:
+            parents = store.find_many(grams[:, :-1])
+            assert (parents >= 0).all(), "n-gram whose history was never counted"
+            assert len(c) == 0 or int(c.max()) < 2**32, "n-gram count overflows uint32"
+            n_par = len(store.ids[-1])
+            p = np.zeros(n_par + 1, dtype=np.int64)
+            np.cumsum(np.bincount(parents, minlength=n_par), out=p[1:])
+            store.ptr.append(p)
+            store.ids.append(np.ascontiguousarray(grams[:, -1], dtype=np.int32))
+            store.cnt.append(np.asarray(c, dtype=np.uint32))
+        return store
+
+    def merged(
+        self,
+        remap: np.ndarray,
+        unigram_delta: np.ndarray,
+        levels_delta: Sequence[Tuple[np.ndarray, np.ndarray]],
+    ) -> Tuple["NGramStore", List[np.ndarray]]:
+        """Add new counts without rebuilding from scratch.
+
+        `remap[old_id]` is the id of each existing word in the grown vocab of
+        size ``len(unigram_delta)``; `levels_delta` holds (grams, counts) per
+        higher order in new ids, in any order. Returns the new store and, per
+        higher level, the flat indices of n-gram types that did not exist
+        before. Each level is one vectorised sorted merge (no Python loop).
+        """
+        V = len(unigram_delta)
+        cnt0 = np.zeros(V, dtype=np.int64)
+        cnt0[remap] = self.cnt[0]
+        cnt0 += unigram_delta
+        out = NGramStore(
+            [np.array([0, V], dtype=np.int64)], [np.arange(V, dtype=np.int32)], [cnt0]
+        )
+        inserted: List[np.ndarray] = []
+        flat_map = remap.astype(np.int64)
+        for lvl, (grams, c) in enumerate(levels_delta, 1):
+            # entries are sorted by the composite key (parent flat index, id)
+            old_par = np.repeat(np.arange(len(self.ptr[lvl]) - 1), np.diff(self.ptr[lvl]))
+            old_keys = flat_map[old_par] * V + remap[self.ids[lvl]]
+            par = out.find_many(grams[:, :-1])
+            assert (par >= 0).all(), "n-gram whose history was never counted"
+            d_keys, inv = np.unique(par * V + grams[:, -1], return_inverse=True)
+            d_cnt = np.bincount(inv, weights=c).astype(np.int64)
+
+            pos = old_keys.searchsorted(d_keys)
+            hit = old_keys[np.minimum(pos, max(len(old_keys) - 1, 0))] == d_keys
+            hit &= pos < len(old_keys)
+            cnt = self.cnt[lvl].astype(np.int64)
+            np.add.at(cnt, pos[hit], d_cnt[hit])
+            ins = pos[~hit]
+            keys = np.insert(old_keys, ins, d_keys[~hit])
+            cnt = np.insert(cnt, ins, d_cnt[~hit])
+            assert len(cnt) == 0 or int(cnt.max()) < 2**32, "n-gram count overflows uint32"
+
+            n_old = len(old_keys)
+            flat_map = np.arange(n_old) + ins.searchsorted(np.arange(n_old), side="right")
+            inserted.append(ins + np.arange(len(ins)))
+
+            n_par = len(out.ids[-1])
+            p = np.zeros(n_par + 1, dtype=np.int64)
+            np.cumsum(np.bincount(keys // V, minlength=n_par), out=p[1:])
+            out.ptr.append(p)
+            out.ids.append((keys % V).astype(np.int32))
+            out.cnt.append(cnt.astype(np.uint32))
+        return out, inserted
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        out = {}
+        for lvl in range(self.order):
+            out[f"ptr{lvl}"] = self.ptr[lvl]
+            out[f"ids{lvl}"] = self.ids[lvl]
+            out[f"cnt{lvl}"] = self.cnt[lvl]
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], order: int) -> "NGramStore":
+        return cls(
+            [arrays[f"ptr{lvl}"] for lvl in range(order)],
+            [arrays[f"ids{lvl}"] for lvl in range(order)],
+            [arrays[f"cnt{lvl}"] for lvl in range(order)],
+        )
+
+    def iter_grams(self, lvl: int) -> Iterator[Tuple[Tuple[int, ...], int]]:
+        """(gram, count) of level `lvl` in sorted order."""
+        grams: List[Tuple[int, ...]] = [(i,) for i in range(self.vocab_size)]
+        for l in range(1, lvl + 1):
+            rows = np.repeat(np.arange(len(grams)), np.diff(self.ptr[l]))
+            grams = [grams[r] + (w,) for r, w in zip(rows.tolist(), self.ids[l].tolist())]
+        return zip(grams, self.cnt[lvl].tolist())
+
+    def to_counters(self) -> List[collections.Counter]:
+        """Inverse of `from_counters`."""
+        return [collections.Counter(dict(self.iter_grams(l))) for l in range(self.order)]
+
+    def find(self, gram: Sequence[int]) -> int:
+        """Flat index of `gram` in level ``len(gram)-1``, or -1 if unseen."""
+        if not gram:
+            return -1
+        row = int(gram[0])
+        if not 0 <= row < self.vocab_size:
+            return -1
+        for lvl in range(1, len(gram)):
+            lo, hi = int(self.ptr[lvl][row]), int(self.ptr[lvl][row + 1])
+            j = lo + int(self.ids[lvl][lo:hi].searchsorted(gram[lvl]))
+            if j >= hi or self.ids[lvl][j] != gram[lvl]:
+                return -1
+            row = j
+        return row
+
+    def find_many(self, grams: np.ndarray) -> np.ndarray:
+        """Vectorised `find` over the rows of an (m, L) id array (-1 if unseen)."""
+        m, L = grams.shape
+        V = self.vocab_size
+        row = grams[:, 0].astype(np.int64)
+        ok = (row >= 0) & (row < V)
+        for lvl in range(1, L):
+            # entries of a level are sorted by (parent row, id): one int64 key
+            keys = np.repeat(np.arange(len(self.ptr[lvl]) - 1), np.diff(self.ptr[lvl]))
+            keys = keys * V + self.ids[lvl]
+            w = grams[:, lvl].astype(np.int64)
+            ok &= (w >= 0) & (w < V)
+            if len(keys) == 0:
+                return np.full(m, -1, dtype=np.int64)
+            q = np.where(ok, row * V + w, 0)
+            j = np.minimum(keys.searchsorted(q), len(keys) - 1)
+            ok &= keys[j] == q
+            row = j
+        return np.where(ok, row, -1)
+
+    def children(self, hist: Sequence[int]) -> Tuple[int, int]:
+        """Slice ``[lo, hi)`` of level ``len(hist)`` continuing `hist`."""
+        if not hist:
+            return 0, self.vocab_size
+        row = self.find(hist)
+        if row < 0:
+            return 0, 0
+        lvl = len(hist)
+        return int(self.ptr[lvl][row]), int(self.ptr[lvl][row + 1])
+
+    def count(self, gram: Sequence[int]) -> int:
+        row = self.find(gram)
+        return int(self.cnt[len(gram) - 1][row]) if row >= 0 else 0
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for arrs in (self.ptr, self.ids, self.cnt) for a in arrs)
@@ -0,0 +1,19 @@
+import argparse
+from src.autosuggest.lm.ngram import NGramLM
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Convert a pickled NGramLM (.pkl) to the mmap binary format."
+    )
+    ap.add_argument("--input", default="models/ngram.pkl")
+    ap.add_argument("--output", default="models/ngram.bin")
+    args = ap.parse_args()
+
+    lm = NGramLM.load(args.input)
+    lm.save(args.output)
+    print(f"converted {args.input} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse, os
+from src.autosuggest.lm.ngram import NGramLM
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Prune (min count + relative entropy) and optionally quantize an NGramLM."
+    )
+    ap.add_argument("--input", default="models/ngram.bin")
+    ap.add_argument("--output", default="models/ngram.pruned.bin")
+    ap.add_argument("--min-count", type=int, default=2)
+    ap.add_argument(
+        "--threshold", type=float, default=0.0, help="relative entropy threshold (0 = off)"
+    )
+    ap.add_argument("--quantize", type=int, default=0, choices=[0, 8, 16], help="count bits")
+    args = ap.parse_args()
+
+    lm = NGramLM.load(args.input)
+    removed = lm.prune(args.min_count, args.threshold)
+    if args.quantize:
+        lm.quantize(args.quantize)
+    lm.save(args.output)
+    mb = lambda p: os.path.getsize(p) / 2**20
+    print(
+        f"pruned {removed} n-grams | {args.input} {mb(args.input):.1f} MiB "
+        f"-> {args.output} {mb(args.output):.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,28 @@
 from src.autosuggest.lm.ngram import NGramLM
-import pathlib
+import argparse, os, pathlib
 
-pathlib.Path("models").mkdir(exist_ok=True)
+ap = argparse.ArgumentParser(description="Train the n-gram suggest model.")
+ap.add_argument("--data", default="data/split/train.txt")
+ap.add_argument("--out", default="models/ngram.bin")
+ap.add_argument("--workers", type=int, default=1, help="counting processes (at most one per core)")
+ap.add_argument(
+    "--max-entries",
+    type=int,
+    default=None,
+    help="spill a shard's counts to disk past this many distinct n-grams",
+)
+ap.add_argument("--tmp-dir", default=None, help="where spilled runs go")
+args = ap.parse_args()
+
+cores = os.cpu_count() or 1
+if args.workers > cores:
+    # extra processes only add IPC and merging: slower than --workers 1
+    print(f"[WARN] --workers {args.workers} > {cores} lõi CPU: huấn luyện sẽ chậm hơn, nên dùng --workers {cores}")
+
+pathlib.Path(args.out).parent.mkdir(parents=True, exist_ok=True)
 lm = NGramLM(n=3, discount=0.75, extra_pool=200)
-lm.fit_file("data/split/train.txt")
-lm.save("models/ngram.pkl")
-print("saved -> models/ngram.pkl")
+lm.fit_file(
+    args.data, workers=args.workers, max_entries=args.max_entries, tmp_dir=args.tmp_dir
+)
+lm.save(args.out)
+print(f"saved -> {args.out}")
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))  # modules import each other as `src.…`
+
+
+@pytest.fixture
+def registry():
+    """The autocorrect registry, emptied again after the test."""
+    from src.autocorrect.core.resources import REGISTRY
+
+    REGISTRY.reset()
+    yield REGISTRY
+    REGISTRY.reset()
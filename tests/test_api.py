@@ -0,0 +1,54 @@
+import importlib, sys, time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")  # imported by the API module
+pytest.importorskip("sympy")
+from fastapi.testclient import TestClient
+
+from src.autocorrect.core.resources import REGISTRY
+from src.autosuggest.lm.ngram import NGramLM
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory, monkeypatch_module):
+    tmp = tmp_path_factory.mktemp("api")
+    corpus = tmp / "corpus.txt"
+    corpus.write_text("tôi đi học\nhôm nay tôi đi làm\nxin chào bạn\n", encoding="utf-8")
+    lm = NGramLM(n=3)
+    lm.fit_file(str(corpus))
+    lm.save(str(tmp / "ngram.bin"))
+    monkeypatch_module.setenv("MODEL_PATH", str(tmp / "ngram.bin"))
+    monkeypatch_module.setenv("API_KEY", "")
+    REGISTRY.set("vocab", {"tôi": 3, "đi": 2, "học": 1})  # read by the correction cache
+    sys.modules.pop("mezon_bot.api.main", None)
+    main = importlib.import_module("mezon_bot.api.main")
+    for _ in range(100):
+        if main.REGISTRY.ready:
+            break
+        time.sleep(0.05)
+    yield TestClient(main.app), main
+    REGISTRY.reset()
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as mp:
+        yield mp
+
+
+def test_suggest_batch(client):
+    c, main = client
+    r = c.post("/v1/suggest_batch", json={"contexts": ["tôi đi", "xin"], "prefixes": ["h", None], "k": 3})
+    assert r.status_code == 200
+    lm = main.REGISTRY.lm
+    assert r.json()["candidates"] == [lm.suggest("tôi đi", "h", 3), lm.suggest("xin", None, 3)]
+
+
+def test_suggest_batch_limits(client):
+    c, main = client
+    n = main.MAX_BATCH
+    assert c.post("/v1/suggest_batch", json={"contexts": ["tôi"] * n}).status_code == 200
+    assert c.post("/v1/suggest_batch", json={"contexts": ["tôi"] * (n + 1)}).status_code == 422
+    r = c.post("/v1/suggest_batch", json={"contexts": ["tôi", "xin"], "prefixes": ["h"]})
+    assert r.status_code == 422
@@ -0,0 +1,70 @@
+import re
+from collections import Counter
+
+import pytest
+
+from src.autocorrect.core.bigram_store import WORD_RE, BigramTable, build_bigram_table, convert_csv
+from src.autocorrect.core.context_corrector import correct_sentence
+from src.autocorrect.core.resources import build_bigram_model, load_bigram
+
+CORPUS = "Tôi đi học.\nHôm nay tôi đi học, mai tôi đi làm\n\nđi HỌC đi học rồi đi chơi!\nchơi\n"
+
+
+def reference_counts(text):
+    """Pair counts as bigram.csv was built before: the whole text at once."""
+    words = WORD_RE.findall(text.lower())
+    return Counter(zip(words[:-1], words[1:]))
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    p = tmp_path / "corpus.txt"
+    p.write_text(CORPUS, encoding="utf-8")
+    return p
+
+
+def test_table_counts_match_reference(corpus, tmp_path):
+    ref = reference_counts(CORPUS)
+    table = build_bigram_table(str(corpus), str(tmp_path / "bigram.bin"))
+    assert {(a, b): c for a, b, c in table.items()} == dict(ref)
+    loaded = BigramTable.load(str(tmp_path / "bigram.bin"))
+    assert {(a, b): c for a, b, c in loaded.items()} == dict(ref)
+    for (a, b), c in ref.items():
+        assert loaded.count(a, b) == c
+    assert loaded.count("tôi", "chơi") == 0
+    assert loaded.count("không", "có", 7) == 7
+
+
+def test_min_freq(corpus, tmp_path):
+    build_bigram_table(str(corpus), str(tmp_path / "bigram.bin"))
+    table = BigramTable.load(str(tmp_path / "bigram.bin"), min_freq=2)
+    ref = reference_counts(CORPUS)
+    assert {(a, b): c for a, b, c in table.items()} == {k: c for k, c in ref.items() if c >= 2}
+    assert table.count("mai", "tôi", 1) == 1  # seen once: below min_freq
+
+
+def test_csv_roundtrip(corpus, tmp_path):
+    csv_path, bin_path = tmp_path / "bigram.csv", tmp_path / "bigram.bin"
+    build_bigram_model(str(corpus), str(csv_path))
+    counts = [int(line.rsplit(",", 1)[1]) for line in csv_path.read_text(encoding="utf-8").split()]
+    assert counts == sorted(counts, reverse=True)
+    table = convert_csv(str(csv_path), str(bin_path))
+    assert {(a, b): c for a, b, c in table.items()} == dict(reference_counts(CORPUS))
+    assert load_bigram(str(csv_path), min_freq=1) == {
+        a: {b: c for (x, b), c in reference_counts(CORPUS).items() if x == a}
+        for a in {a for a, _ in reference_counts(CORPUS)}
+    }
+
+
+def test_correct_sentence_takes_dict_or_table(corpus, tmp_path):
+    vocab = {w: 10 for w in set(re.findall(r"\w+", CORPUS.lower()))}
+    vocab["họp"] = 10
+    csv_path = tmp_path / "bigram.csv"
+    build_bigram_model(str(corpus), str(csv_path))
+    pairs = load_bigram(str(csv_path))
+    table = convert_csv(str(csv_path), str(tmp_path / "bigram.bin"))
+    table.min_freq = 2
+    for s in ("tôi đi họx", "hôm nay tôi đi họx", "đi chơk rồi đi làx"):
+        assert correct_sentence(s, vocab, pairs) == correct_sentence(s, vocab, table)
+    # họp and học are as close and as frequent: the pair count decides
+    assert correct_sentence("tôi đi họx", vocab, pairs) == "tôi đi học"
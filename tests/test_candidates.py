@@ -0,0 +1,111 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.autocorrect.core.bk_tree import BKTree, rank_score
+from src.autocorrect.core.deletion_index import DeletionIndex
+from src.autocorrect.core.distance import (
+    KEYBOARD_COSTS,
+    LengthBuckets,
+    bounded_distance,
+    edit_distance,
+    myers_many,
+    weighted_distance,
+    weighted_many,
+)
+from src.autocorrect.core.generate_candidate import within_distance
+from src.autocorrect.core.rank_candidates import rank_candidates, rank_scored
+
+LETTERS = "aăâbcdđeêghiklmnoôơpqrstuưvxyáàảãạếềểễệ"
+
+
+def word(rng, lo=1, hi=9):
+    return "".join(rng.choices(LETTERS, k=rng.randint(lo, hi)))
+
+
+def typo(w, rng):
+    i = rng.randrange(len(w) + 1)
+    op = rng.choice("ids")
+    if op == "i" or not w:
+        return w[:i] + rng.choice(LETTERS) + w[i:]
+    i = min(i, len(w) - 1)
+    return w[:i] + (rng.choice(LETTERS) if op == "s" else "") + w[i + 1 :]
+
+
+@pytest.fixture(scope="module")
+def vocab():
+    rng = random.Random(0)
+    words = {word(rng): rng.randint(1, 5000) for _ in range(800)}
+    # long tokens (pasted URLs, hashes): past the 64-char bit vectors
+    for n in (63, 64, 65, 70, 90):
+        base = word(rng, n, n)
+        words[base] = rng.randint(1, 5000)
+        words[typo(base, rng)] = rng.randint(1, 5000)
+    return words
+
+
+@pytest.fixture(scope="module")
+def queries(vocab):
+    rng = random.Random(1)
+    picks = rng.sample(list(vocab), 100)
+    long = [w for w in vocab if len(w) > 60]
+    return [typo(typo(w, rng), rng) for w in picks] + picks[:20] + [typo(w, rng) for w in long] + long
+
+
+@pytest.fixture(scope="module")
+def scan(vocab, queries):
+    """query -> (word, distance) within 2 edits, in vocab order."""
+    return {
+        q: [(v, d) for v in vocab if abs(len(v) - len(q)) <= 2 for d in [edit_distance(q, v)] if d <= 2]
+        for q in queries
+    }
+
+
+def test_distances(vocab, queries):
+    words = list(vocab)
+    buckets = LengthBuckets(words)
+    for q in queries[:30]:
+        for L in (len(q) - 1, len(q), len(q) + 1):
+            if L not in buckets.ids or len(q) > 64:
+                continue
+            codes = buckets.codes[L]
+            want = [edit_distance(q, words[i]) for i in buckets.ids[L].tolist()]
+            assert myers_many(q, codes).tolist() == want
+            assert [bounded_distance(q, words[i], 2) for i in buckets.ids[L].tolist()] == [min(d, 3) for d in want]
+            got = weighted_many(q, codes, KEYBOARD_COSTS)
+            ref = [weighted_distance(q, words[i], KEYBOARD_COSTS) for i in buckets.ids[L].tolist()]
+            assert got.tolist() == pytest.approx(ref)
+    with pytest.raises(ValueError):
+        myers_many("a" * 65, np.zeros((1, 65), dtype=np.uint32))
+
+
+def test_indexes_match_scan(vocab, queries, scan):
+    index = DeletionIndex.build(vocab)
+    buckets = LengthBuckets(list(vocab))
+    for q in queries:
+        want = scan[q]
+        assert within_distance(q, vocab, 2) == want
+        assert within_distance(q, vocab, 2, index=index) == want
+        assert buckets.lookup(q, 2) == want
+
+
+@pytest.mark.parametrize("top_k", [1, 5, None])
+def test_bktree_matches_scan(vocab, queries, scan, top_k):
+    tree = BKTree.build(vocab)
+    score = rank_score(2)
+    for q in queries:
+        found = scan[q]
+        order = sorted(range(len(found)), key=lambda i: -score(found[i][1], vocab[found[i][0]]))
+        want = [found[i] for i in order][:top_k]
+        assert tree.query(q, 2, top_k) == want, q
+        assert rank_candidates(q, vocab, 2, top_k or len(vocab)) == [w for w, _ in want]
+
+
+def test_ranked_candidates_keep_their_scores(vocab, queries):
+    index = DeletionIndex.build(vocab)
+    for q in queries:
+        for costs in (None, KEYBOARD_COSTS):
+            scan = rank_scored(q, vocab, 2, 5, costs=costs)
+            assert rank_scored(q, vocab, 2, 5, index=index, costs=costs) == scan
+            assert [c.score for c in scan] == sorted((c.score for c in scan), reverse=True)
@@ -0,0 +1,43 @@
+import random, unicodedata
+
+import numpy as np
+import pytest
+
+from src.autosuggest.data.clean_corpus import Fingerprints, clean_corpus, clean_corpus_stream
+
+WORDS = "Tôi đi học hôm nay trời đẹp quá ok hello world , . ! ?".split()
+
+
+@pytest.fixture
+def raw(tmp_path):
+    rng = random.Random(0)
+    lines = []
+    for _ in range(2000):
+        s = " ".join(rng.choices(WORDS, k=rng.randint(1, 12)))
+        if rng.random() < 0.2:
+            s = unicodedata.normalize("NFD", s)  # the same sentence once NFC'd
+        lines.append(s + rng.choice(["\n", "\r\n", "\r", "\n\n", "  \n"]))
+    lines += lines[:300]  # exact duplicates
+    path = tmp_path / "raw.txt"
+    path.write_bytes("".join(lines).encode("utf-8"))
+    return path
+
+
+@pytest.mark.parametrize("workers,shard_bytes", [(1, 16 << 20), (1, 100), (2, 1000)])
+def test_stream_is_byte_identical(raw, tmp_path, workers, shard_bytes):
+    clean_corpus(raw, tmp_path / "ref.txt", only_vi=True)
+    clean_corpus_stream(raw, tmp_path / "out.txt", only_vi=True, workers=workers, shard_bytes=shard_bytes)
+    assert (tmp_path / "out.txt").read_bytes() == (tmp_path / "ref.txt").read_bytes()
+
+
+def test_fingerprints():
+    rng = np.random.default_rng(0)
+    seen, ref = Fingerprints(), set()
+    for _ in range(50):
+        h = rng.integers(0, 500, size=40).astype(np.uint64)
+        want = []
+        for x in h.tolist():
+            want.append(x not in ref)
+            ref.add(x)
+        assert seen.add(h).tolist() == want
+    assert len(seen) == len(ref)
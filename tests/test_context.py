@@ -0,0 +1,44 @@
+import pytest
+
+from src.autocorrect.core.bigram_store import BigramTable
+from src.autocorrect.core.context_corrector import correct_sentence
+from src.autocorrect.core.context_scorer import BigramScorer, LMScorer
+from src.autocorrect.core.resources import context_scorer
+from src.autosuggest.lm.ngram import NGramLM
+
+LINES = ["tôi đi học", "hôm nay tôi đi học", "bạn đi học chưa", "mẹ đi họp", "chiều nay họp lớp"]
+
+
+@pytest.fixture
+def lm(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("\n".join(LINES * 5), encoding="utf-8")
+    model = NGramLM(n=3)
+    model.fit_file(str(corpus))
+    return model
+
+
+@pytest.fixture
+def vocab():
+    return {w: 10 for line in LINES for w in line.split()}
+
+
+def test_lm_scorer_reads_the_lm(lm):
+    scorer = LMScorer(lm)
+    hist, words = ["tôi", "đi"], ["học", "họp", "không-có"]
+    assert list(scorer.logprobs(hist, words)) == list(lm.logprobs(hist, words))
+
+
+def test_correct_sentence_in_context(lm, vocab):
+    scorer = LMScorer(lm)
+    assert correct_sentence("tôi đi họx", vocab, scorer=scorer) == "tôi đi học"
+    assert correct_sentence("chiều nay họx lớp", vocab, scorer=scorer) == "chiều nay họp lớp"
+
+
+def test_shared_scorer_prefers_the_lm(registry, lm, vocab):
+    registry.set("vocab", vocab)
+    registry.set("bigram", BigramTable.from_rows([("tôi", "đi", 5)]))
+    registry.set("lm", None)
+    assert isinstance(context_scorer(), BigramScorer)
+    registry.set("lm", lm)  # drops the scorer built without it
+    assert isinstance(context_scorer(), LMScorer)
@@ -0,0 +1,65 @@
+import threading
+
+from src.autocorrect.core import correction_cache as cc
+from src.autocorrect.core.correction_cache import CorrectionCache
+
+
+def test_lru():
+    cache = CorrectionCache(maxsize=2)
+    calls = []
+
+    def compute(t):
+        calls.append(t)
+        return t.upper()
+
+    assert [cache.get_or_compute(t, compute) for t in ("a", "b", "a", "c", "b")] == list("ABACB")
+    assert calls == ["a", "b", "c", "b"]  # b was the least recently used
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 4
+
+
+def test_shared_tier(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    CorrectionCache(path=path, version="v1").get_or_compute("toi", lambda t: "tôi")
+    other = CorrectionCache(path=path, version="v1")
+    assert other.get_or_compute("toi", lambda t: "sai") == "tôi"
+    assert other.stats()["shared_hits"] == 1
+    # another vocab or rule file: nothing is served across versions
+    assert CorrectionCache(path=path, version="v2").get_or_compute("toi", lambda t: None) is None
+
+
+def test_trim(tmp_path, monkeypatch):
+    monkeypatch.setattr(cc, "TRIM_EVERY", 10)
+    path = str(tmp_path / "cache.sqlite")
+    cache = CorrectionCache(path=path, max_rows=5)
+    for i in range(9):
+        cache.get_or_compute(str(i), str)
+    cache.trim()
+    rows = cache._conn().execute("SELECT token FROM corrections ORDER BY rowid").fetchall()
+    assert [r[0] for r in rows] == ["4", "5", "6", "7", "8"]
+    # reopening trims what was left
+    cache = CorrectionCache(path=path, max_rows=2)
+    assert cache._conn().execute("SELECT COUNT(*) FROM corrections").fetchone()[0] == 2
+
+
+def test_local_hits_do_not_wait_for_the_database(tmp_path):
+    cache = CorrectionCache(path=str(tmp_path / "cache.sqlite"))
+    cache.get_or_compute("toi", lambda t: "tôi")
+    entered, release = threading.Event(), threading.Event()
+    slow_get = cache._shared_get
+
+    def stuck(token):
+        entered.set()
+        release.wait(5)
+        return slow_get(token)
+
+    cache._shared_get = stuck
+    miss = threading.Thread(target=cache.get_or_compute, args=("hom", lambda t: "hôm"))
+    miss.start()
+    assert entered.wait(5)
+    hit = []
+    reader = threading.Thread(target=lambda: hit.append(cache.get_or_compute("toi", lambda t: "sai")))
+    reader.start()
+    reader.join(1)
+    release.set()
+    miss.join(5)
+    assert hit == ["tôi"]
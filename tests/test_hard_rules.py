@@ -0,0 +1,45 @@
+import json, random, re
+
+import pytest
+
+from src.autocorrect.core.hard_rules import RULES_PATH, apply_hard_rules, compile_patterns
+
+DATA = json.loads(RULES_PATH.read_text(encoding="utf-8"))
+
+
+def reference(word):
+    """The rules as they were applied before the data file: dict lookup over
+    the merged groups, then one re.match per pattern, in order."""
+    w = word.lower().strip()
+    for group in reversed(DATA["groups"]):
+        if w in group["rules"]:
+            return group["rules"][w]
+    for p in DATA["patterns"]:
+        if re.match(p["pattern"], w):
+            return p["word"]
+    return word
+
+
+def tokens():
+    out = [w for g in DATA["groups"] for w in g["rules"]]
+    rng = random.Random(0)
+    stems = [re.sub(r"[\^\$\[\]\*]|a-z|sfrxj", "", p["pattern"])[:4] for p in DATA["patterns"]]
+    for _ in range(3000):
+        stem = rng.choice(stems + ["", "x", "tr", "ng"])
+        tail = "".join(rng.choices("abcdeghiklmnoqrstuvwxyfj", k=rng.randint(0, 4)))
+        w = stem + tail
+        out += [w, w.upper(), f" {w} ", w + "1", w + "ư"]
+    return out + ["", "ok", "đẹp", "Xin", "tròi"]
+
+
+def test_matches_sequential_rules():
+    for w in tokens():
+        assert apply_hard_rules(w) == reference(w), w
+
+
+def test_patterns_must_be_anchored():
+    with pytest.raises(ValueError):
+        compile_patterns([("ab", "x")])
+    matcher, words = compile_patterns([("^ab$", "x"), ("^a[b]*$", "y")])
+    assert words[matcher.match("ab").lastgroup] == "x"  # the first match wins
+    assert words[matcher.match("abb").lastgroup] == "y"
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from src.autocorrect.core import keyboard_fix as kf
+from src.autocorrect.core.resources import deletion_index
+
+LETTERS = "abcdeghiklmnopqrstuvxyăâđêôơưáàảãạéèẻẽẹóòỏõọúùủũụíìỉĩịýỳỷỹỵ"
+
+
+@pytest.fixture
+def vocab(registry):
+    rng = random.Random(0)
+    words = {"".join(rng.choices(LETTERS, k=rng.randint(1, 7))): rng.randint(1, 1000) for _ in range(1500)}
+    words.update({"bcd": 5, "xyz": 3})  # no vowel at all
+    registry.set("vocab", words)
+    return words
+
+
+def filtered(w_fixed, vocab):
+    """The vocab filter fix_common_keyboard used before the vowel index."""
+    return {w: f for w, f in vocab.items() if kf.share_vowel(w_fixed, w)} or vocab
+
+
+def test_shared_vowel_view(vocab):
+    for word in ("tôi", "xyz", "ua", "đường"):
+        view = kf.SharedVowelVocab(word)
+        ref = {w: f for w, f in vocab.items() if kf.share_vowel(word, w)}
+        assert dict(view.items()) == ref and len(view) == len(ref) and bool(view) == bool(ref)
+
+
+def test_matches_vocab_filter(vocab):
+    rng = random.Random(1)
+    words = list(vocab)
+    for _ in range(300):
+        w = rng.choice(words)
+        i = rng.randrange(len(w) + 1)
+        typo = w[:i] + rng.choice(LETTERS + "sfrxjw") + w[i + 1 :]
+        w_fixed = kf.telex_to_vietnamese(typo)
+        if w_fixed in vocab:
+            want = w_fixed
+        else:
+            c = kf.rank_scored(
+                w_fixed, filtered(w_fixed, vocab), 2, 1, index=deletion_index(), costs=kf.KEYBOARD_COSTS
+            )
+            want = c[0].word if c else typo
+        assert kf.fix_common_keyboard(typo) == want, typo
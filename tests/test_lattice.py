@@ -0,0 +1,54 @@
+import collections, random
+
+import pytest
+
+from src.autocorrect.core.lattice import LiveDecoder, column, decode_line
+from src.autosuggest.lm.ngram import NGramLM
+
+SENTENCES = [
+    "hôm nay tôi đi học",
+    "hôm nay trời đẹp quá",
+    "tôi đi làm về muộn",
+    "bạn đi học chưa",
+    "mai tôi đi chơi với bạn",
+    "tôi rất vui được gặp bạn",
+]
+
+
+@pytest.fixture
+def lm(registry, tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("\n".join(SENTENCES * 20), encoding="utf-8")
+    model = NGramLM(n=3)
+    model.fit_file(str(corpus))
+    vocab = collections.Counter(w for s in SENTENCES * 20 for w in s.split())
+    registry.set("vocab", dict(vocab))
+    registry.set("lm", model)
+    return model
+
+
+def test_column_keeps_the_token(lm):
+    for token in ("hoc", "tooi", "xyzzy", "đi"):
+        opts = column(token)
+        assert opts[0] == (token, (token,), 0.0)
+        assert all(dist >= 0 for _, _, dist in opts)
+
+
+def test_decode_fixes_typos_in_context(lm):
+    assert decode_line("hom nay toi di hocj", lm) == "hôm nay tôi đi học"
+    assert decode_line("", lm) == ""
+
+
+def test_live_decoder_matches_full_decode(lm):
+    rng = random.Random(0)
+    lines = ["hom nay toi di hocj", "tooi ddi lafm veef muoonj", "banj ddi hocj chuwa"]
+    dec = LiveDecoder(lm)
+    for line in lines:
+        typed = ""
+        for ch in line:
+            typed += ch
+            assert dec.update(typed) == decode_line(typed, lm), typed
+        # edits in the middle of the line re-decode from there
+        words = line.split()
+        words[rng.randrange(len(words))] = "xin"
+        assert dec.update(" ".join(words)) == decode_line(" ".join(words), lm)
@@ -0,0 +1,262 @@
+import collections, math, pickle, random
+
+import numpy as np
+import pytest
+
+from src.autosuggest.lm.ngram import NGramLM, strip_diacritics, tok
+
+WORDS = (
+    "tôi bạn anh chị em đi học làm hôm nay mai chơi nhà trường xin chào cảm ơn "
+    "rất nhiều không có được với cho của người việt nam hà nội ok hi là và"
+).split()
+
+
+def sentences(n, seed):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        words = rng.choices(WORDS, k=rng.randint(2, 9))
+        out.append(" ".join(words) + rng.choice(["", " .", " ?", " !!"]))
+    return out
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    path = tmp_path_factory.mktemp("ngram") / "corpus.txt"
+    path.write_text("\n".join(sentences(600, 0)) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture(scope="module")
+def lm(corpus):
+    model = NGramLM(n=3)
+    model.fit_file(str(corpus))
+    return model
+
+
+@pytest.fixture(scope="module")
+def queries():
+    rng = random.Random(1)
+    out = []
+    for s in sentences(150, 2) + ["", "xin", "zzz qqq"]:
+        toks = s.split()
+        ctx = " ".join(toks[: rng.randint(0, len(toks))])
+        w = rng.choice(WORDS)
+        for prefix in (None, w[:1], w[:2], strip_diacritics(w[:2]), w.upper()[:3], "zq"):
+            out.append((ctx, prefix))
+    return out
+
+
+def raw_counts(path, n=3):
+    """String-tuple Counters per order, as the dict-based model kept them."""
+    ng = [collections.Counter() for _ in range(n)]
+    for line in open(path, encoding="utf-8"):
+        if line.strip():
+            t = ["<s>"] * (n - 1) + tok(line.strip()) + ["</s>"]
+            for k in range(1, n + 1):
+                ng[k - 1].update(tuple(t[i : i + k]) for i in range(len(t) - k + 1))
+    return ng
+
+
+class Reference:
+    """Interpolated Kneser-Ney (trigram) scored word by word from raw counts."""
+
+    def __init__(self, path, D=0.75):
+        self.D = D
+        ng = raw_counts(path)
+        self.vocab = [w for (w,) in ng[0]]
+        self.cc1 = collections.Counter(w for (_, w) in ng[1])
+        self.total = len(ng[1])
+        cc2 = collections.Counter((v, w) for (_, v, w) in ng[2])
+        self.rows2 = collections.defaultdict(dict)
+        self.rows3 = collections.defaultdict(dict)
+        for v, w in ng[1]:
+            self.rows2[v][w] = cc2.get((v, w), 0)
+        for (u, v, w), c in ng[2].items():
+            self.rows3[(u, v)][w] = c
+
+    def prob(self, ctx, w):
+        D = self.D
+        p = self.cc1.get(w, 0) / self.total
+        for r in (self.rows2.get(ctx[-1]), self.rows3.get(ctx)):
+            if r:
+                d, t = sum(r.values()), sum(1 for x in r.values() if x > 0)
+                if d:
+                    p = max(r.get(w, 0) - D, 0) / d + D * t / d * p
+        return p
+
+    def scores(self, context, prefix):
+        """{word: score} of every candidate of a query."""
+        t = tok(context)
+        ctx = tuple(["<s>"] * max(0, 2 - len(t)) + t[-2:])
+        keep = lambda w: w not in {"<s>", "</s>"} and any(c.isalnum() for c in w)
+        prefix = (prefix or "").strip()
+        if not prefix:
+            return {w: self.prob(ctx, w) for w in self.vocab if keep(w)}
+        pre_l = prefix.lower()
+        pre_f = strip_diacritics(pre_l)
+
+        def weight(w):
+            wl, g = w.lower(), 1.0
+            if not wl.startswith(pre_l):
+                g *= 1.12
+            if all(ord(c) < 128 for c in wl) and any(c.isalpha() for c in wl):
+                g *= 0.9
+            return g
+
+        return {
+            w: self.prob(ctx, w) * weight(w)
+            for w in self.vocab
+            if keep(w)
+            and len(w) >= 2
+            and (w.lower().startswith(pre_l) or strip_diacritics(w.lower()).startswith(pre_f))
+        }
+
+
+def test_suggest_matches_reference(lm, corpus, queries):
+    ref = Reference(corpus)
+    for ctx, prefix in queries:
+        scores = ref.scores(ctx, prefix)
+        got = lm.suggest(ctx, prefix, 5)
+        want = sorted(scores.values(), reverse=True)[:5]
+        assert len(got) == len(want), (ctx, prefix)
+        assert [scores[w] for w in got] == pytest.approx(want, rel=1e-9), (ctx, prefix)
+
+
+def test_logprobs_match_reference(lm, corpus):
+    ref = Reference(corpus)
+    words = ["đi", "học", "nam", "không-có"]
+    for hist in ([], ["tôi"], ["xin", "chào"], ["hà", "nội", "là"]):
+        ctx = tuple((["<s>", "<s>"] + hist)[-2:])
+        want = [max(ref.prob(ctx, w), 1e-7) for w in words]
+        assert list(lm.logprobs(hist, words)) == pytest.approx([math.log(p) for p in want])
+
+
+def test_logprobs_are_normalised(lm):
+    for hist in ([], ["tôi"], ["xin", "chào"], ["zz", "qq"]):
+        assert np.exp(lm.logprobs(hist, lm.itos, floor=0)).sum() == pytest.approx(1.0)
+
+
+def test_suggest_batch_matches_suggest(lm, queries):
+    contexts = [c for c, _ in queries]
+    prefixes = [p for _, p in queries]
+    for k in (1, 5, 50):
+        assert lm.suggest_batch(contexts, prefixes, k) == [lm.suggest(c, p, k) for c, p in queries]
+    assert lm.suggest_batch(contexts, None, 3) == [lm.suggest(c, None, 3) for c in contexts]
+
+
+def test_k_zero(lm):
+    for prefix in (None, "", "h", "zq"):
+        assert lm.suggest("tôi đi", prefix, k=0) == []
+    assert lm.suggest_batch(["tôi đi", "xin"], ["h", None], k=0) == [[], []]
+
+
+def test_unfitted_model_suggests_nothing():
+    model = NGramLM(n=3)
+    assert model.suggest("tôi") == []
+    assert model.suggest_batch(["tôi", ""]) == [[], []]
+    assert model.suggest("tôi", "a") == []
+    assert model.suggest_batch(["tôi", "xin"], ["a", "ch"]) == [[], []]
+
+
+def test_save_load_is_byte_identical(lm, tmp_path, queries):
+    a, b = tmp_path / "a.bin", tmp_path / "b.bin"
+    lm.save(str(a))
+    loaded = NGramLM.load(str(a))
+    loaded.save(str(b))
+    assert a.read_bytes() == b.read_bytes()
+    assert [loaded.suggest(c, p) for c, p in queries] == [lm.suggest(c, p) for c, p in queries]
+
+
+def test_legacy_pickle_converts_to_the_same_model(lm, corpus, tmp_path):
+    ng = raw_counts(corpus)
+    state = {"n": 3, "D": 0.75, "extra_pool": 200, "ng": ng, "vocab": {w for (w,) in ng[0]}}
+    (tmp_path / "old.pkl").write_bytes(pickle.dumps(state))
+    NGramLM.load(str(tmp_path / "old.pkl")).save(str(tmp_path / "old.bin"))
+    lm.save(str(tmp_path / "new.bin"))
+    assert (tmp_path / "old.bin").read_bytes() == (tmp_path / "new.bin").read_bytes()
+
+
+def test_sharded_and_spilled_fits_are_identical(lm, corpus, tmp_path):
+    lm.save(str(tmp_path / "one.bin"))
+    for name, kwargs in (("spill", {"max_entries": 50, "tmp_dir": str(tmp_path)}), ("workers", {"workers": 2})):
+        model = NGramLM(n=3)
+        model.fit_file(str(corpus), **kwargs)
+        model.save(str(tmp_path / f"{name}.bin"))
+        assert (tmp_path / f"{name}.bin").read_bytes() == (tmp_path / "one.bin").read_bytes(), name
+
+
+def test_update_equals_full_fit(lm, corpus, tmp_path):
+    lines = corpus.read_text(encoding="utf-8").splitlines()
+    head = tmp_path / "head.txt"
+    head.write_text("\n".join(lines[:450]) + "\n", encoding="utf-8")
+    model = NGramLM(n=3)
+    model.fit_file(str(head))
+    for s in range(450, len(lines), 50):
+        model.update(lines[s : s + 50])
+    model.save(str(tmp_path / "updated.bin"))
+    lm.save(str(tmp_path / "full.bin"))
+    assert (tmp_path / "updated.bin").read_bytes() == (tmp_path / "full.bin").read_bytes()
+
+
+def fitted(corpus):
+    model = NGramLM(n=3)
+    model.fit_file(str(corpus))
+    return model
+
+
+@pytest.mark.parametrize("min_count,threshold", [(2, 0.0), (1, 1e-4), (3, 1e-3)])
+def test_pruned_model_stays_normalised(corpus, tmp_path, queries, min_count, threshold):
+    model = fitted(corpus)
+    top = len(model.store.ids[2])
+    dropped = model.prune(min_count, threshold)
+    assert 0 < dropped < top and len(model.store.ids[2]) == top - dropped
+    assert model.store.cnt[2].min() >= min_count
+    for hist in ([], ["tôi"], ["xin", "chào"], ["hà", "nội"]):
+        assert np.exp(model.logprobs(hist, model.itos, floor=0)).sum() == pytest.approx(1.0)
+    model.save(str(tmp_path / "a.bin"))
+    loaded = NGramLM.load(str(tmp_path / "a.bin"))
+    loaded.save(str(tmp_path / "b.bin"))
+    assert (tmp_path / "a.bin").read_bytes() == (tmp_path / "b.bin").read_bytes()
+    assert [loaded.suggest(c, p) for c, p in queries] == [model.suggest(c, p) for c, p in queries]
+    with pytest.raises(ValueError):
+        loaded.fit_file(str(corpus))
+
+
+def test_quantized_model(lm, corpus, tmp_path, queries):
+    model = fitted(corpus)
+    model.quantize(8)
+    # fewer distinct counts than codes: stored exactly, nothing changes
+    assert model.store.cnt[2].dtype == np.uint8
+    assert [model.suggest(c, p) for c, p in queries] == [lm.suggest(c, p) for c, p in queries]
+    model.save(str(tmp_path / "q.bin"))
+    loaded = NGramLM.load(str(tmp_path / "q.bin"))
+    assert [loaded.suggest(c, p) for c, p in queries] == [lm.suggest(c, p) for c, p in queries]
+    with pytest.raises(ValueError):
+        loaded.update(["tôi đi học"])
+    with pytest.raises(ValueError):
+        loaded.prune(2)
+
+
+def test_quantized_bins(tmp_path):
+    # 300 distinct trigram counts: more than 8-bit codes can hold exactly
+    path = tmp_path / "skewed.txt"
+    path.write_text("\n".join(f"từ{i} đi học" for i in range(1, 301) for _ in range(i)), encoding="utf-8")
+    model = fitted(path)
+    exact = model.logprobs(["<s>", "từ7"], model.itos)
+    model.quantize(8)
+    assert len(model.count_codebook) <= 256
+    assert model.logprobs(["<s>", "từ7"], model.itos) == pytest.approx(exact)  # small counts are exact
+    assert np.exp(model.logprobs(["từ250", "đi"], model.itos, floor=0)).sum() == pytest.approx(1.0)
+
+
+def test_prune_and_quantize_leave_snapshots_unchanged(corpus, queries):
+    model = fitted(corpus)
+    for change in (lambda: model.prune(2), lambda: model.quantize(8)):
+        snap = model._snapshot()
+        store, cnt = snap.store, snap.store.cnt[2]
+        before = [snap.suggest(c, p) for c, p in queries]
+        change()
+        assert model.store is not store
+        assert snap.store is store and snap.store.cnt[2] is cnt
+        assert [snap.suggest(c, p) for c, p in queries] == before
@@ -0,0 +1,39 @@
+import threading
+
+from src.autocorrect.core.resources import Registry
+
+
+def test_loads_once_and_resets_dependents():
+    calls = []
+    reg = Registry()
+    reg.register("vocab", lambda: calls.append("vocab") or {"a": 1})
+    reg.register("index", lambda: calls.append("index") or sorted(reg.get("vocab")), deps=("vocab",))
+    reg.register("other", lambda: calls.append("other") or 1)
+    assert reg.get("index") == ["a"] and reg.get("index") == ["a"] and reg.get("other") == 1
+    assert calls == ["index", "vocab", "other"]
+
+    reg.set("vocab", {"b": 1, "c": 2})  # a fixture
+    assert not reg.loaded("index") and reg.loaded("other")
+    assert reg.get("index") == ["b", "c"] and "vocab" in reg.injected
+
+    reg.reset("vocab")
+    assert not reg.injected and reg.get("index") == ["a"]
+
+
+def test_concurrent_first_use_loads_once():
+    reg, calls, gate = Registry(), [], threading.Event()
+
+    def slow():
+        gate.wait(5)
+        calls.append(1)
+        return object()
+
+    reg.register("x", slow)
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(reg.get("x"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and len({id(x) for x in got}) == 1
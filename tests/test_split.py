@@ -0,0 +1,57 @@
+import random
+from collections import Counter
+
+from src.autosuggest.data.split import hash_split, length_bin, stream_split
+
+RATIOS = (0.8, 0.1, 0.1)
+WORDS = "tôi bạn đi học làm hôm nay mai chơi nhà trường xin chào cảm ơn rất nhiều".split()
+
+
+def corpus(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.choice([3, 8, 15, 30, 50]))) for _ in range(n)]
+
+
+def run(tmp_path, name, lines, seed=42):
+    inp, out = tmp_path / f"{name}.txt", tmp_path / name
+    out.mkdir()
+    inp.write_text("\n".join(lines), encoding="utf-8")
+    stream_split(inp, out, RATIOS, seed)
+    return {
+        s: k
+        for k, f in enumerate(("train.txt", "valid.txt", "test.txt"))
+        for s in (out / f).read_text(encoding="utf-8").split("\n")
+        if s
+    }
+
+
+def test_split_depends_on_content_only(tmp_path):
+    lines = corpus(3000)
+    first = run(tmp_path, "a", lines)
+    assert set(first) == set(lines)
+    assert all(k == hash_split(s, RATIOS, 42) for s, k in first.items())
+    # appended to, then shuffled: no line moves
+    more = lines + corpus(3000, seed=1)
+    random.Random(2).shuffle(more)
+    second = run(tmp_path, "b", more)
+    assert all(second[s] == k for s, k in first.items())
+    assert run(tmp_path, "c", lines, seed=7) != first
+
+
+def test_near_duplicates_stay_together(tmp_path):
+    base = corpus(500)
+    variants = [s.upper() + " !!" for s in base] + ["  " + s.replace(" ", " , ") + "." for s in base]
+    got = run(tmp_path, "a", base + variants)
+    for s, u, p in zip(base, variants[:500], variants[500:]):
+        assert got[s] == got[u] == got[p.strip()]
+
+
+def test_length_bins_follow_the_ratios(tmp_path):
+    got = run(tmp_path, "a", corpus(20000))
+    per_bin = {}
+    for s, k in got.items():
+        per_bin.setdefault(length_bin(s), Counter())[k] += 1
+    for counts in per_bin.values():
+        total = sum(counts.values())
+        for k, r in enumerate(RATIOS):
+            assert abs(counts[k] / total - r) < 0.03
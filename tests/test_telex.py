@@ -0,0 +1,62 @@
+import sys, threading
+
+import pytest
+
+from src.autocorrect.core import telex
+from src.autocorrect.core.telex import Composer, compose
+
+CASES = [
+    ("xinh", "telex", "xinh"),
+    ("vieejt", "telex", "việt"),
+    ("tieengs", "telex", "tiếng"),
+    ("dduwowngf", "telex", "đường"),
+    ("nguowif", "telex", "người"),
+    ("hoaf", "telex", "hòa"),
+    ("quaf", "telex", "quà"),
+    ("gif", "telex", "gì"),
+    ("vie65t", "vni", "việt"),
+    ("d9u7o7ng2", "vni", "đường"),
+]
+
+
+def fresh(keys, method):
+    state = Composer(method)
+    for k in keys:
+        state.feed(k)
+    return state.text
+
+
+@pytest.mark.parametrize("keys,method,text", CASES)
+def test_compose(keys, method, text):
+    assert fresh(keys, method) == text
+    # typed one key at a time: every call resumes from the cached prefix
+    for i in range(1, len(keys) + 1):
+        assert compose(keys[:i], method) == fresh(keys[:i], method)
+
+
+def test_shared_cache_under_threads(monkeypatch):
+    monkeypatch.setattr(telex, "CACHE_SIZE", 1)  # evict all the time
+    words = [keys for keys, method, _ in CASES if method == "telex"]
+    want = {w[:i]: fresh(w[:i], "telex") for w in words for i in range(1, len(w) + 1)}
+    errors = []
+
+    def typing(offset):
+        try:
+            for n in range(1000):
+                w = words[(n + offset) % len(words)]
+                for i in range(1, len(w) + 1):
+                    assert compose(w[:i]) == want[w[:i]]
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=typing, args=(i,)) for i in range(8)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads inside compose
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []